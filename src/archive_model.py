@@ -0,0 +1,88 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""The archive as a list model a list view can scroll through.
+
+The archive can hold hundreds of thousands of copies, so nothing here holds
+it. The view asks for the rows it is about to draw, those are read a page at
+a time, and only the last few pages are kept. Memory stays what a screenful
+costs however long the history gets.
+"""
+
+from collections import OrderedDict
+
+from gi.repository import Gio, GObject
+
+from serigy.settings import Settings
+from serigy.slot_data import SlotData
+
+PAGE_SIZE = 64
+
+# Enough for a viewport and a fling either way.
+MAX_PAGES = 8
+
+
+class ArchiveItem(GObject.Object):
+    """One archived copy, as handed to the list item factory."""
+
+    __gtype_name__ = "ArchiveItem"
+
+    def __init__(self, slot: SlotData) -> None:
+        super().__init__()
+        self.slot = slot
+
+
+class ArchiveModel(GObject.Object, Gio.ListModel):
+    __gtype_name__ = "ArchiveModel"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._pages: OrderedDict[int, list[ArchiveItem]] = OrderedDict()
+        self._n_items = Settings.get().archived_count
+        self._handler_id = Settings.get().connect(
+            "archive-changed", self._on_archive_changed
+        )
+
+    def close(self) -> None:
+        if self._handler_id:
+            Settings.get().disconnect(self._handler_id)
+            self._handler_id = None
+
+    def do_get_item_type(self) -> GObject.GType:
+        return ArchiveItem.__gtype__
+
+    def do_get_n_items(self) -> int:
+        return self._n_items
+
+    def do_get_item(self, position: int) -> ArchiveItem | None:
+        if position >= self._n_items:
+            return None
+        page = self._page(position // PAGE_SIZE)
+        offset = position % PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def _page(self, index: int) -> list[ArchiveItem]:
+        page = self._pages.get(index)
+        if page is not None:
+            self._pages.move_to_end(index)
+            return page
+
+        page = [
+            ArchiveItem(slot)
+            for slot in Settings.get().archived_slots(
+                index * PAGE_SIZE, PAGE_SIZE
+            )
+        ]
+        self._pages[index] = page
+        while len(self._pages) > MAX_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _on_archive_changed(self, _settings) -> None:
+        # Every copy that pushes a slot out lands at the top and shifts the
+        # rest by one, so there is no page left worth keeping. The view only
+        # rebinds the rows it shows.
+        self._pages.clear()
+        removed = self._n_items
+        self._n_items = Settings.get().archived_count
+        self.items_changed(0, removed, self._n_items)
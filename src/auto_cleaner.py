@@ -5,6 +5,7 @@ import time
 
 from gi.repository import GLib
 
+from serigy.clipboard import SlotChange, SlotChangeKind
 from serigy.settings import Settings
 from serigy.slot_data import SlotData
 
@@ -42,30 +43,37 @@ class AutoCleaner:
             self._timer_id = None
             return False
 
-        slots = Settings.get().slots
+        settings = Settings.get()
         now = int(time.time())
-        expiry_seconds = Settings.get().auto_clear_minutes_value * 60
-        changed = False
+        expiry_seconds = settings.auto_clear_minutes_value * 60
+        changes: list[SlotChange] = []
 
-        for i, slot in enumerate(slots):
-            if slot.is_pinned:
-                continue
-            if slot.is_empty:
-                continue
-            if slot.timestamp:
-                try:
-                    timestamp = int(slot.timestamp)
+        with settings.editing_slots():
+            for i, slot in enumerate(settings.slots_snapshot):
+                if slot.is_pinned:
+                    continue
+                if slot.is_empty:
+                    continue
+                if slot.timestamp:
+                    try:
+                        timestamp = int(slot.timestamp)
+                    except ValueError:
+                        continue
                     if now - timestamp > expiry_seconds:
-                        slots[i] = SlotData()
-                        changed = True
-                except ValueError:
-                    pass
+                        settings.update_slot(i, SlotData())
+                        changes.append(
+                            SlotChange(SlotChangeKind.UPDATED, i, SlotData())
+                        )
+            # What the grid pushed out expires the same, or a copy cleared
+            # for privacy would live on in the archive and its search.
+            settings.expire_archived(now - expiry_seconds)
 
-        if changed:
-            Settings.get().slots = slots
-            window = self._get_window()
-            if window:
-                window.update_slots(slots)
+        window = self._get_window() if changes else None
+        if window is not None:
+            if settings.auto_arrange:
+                # The emptied cards have to travel to the back.
                 window.refresh_grid()
+            else:
+                window.apply_slot_changes(changes)
 
         return True
@@ -1,13 +1,25 @@
 # Copyright 2024-2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from serigy.clipboard.capture import (
+    capture_files,
+    capture_text,
+    capture_texture,
+    read_text_capped,
+    reference_item,
+    sweep_images,
+)
 from serigy.clipboard.content import (
     file_provider,
     provider_for,
     text_provider,
     texture_provider,
 )
-from serigy.clipboard.manager import ClipboardManager
+from serigy.clipboard.manager import (
+    ClipboardManager,
+    SlotChange,
+    SlotChangeKind,
+)
 from serigy.clipboard.monitor import ClipboardMonitor
 from serigy.clipboard.queue import (
     ClipboardItem,
@@ -18,6 +30,8 @@ from serigy.clipboard.writer import ClipboardWriter
 
 __all__ = [
     "ClipboardManager",
+    "SlotChange",
+    "SlotChangeKind",
     "ClipboardMonitor",
     "ClipboardWriter",
     "ClipboardQueue",
@@ -27,4 +41,10 @@ __all__ = [
     "text_provider",
     "texture_provider",
     "file_provider",
+    "capture_files",
+    "capture_text",
+    "capture_texture",
+    "read_text_capped",
+    "reference_item",
+    "sweep_images",
 ]
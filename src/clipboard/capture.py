@@ -0,0 +1,377 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Capturing a copy without paying for its size on the main loop.
+
+Converting, encoding and hashing a 4K screenshot takes hundreds of
+milliseconds, and on the main loop those are milliseconds in which both the
+window and clipboard detection stand still. Here the whole of it runs on a
+worker thread, and the main loop is handed back a finished ClipboardItem.
+
+Text is streamed instead of read as one string, and the read stops at a
+size cap, so what a capture holds in memory is bounded by the cap and not
+by whatever someone copied. What it is, and how it reads in a search, is
+then worked out on the same worker, once, for the slot to keep.
+"""
+
+import hashlib
+import logging
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+
+from gi.repository import Gdk, Gio, GLib
+
+from serigy import trace
+from serigy.clipboard.probe import CHUNK_BYTES, TEXT_MIME_TYPES
+from serigy.clipboard.queue import ClipboardItem, ClipboardItemType
+from serigy.image_store import (
+    INLINE_TEXT_BYTES,
+    PREVIEW_CHARS,
+    image_path,
+    prune,
+    store_image,
+    store_text_blob,
+    text_blob_name,
+)
+from serigy.slot_data import SlotData
+from serigy.slot_meta import describe
+
+# One worker: images are stored in the order they were copied, and two
+# screenshots encoding at once would only fight over the same cores.
+_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="serigy-capture"
+)
+
+
+def capture_texture(
+    texture: Gdk.Texture, on_done: Callable[[ClipboardItem], object]
+) -> None:
+    """Store `texture` on the worker, then hand its item to `on_done`.
+
+    `on_done` runs on the main loop. An image whose capture failed is
+    logged and dropped.
+    """
+    _submit(on_done, "store the copied image", _texture_item, texture)
+
+
+def capture_files(
+    files: list[Gio.File], on_done: Callable[[list[ClipboardItem]], object]
+) -> None:
+    """Turn copied files into items on the worker, in the order copied.
+
+    A file that reads as an image is loaded, checked and stored there, all
+    of it a full read and decode; any other becomes a reference to it.
+    `on_done` gets the items on the main loop.
+    """
+    _submit(on_done, "store the copied files", _file_items, files)
+
+
+def capture_text(
+    item: ClipboardItem, on_done: Callable[[ClipboardItem], object]
+) -> None:
+    """Work out the slot a text item becomes, on the worker.
+
+    `on_done` gets the item, carrying that slot, on the main loop.
+    """
+    _submit(on_done, "describe the copied text", _text_item, item)
+
+
+def restore_files(
+    item: ClipboardItem,
+    slot: SlotData,
+    on_done: Callable[[ClipboardItem], object],
+) -> None:
+    """Write again, on the worker, the files `slot` names for `item`.
+
+    For a copy whose files went while it waited in the queue. `on_done`
+    gets the item back on the main loop once they are on disk; an item
+    that cannot be written is logged and dropped.
+    """
+    _submit(on_done, "store the copy again", _restore, item, slot)
+
+
+def describe_slots(
+    slots: list[SlotData], on_done: Callable[[list[SlotData]], object]
+) -> None:
+    """Describe `slots` on the worker; `on_done` gets them back in order."""
+    _submit(on_done, "describe the stored slots", _describe_all, slots)
+
+
+def sweep_images(referenced: set[str]) -> None:
+    """Sweep the image directories on the worker, sparing `referenced`.
+
+    Listing and stat'ing every stored file grows with the history, so it
+    stays off the main loop. On this worker it never runs alongside a
+    capture writing its files.
+    """
+    _submit(_ignore, "sweep the image directories", prune, referenced)
+
+
+def _ignore(_result) -> None:
+    pass
+
+
+def _describe_all(slots: list[SlotData]) -> list[SlotData]:
+    return [describe(slot) for slot in slots]
+
+
+def _submit(on_done: Callable, what: str, work: Callable, *args) -> None:
+    future = _executor.submit(work, *args)
+    future.add_done_callback(
+        lambda done: GLib.idle_add(_deliver, done, on_done, what)
+    )
+
+
+def _deliver(future: Future, on_done: Callable, what: str):
+    try:
+        result = future.result()
+    except Exception as e:
+        logging.warning("Could not %s: %s", what, e)
+        result = None
+
+    if result is not None:
+        on_done(result)
+    return GLib.SOURCE_REMOVE
+
+
+def texture_fingerprint(texture: Gdk.Texture) -> str:
+    """Name an image by its pixels rather than by any encoding of them.
+
+    A hash of the PNG meant compressing the whole image first, the dearest
+    step of a capture, only to learn it was a copy already held; and the same
+    pixels encoded by another app hashed differently. The pixels are asked
+    for in one fixed format, and only the visible bytes of each row are
+    hashed, so neither the source's format nor its row padding shows.
+    """
+    width, height = texture.get_width(), texture.get_height()
+    downloader = Gdk.TextureDownloader.new(texture)
+    downloader.set_format(Gdk.MemoryFormat.R8G8B8A8)
+    pixels, stride = downloader.download_bytes()
+    data = memoryview(pixels.get_data())
+
+    digest = hashlib.blake2b(f"{width}x{height}".encode(), digest_size=20)
+    row = width * 4
+    if stride == row:
+        digest.update(data[: row * height])
+    else:
+        for y in range(height):
+            digest.update(data[y * stride : y * stride + row])
+    return digest.hexdigest()
+
+
+def _texture_item(texture: Gdk.Texture) -> ClipboardItem:
+    """Fingerprint the pixels, and encode only an image not stored yet.
+
+    Runs on the worker. Textures are immutable, so reading one from here
+    while the main loop holds it too is safe.
+    """
+    with trace.span("fingerprint image"):
+        fingerprint = texture_fingerprint(texture)
+    filename = f"{fingerprint}.png"
+
+    # A file under this name means a slot or an archived copy holds these
+    # pixels, and the copy will be recognized as theirs: nothing to encode.
+    encoded = None
+    if not image_path(filename).exists():
+        with trace.span("encode image"):
+            encoded = texture.save_to_png_bytes().get_data()
+            store_image(encoded, filename)
+
+    return ClipboardItem(
+        item_type=ClipboardItemType.IMAGE,
+        # Kept for the rare file that is gone by the time a slot names it.
+        data=texture,
+        content_hash=fingerprint,
+        filename=filename,
+        mime="image/png",
+        encoded=encoded,
+    )
+
+
+def _restore(item: ClipboardItem, slot: SlotData) -> ClipboardItem | None:
+    if slot.filename:
+        encoded = item.encoded
+        if encoded is None and isinstance(item.data, Gdk.Texture):
+            with trace.span("encode image"):
+                encoded = item.data.save_to_png_bytes().get_data()
+        if encoded is None:
+            logging.warning("Image %s is gone, dropping it", slot.filename)
+            return None
+        if not store_image(encoded, slot.filename):
+            return None
+    if slot.blob and not store_text_blob(item.data.encode(), slot.blob):
+        return None
+    return item
+
+
+def _file_items(files: list[Gio.File]) -> list[ClipboardItem]:
+    items = (_image_file_item(file) or reference_item(file) for file in files)
+    return [item for item in items if item]
+
+
+def _image_file_item(file: Gio.File) -> ClipboardItem | None:
+    """Read the file as an image, when its bytes are within reach.
+
+    An image slot can be shown and pasted into anything that takes a
+    picture, which a uri cannot. Only apps under the same sandbox rules
+    hand over readable files, so this often fails. Runs on the worker.
+    """
+    try:
+        with trace.span("load image file"):
+            contents, _etag = file.load_bytes(None)
+            # Decoding is only the check that this is an image we can
+            # show. The file is already encoded, so it is kept as it is
+            # instead of being decoded and encoded again.
+            Gdk.Texture.new_from_bytes(contents)
+        content_type = file.query_info(
+            "standard::content-type", 0, None
+        ).get_content_type()
+    except GLib.Error as e:
+        logging.debug(
+            "Keeping %s as a reference: %s", file.get_uri(), e.message
+        )
+        return None
+
+    data = contents.get_data()
+    ext = content_type.rsplit("/", 1)[-1] if "/" in content_type else "png"
+    content_hash = hashlib.sha256(data).hexdigest()
+    name = file.get_basename() or ""
+    stem = name.rsplit(".", 1)[0] if "." in name else name
+    filename = f"{stem}_{content_hash}.{ext}"
+    store_image(data, filename)
+    return ClipboardItem(
+        item_type=ClipboardItemType.FILE,
+        data=None,
+        content_hash=content_hash,
+        filename=filename,
+        mime=content_type,
+        encoded=data,
+    )
+
+
+def reference_item(file: Gio.File) -> ClipboardItem | None:
+    """Point at the file, which is all the clipboard itself held.
+
+    The type comes from the name because reading the file is what we
+    cannot count on doing.
+    """
+    uri = file.get_uri()
+    if not uri:
+        return None
+
+    name = file.get_basename() or uri
+    return ClipboardItem(
+        item_type=ClipboardItemType.FILE,
+        data=None,
+        content_hash=hashlib.sha256(uri.encode()).hexdigest(),
+        mime=Gio.content_type_guess(name, None)[0],
+        uri=uri,
+    )
+
+
+def text_digest(data: bytes) -> str:
+    """The SHA-256 a copied text is known by, to the queue and its blob."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_slot(
+    text: str,
+    mime: str = "",
+    data: bytes | None = None,
+    digest: str | None = None,
+) -> SlotData:
+    """The slot a copied text becomes, not yet described or timestamped.
+
+    Text past `INLINE_TEXT_BYTES` is written to its blob file here and the
+    slot keeps the start of it. `data` and `digest` are the text encoded
+    and hashed, for a caller that has them already.
+    """
+    if data is None:
+        data = text.encode()
+    if len(data) <= INLINE_TEXT_BYTES:
+        return SlotData(text=text, mime=mime)
+
+    blob = text_blob_name(digest or text_digest(data))
+    store_text_blob(data, blob)
+    return SlotData(
+        text=text[:PREVIEW_CHARS],
+        mime=mime,
+        blob=blob,
+        text_size=len(data),
+    )
+
+
+def _text_item(item: ClipboardItem) -> ClipboardItem:
+    """Hash and describe a copied text, and store it if it is long.
+
+    Runs on the worker: each of those reads the whole text, which can be
+    as large as the capture limit lets it.
+    """
+    with trace.span("describe text", chars=len(item.data)):
+        data = item.data.encode()
+        digest = text_digest(data)
+        slot = describe(
+            text_slot(item.data, item.mime, data, digest), item.data
+        )
+    return replace(item, slot=slot, content_hash=digest)
+
+
+def read_text_capped(
+    clipboard: Gdk.Clipboard,
+    limit: int,
+    on_done: Callable[[str | None, bool], None],
+) -> None:
+    """Read the clipboard text, giving up once it runs past `limit` bytes.
+
+    `on_done` gets the text, or None with whether it was the cap that
+    stopped the read: an oversize copy is only measured as far as the cap,
+    never held whole.
+    """
+    buffer = bytearray()
+
+    def finish(stream, text, oversize):
+        if stream is not None:
+            stream.close_async(GLib.PRIORITY_DEFAULT, None, None)
+        on_done(text, oversize)
+
+    def on_stream(clipboard, result):
+        try:
+            stream, _mime_type = clipboard.read_finish(result)
+        except GLib.Error as e:
+            logging.warning("Could not read the copied text: %s", e.message)
+            finish(None, None, False)
+            return
+        stream.read_bytes_async(
+            CHUNK_BYTES, GLib.PRIORITY_DEFAULT, None, on_chunk
+        )
+
+    def on_chunk(stream, result):
+        try:
+            chunk = stream.read_bytes_finish(result)
+        except GLib.Error as e:
+            logging.warning("Could not read the copied text: %s", e.message)
+            finish(stream, None, False)
+            return
+
+        if chunk.get_size() == 0:
+            text = buffer.decode("utf-8", errors="replace")
+            finish(stream, text, False)
+            return
+
+        buffer.extend(chunk.get_data())
+        if len(buffer) > limit:
+            logging.info(
+                "Copied text is over the %d byte capture limit", limit
+            )
+            buffer.clear()
+            finish(stream, None, True)
+            return
+
+        stream.read_bytes_async(
+            CHUNK_BYTES, GLib.PRIORITY_DEFAULT, None, on_chunk
+        )
+
+    clipboard.read_async(
+        TEXT_MIME_TYPES, GLib.PRIORITY_DEFAULT, None, on_stream
+    )
@@ -16,7 +16,7 @@ gi.require_versions({"Gdk": "4.0"})
 
 from gi.repository import Gdk, Gio, GLib, GObject
 
-from serigy.image_store import image_path
+from serigy.image_store import full_text, image_path
 
 
 def text_provider(text: str) -> Gdk.ContentProvider:
@@ -66,10 +66,11 @@ def provider_for(slot) -> Gdk.ContentProvider | None:
     """Everything a slot needs to become a clipboard offer, or None.
 
     None means the slot cannot be pasted at all: an empty one, or an image
-    whose file no longer reads.
+    or long text whose file no longer reads.
     """
     if slot.text:
-        return text_provider(slot.text)
+        text = full_text(slot)
+        return text_provider(text) if text is not None else None
 
     if slot.filename:
         path = str(image_path(slot.filename))
@@ -1,108 +1,253 @@
 # Copyright 2024-2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import logging
 import time
 import weakref
-
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from enum import Enum, auto
+
+from serigy import stats, trace
+from serigy.clipboard.capture import (
+    capture_text,
+    describe_slots,
+    restore_files,
+)
 from serigy.clipboard.queue import ClipboardItem, ClipboardItemType
-from serigy.image_store import store_image
+from serigy.image_store import image_path, text_blob_path
 from serigy.settings import Settings
-from serigy.slot_data import SlotData
+from serigy.slot_data import SlotData, content_key
+from serigy.slot_meta import describe, with_meta
+
+# Archived slots described per trip to the worker, so a long archive from
+# before is brought up to date without one long stall on either side.
+_DESCRIBE_BATCH = 200
+
+
+class SlotChangeKind(Enum):
+    INSERTED = auto()
+    REMOVED = auto()
+    # From `source` to `index`, with the slot as it reads after the move.
+    MOVED = auto()
+    UPDATED = auto()
+
+
+@dataclass(frozen=True)
+class SlotChange:
+    """One row of the grid that a write touched.
+
+    Rebuilding the grid for every copy destroyed every card and built it
+    again, images and all. These say which rows moved, so the window can
+    touch those and leave the rest bound. Each carries the slot it is about,
+    since a later change in the same batch can move the row it landed in.
+    """
+
+    kind: SlotChangeKind
+    index: int
+    slot: SlotData | None = None
+    source: int | None = None
 
 
 class ClipboardManager:
     def __init__(self, application):
         self.application = weakref.proxy(application)
 
-    def _find_last_unpinned_slot(self, cb_list: list[SlotData]) -> int | None:
+    def _find_last_unpinned_slot(
+        self, cb_list: Sequence[SlotData]
+    ) -> int | None:
         """Find the index of the last unpinned slot."""
         for i in reversed(range(len(cb_list))):
             if not cb_list[i].is_pinned:
                 return i
         return None
 
-    def _find_matching_slot(
-        self, cb_list: list[SlotData], item: ClipboardItem
-    ) -> int | None:
+    def _find_matching_slot(self, slot: SlotData) -> int | None:
         """Find the slot already holding this content, anywhere in the list.
 
         Only slot 0 used to be checked, so copying A, then B, then A again
         stored A a second time and the list filled up with the same content.
+        The history keeps slots by content key, so this is a lookup. Images
+        are named by their pixel fingerprint, so the same picture matches
+        whichever app copied it.
         """
-        if item.item_type == ClipboardItemType.TEXT:
-            key, field = item.data, "text"
-        elif item.uri:
-            key, field = item.uri, "uri"
-        else:
-            key, field = item.filename, "filename"
-
-        if not key:
-            return None
-
-        return next(
-            (i for i, s in enumerate(cb_list) if getattr(s, field) == key),
-            None,
+        return Settings.get().find_slot(content_key(slot))
+
+    def _slot_for(self, item: ClipboardItem) -> SlotData:
+        timestamp = str(int(time.time()))
+        if item.slot is not None:
+            return replace(item.slot, timestamp=timestamp)
+        return describe(
+            SlotData(
+                filename=item.filename or "",
+                uri=item.uri,
+                timestamp=timestamp,
+                mime=item.mime,
+            )
         )
 
     def process_item(self, item: ClipboardItem) -> None:
-        cb_list = Settings.get().slots
+        with trace.span("process item", type=item.item_type.value):
+            self._process_item(item)
+
+    def _process_item(
+        self, item: ClipboardItem, restored: bool = False
+    ) -> None:
+        """Store a captured copy as the newest slot.
+
+        Only the history and the grid are touched here. Everything that
+        costs a copy's size, from describing a text to writing its files,
+        is the capture worker's, and an item that still needs any of it is
+        sent back there.
+        """
+        if item.item_type == ClipboardItemType.TEXT and item.slot is None:
+            # Text normally arrives described; this is the slow way round.
+            capture_text(item, self.process_item)
+            return
+
+        settings = Settings.get()
+        slot = self._slot_for(item)
 
-        match_idx = self._find_matching_slot(cb_list, item)
+        stats.count(f"captures.{item.item_type.value}")
+        match_idx = self._find_matching_slot(slot)
         if match_idx is not None:
-            self._promote_slot(cb_list, match_idx)
+            stats.count("captures.already_held")
+            self._promote_slot(match_idx)
+            self._release_files(slot)
             return
 
-        last_unpinned_idx = self._find_last_unpinned_slot(cb_list)
+        last_unpinned_idx = self._find_last_unpinned_slot(
+            settings.slots_snapshot
+        )
         if last_unpinned_idx is None:
+            self._release_files(slot)
             return
 
-        cb_list.pop(last_unpinned_idx)
+        if self._files_missing(slot):
+            if restored:
+                logging.warning(
+                    "Could not store %s, dropping it",
+                    slot.filename or slot.blob,
+                )
+                return
+            self._restore(item, slot)
+            return
 
-        if item.item_type == ClipboardItemType.TEXT:
-            cb_list.insert(
-                0,
-                SlotData(
-                    text=item.data,
-                    timestamp=str(int(time.time())),
-                    mime=item.mime,
-                ),
-            )
-        else:
-            if item.filename and item.data:
-                if not store_image(item.data, item.filename):
-                    return
-            cb_list.insert(
-                0,
-                SlotData(
-                    filename=item.filename or "",
-                    uri=item.uri,
-                    timestamp=str(int(time.time())),
-                    mime=item.mime,
-                ),
+        # Two row writes, not a rewrite of the whole list.
+        with settings.editing_slots():
+            evicted = settings.remove_slot(last_unpinned_idx)
+            if not evicted.is_empty:
+                # Out of the grid is not out of reach: the history dialog
+                # pages through everything copies have pushed out.
+                settings.archive_slot(evicted)
+            settings.insert_slot(0, slot)
+        self._refresh_window(
+            [
+                SlotChange(SlotChangeKind.REMOVED, last_unpinned_idx),
+                SlotChange(SlotChangeKind.INSERTED, 0, slot),
+            ]
+        )
+
+    def _files_missing(self, slot: SlotData) -> bool:
+        """Whether a file the new slot names is not on disk.
+
+        It usually is, written where the copy was captured. It can have gone
+        since: let go by the slot that held it, or by a copy of the same
+        content that was dropped, while this one waited in the queue.
+        """
+        if slot.filename and not image_path(slot.filename).exists():
+            return True
+        return bool(slot.blob) and not text_blob_path(slot.blob).exists()
+
+    def _restore(self, item: ClipboardItem, slot: SlotData) -> None:
+        """Have the worker write the item's files again, then store it."""
+
+        def on_restored(item: ClipboardItem) -> None:
+            with trace.span("process item", type=item.item_type.value):
+                self._process_item(item, restored=True)
+
+        stats.count("captures.restored")
+        restore_files(item, slot, on_restored)
+
+    def _release_files(self, slot: SlotData) -> None:
+        """Let go of what the worker wrote for a copy that is not kept."""
+        Settings.get().release_unclaimed((slot.filename, slot.blob))
+
+    def describe_stale_slots(self) -> None:
+        """Describe, on the worker, the slots an older detector described.
+
+        Slots from before `META_VERSION`, or carried over from GSettings,
+        would otherwise have every reader detect them again. The grid goes
+        in one trip and the archive a batch at a time.
+        """
+        settings = Settings.get()
+        stale = [
+            slot
+            for slot in settings.slots_snapshot
+            if not slot.is_empty and not slot.is_described
+        ]
+        archived = settings.stale_archived(_DESCRIBE_BATCH)
+        if not stale and not archived:
+            return
+
+        row_ids = [row_id for row_id, _ in archived]
+
+        def on_described(described: list[SlotData]) -> None:
+            grid, rest = described[: len(stale)], described[len(stale) :]
+            self._store_descriptions(
+                grid, list(zip(row_ids, rest, strict=True))
             )
+            if len(archived) == _DESCRIBE_BATCH:
+                self.describe_stale_slots()
+
+        describe_slots(stale + [slot for _, slot in archived], on_described)
 
-        self._update_slots_no_callback(cb_list)
+    def _store_descriptions(
+        self,
+        grid: list[SlotData],
+        archived: list[tuple[int, SlotData]],
+    ) -> None:
+        """Keep what the worker worked out, for whatever is still there.
 
-    def _promote_slot(self, cb_list: list[SlotData], index: int) -> None:
+        The grid can have moved on while the worker ran, so each slot is
+        found again by its content, and only its derived fields are taken.
+        The cards are left bound: what they show reads the same either way.
+        """
+        settings = Settings.get()
+        with settings.editing_slots():
+            for described in grid:
+                index = settings.find_slot(content_key(described))
+                if index is None:
+                    continue
+                current = settings.slots_snapshot[index]
+                if current.is_described:
+                    continue
+                settings.update_slot(index, with_meta(current, described))
+            for row_id, described in archived:
+                settings.describe_archived(row_id, described)
+
+    def _promote_slot(self, index: int) -> None:
         """Move a slot we already hold back to the front.
 
         The copy is real, so the slot travels to the top and takes a fresh
         timestamp, which also keeps the auto cleaner from expiring something
         the user just copied. What it does not do is become a second slot.
         """
-        slot = cb_list.pop(index)
-        slot.timestamp = str(int(time.time()))
-        cb_list.insert(0, slot)
-        self._update_slots_no_callback(cb_list)
+        settings = Settings.get()
+        slot = replace(
+            settings.slots_snapshot[index], timestamp=str(int(time.time()))
+        )
+        with settings.editing_slots():
+            settings.update_slot(index, slot)
+            settings.move_slot(index, 0)
+        self._refresh_window(
+            [SlotChange(SlotChangeKind.MOVED, 0, slot, source=index)]
+        )
 
-    def _update_slots_no_callback(self, cb_list: list[SlotData]) -> None:
+    def _refresh_window(self, changes: list[SlotChange]) -> None:
         window = self.application.get_active_window()
-        Settings.get().slots = cb_list
-
         if window:
-            # Only the grid is left to do. Asking the window to update the
-            # slots as well wrote the same list to GSettings a second time
-            # and swept the image directory twice for every copy, and the
-            # rebuild below reads the slots back and settles the toolbar
-            # on its own.
-            window.refresh_grid()
+            # Only the grid is left to do, and only the rows the copy moved.
+            # Asking the window to update the slots as well wrote the same
+            # list a second time, and a full rebuild rebound every card.
+            window.apply_slot_changes(changes)
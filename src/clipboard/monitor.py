@@ -1,7 +1,6 @@
 # Copyright 2024-2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-import hashlib
 import logging
 import uuid
 from collections.abc import Callable
@@ -9,8 +8,9 @@ from collections.abc import Callable
 import gi
 
 gi.require_version("Gdk", "4.0")
-from gi.repository import Gdk, GLib
+from gi.repository import Gdk, Gio, GLib
 
+from serigy import stats, trace
 from serigy.clipboard.detector import (
     IMAGE_PROBE_TICKS,
     Action,
@@ -18,6 +18,14 @@ from serigy.clipboard.detector import (
     decide,
     probe_failure_is_conclusive,
 )
+from serigy.clipboard.portal import PortalWatcher
+from serigy.clipboard.probe import (
+    TextSignature,
+    is_cancelled,
+    read_signature,
+    signature_of,
+)
+from serigy.clipboard.scheduler import PollMetrics, PollScheduler
 
 # A suppression only ever covers a write we just made. One that is
 # never consumed used to stay set forever, and the copy it swallowed
@@ -26,20 +34,40 @@ SUPPRESS_TIMEOUT_MS = 3000
 
 
 class ClipboardMonitor:
-    """Monitors clipboard for text changes."""
-
-    def __init__(self, callback: Callable[[], None]):
+    """Monitors clipboard for text changes.
+
+    Told about copies by the clipboard portal when `use_portal` is set and
+    the portal grants a session; otherwise, and whenever that session goes,
+    by polling what the clipboard exposes.
+
+    `clipboard` is the display's unless another is given. Anything that
+    answers like a `Gdk.Clipboard` will do, which is how the fake one in
+    tools/ drives the monitor with no compositor.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[], None],
+        use_portal=False,
+        clipboard: Gdk.Clipboard | None = None,
+    ):
         self.callback = callback
-        self.clipboard = Gdk.Display.get_default().get_clipboard()
+        self.use_portal = use_portal
+        self._portal: PortalWatcher | None = None
+        self.clipboard = clipboard or Gdk.Display.get_default().get_clipboard()
         self.last_formats = ""
-        self.last_text_hash: str | None = None
+        self.text_signature: TextSignature | None = None
         self.is_monitoring = False
         self._signal_handler_id = None
         self._poll_timer_id = None
+        self._scheduler = PollScheduler()
         self._initial_state_ready = False
         self._is_processing = False
         self._last_is_local: bool | None = None
         self.sentinel = f"\u200b{uuid.uuid4()}\u200b"
+        self._sentinel_signature = signature_of(
+            self.sentinel.encode(), full=True
+        )
         self.sentinel_written = False
         self._sentinel_refused = False
         # Only a clipboard holding our sentinel tells us about the next copy.
@@ -50,6 +78,11 @@ class ClipboardMonitor:
         self._image_tick = 0
         self._texture_fingerprint: str | None = None
         self._stale_trigger_fired = False
+        self._change_suspected = False
+        self._probe_cancellable: Gio.Cancellable | None = None
+        # Whether the probe under way was started by a poll tick, for the
+        # trigger it may end in to be counted as the poll's.
+        self._probe_polled = False
 
     def suppress_next_change(self):
         """Suppress the next clipboard change detection.
@@ -89,10 +122,13 @@ class ClipboardMonitor:
         self.owns_clipboard = False
         logging.debug("Clipboard monitoring started")
         self.last_formats = self.clipboard.get_formats().to_string()
-        self._capture_initial_hash()
+        self._capture_initial_signature()
+        if self.use_portal:
+            self._start_portal()
 
     def stop(self):
         self.is_monitoring = False
+        self._cancel_probe()
         self._reset_probe_state()
         self.owns_clipboard = False
         self._suppress_next = False
@@ -100,6 +136,124 @@ class ClipboardMonitor:
         if self._signal_handler_id:
             self.clipboard.disconnect(self._signal_handler_id)
             self._signal_handler_id = None
+        self._stop_polling()
+        self._stop_portal()
+
+    def set_use_portal(self, use_portal: bool) -> None:
+        if use_portal == self.use_portal:
+            return
+        self.use_portal = use_portal
+        if not self.is_monitoring:
+            return
+        if use_portal:
+            self._start_portal()
+        else:
+            self._stop_portal()
+            self._start_polling()
+
+    @property
+    def portal_active(self) -> bool:
+        """Whether the portal reports copies, focus or not.
+
+        No sentinel is needed then, so an empty clipboard we do not hold
+        is no sign that monitoring is stuck.
+        """
+        return self._portal is not None and self._portal.is_active
+
+    # Portal
+
+    def _start_portal(self):
+        if self._portal is not None:
+            return
+        self._portal = PortalWatcher(
+            on_ready=self._on_portal_ready,
+            on_changed=self._on_portal_changed,
+            on_lost=self._on_portal_lost,
+        )
+        self._portal.start()
+
+    def _stop_portal(self):
+        if self._portal is not None:
+            self._portal.close()
+            self._portal = None
+
+    def _on_portal_ready(self):
+        logging.debug("Clipboard portal ready, polling stops")
+        self._stop_polling()
+
+    def _on_portal_lost(self, why: str):
+        logging.debug("Clipboard portal lost (%s), polling instead", why)
+        self._portal = None
+        self._start_polling()
+
+    def _on_portal_changed(self, mime_types: list[str]):
+        if not (self.is_monitoring and self._initial_state_ready):
+            return
+        formats = self.clipboard.get_formats().to_string()
+        if self.clipboard.is_local() and formats:
+            # Our own write, like a slot copied out: the portal reports
+            # those as well, with nothing to tell them apart by.
+            logging.debug("_on_portal_changed: our own write, ignored")
+            return
+
+        # Nothing to infer: someone else copied. Probing first would miss
+        # an image replacing one of the same formats.
+        logging.debug(
+            "_check_for_changes: TRIGGER alert window (portal: %s)",
+            ", ".join(mime_types[:3]),
+        )
+        self._reset_probe_state()
+        self._stale_trigger_fired = False
+        self._schedule_callback()
+
+    # Polling
+
+    @property
+    def poll_metrics(self) -> PollMetrics:
+        return self._scheduler.metrics
+
+    def note_activity(self):
+        """Poll fast for a while: the user is around, and may copy."""
+        self._scheduler.note_activity()
+        if self._poll_timer_id:
+            # Rearmed at the fast interval, not left waiting out a long
+            # idle one that started before the activity.
+            self._stop_polling()
+            self._start_polling()
+
+    def set_paused(self, reason: str, paused: bool):
+        """Stop polling while `reason` holds, like a locked session.
+
+        The `changed` signal and the portal still report copies then; only
+        the wakeups go.
+        """
+        was_paused = self._scheduler.paused
+        self._scheduler.set_paused(reason, paused)
+        if self._scheduler.paused == was_paused:
+            return
+
+        logging.debug(
+            "Polling %s (%s)", "paused" if paused else "resumed", reason
+        )
+        if paused:
+            self._stop_polling()
+        else:
+            self.note_activity()
+            self._start_polling()
+
+    def _start_polling(self):
+        if (
+            self.is_monitoring
+            and self._initial_state_ready
+            and not self.portal_active
+            and not self._scheduler.paused
+            and not self._poll_timer_id
+        ):
+            self._poll_timer_id = GLib.timeout_add(
+                self._scheduler.next_interval_ms(), self._on_poll
+            )
+
+    def _stop_polling(self):
         if self._poll_timer_id:
             GLib.source_remove(self._poll_timer_id)
             self._poll_timer_id = None
@@ -126,23 +280,25 @@ class ClipboardMonitor:
             # opened while monitoring is off.
             self._is_processing = False
             return
+        trace.finish("capture")
         self.last_formats = self.clipboard.get_formats().to_string()
-        self._read_text_hash_and_finish()
+        self._read_text_signature_and_finish()
 
-    def _capture_initial_hash(self):
-        self.clipboard.read_text_async(None, self._on_initial_hash_ready)
+    def _capture_initial_signature(self):
+        # In full, once: what every later probe is measured against.
+        read_signature(
+            self.clipboard, self._on_initial_signature_ready, full=True
+        )
 
-    def _on_initial_hash_ready(self, clipboard, result):
-        try:
-            text = clipboard.read_text_finish(result)
-            if text:
-                self.last_text_hash = hashlib.sha256(text.encode()).hexdigest()
-        except Exception as e:
+    def _on_initial_signature_ready(self, signature, error):
+        if error is not None:
             logging.debug(
-                "Could not capture initial clipboard hash "
+                "Could not capture initial clipboard signature "
                 "(expected if empty): %s",
-                e,
+                error.message,
             )
+        elif signature.length:
+            self.text_signature = signature
 
         self._initial_state_ready = True
         logging.debug(
@@ -153,7 +309,7 @@ class ClipboardMonitor:
         self._signal_handler_id = self.clipboard.connect(
             "changed", self._on_signal
         )
-        self._poll_timer_id = GLib.timeout_add(1000, self._on_poll)
+        self._start_polling()
 
     def _on_signal(self, clipboard):
         can_proceed = (
@@ -165,7 +321,11 @@ class ClipboardMonitor:
             "_on_signal: changed signal received, can_proceed=%s", can_proceed
         )
         self._reset_probe_state()
+        self.note_activity()
         if can_proceed:
+            # Told outright that something changed, so a text probe that
+            # finds the same length and ends goes on to hash it all.
+            self._change_suspected = True
             # Only news clears the once-per-episode latch. A signal arriving
             # mid-capture is our own window taking focus: the compositor
             # hands the selection to whoever it just focused, and GDK calls
@@ -175,17 +335,20 @@ class ClipboardMonitor:
             self._check_for_changes()
 
     def _on_poll(self) -> bool:
+        # One shot: every tick arms the next with the interval it should
+        # wait, fast after activity and longer the quieter it gets.
+        self._poll_timer_id = None
         if not self.is_monitoring:
             logging.debug("_on_poll: stopping, is_monitoring=False")
             return False
-        if not self._initial_state_ready:
-            logging.debug("_on_poll: skip, initial state not ready")
-            return True
+
+        self._scheduler.tick()
         if self._is_processing:
             logging.debug("_on_poll: skip, is_processing=True")
-            return True
-        self._check_for_changes()
-        return True
+        else:
+            self._check_for_changes(polled=True)
+        self._start_polling()
+        return False
 
     def _reset_probe_state(self):
         self._probe_failures = 0
@@ -217,7 +380,12 @@ class ClipboardMonitor:
             image_tick=self._image_tick,
         )
 
-    def _check_for_changes(self):
+    def _check_for_changes(self, polled: bool = False):
+        """Look at the clipboard, and act on what changed.
+
+        `polled` says a poll tick is looking, so a copy found here, now or
+        by the probe it starts, counts toward the poll's detections.
+        """
         if not self.is_monitoring:
             return
         state = self._observe()
@@ -225,6 +393,7 @@ class ClipboardMonitor:
         # compositor's answer cannot pass for ownership.
         self.owns_clipboard = state.is_local and state.sentinel_written
         action = decide(state)
+        stats.count(f"monitor.{action.name.lower()}")
 
         if action is Action.TRIGGER_CAPTURE:
             if state.formats != state.last_formats:
@@ -237,8 +406,8 @@ class ClipboardMonitor:
                 logging.debug(
                     "_check_for_changes: TRIGGER alert window (format change)"
                 )
-                self._schedule_callback()
-                self._read_text_hash(is_initial=True)
+                self._schedule_callback(polled)
+                self._probe_text(polled, is_initial=True)
                 return
 
             # Sentinel cancelled: another client took the selection.
@@ -250,7 +419,7 @@ class ClipboardMonitor:
             self.last_formats = state.formats
             self._reset_probe_state()
             self._stale_trigger_fired = False
-            self._schedule_callback()
+            self._schedule_callback(polled)
             return
 
         if action is Action.WRITE_SENTINEL:
@@ -258,23 +427,49 @@ class ClipboardMonitor:
             return
 
         if action is Action.PROBE_LOCAL:
-            self.clipboard.read_text_async(None, self._on_portal_probe_read)
+            read_signature(
+                self.clipboard,
+                self._on_local_probe_read,
+                cancellable=self._new_probe(polled),
+            )
             return
 
         if action is Action.PROBE_TEXT:
-            self._read_text_hash(is_initial=False)
+            self._probe_text(polled)
             return
 
         if action is Action.PROBE_TEXTURE:
             self._image_tick = 0
-            self.clipboard.read_texture_async(None, self._on_texture_probe)
+            self.clipboard.read_texture_async(
+                self._new_probe(polled), self._on_texture_probe
+            )
             return
 
         self._image_tick = (self._image_tick + 1) % IMAGE_PROBE_TICKS
 
+    def _new_probe(self, polled: bool) -> Gio.Cancellable:
+        """A cancellable for a new probe, cancelling the one it supersedes.
+
+        A tick whose read is still crawling through the compositor has
+        nothing left to say once a newer tick looks again.
+        """
+        self._cancel_probe()
+        self._probe_polled = polled
+        self._probe_cancellable = Gio.Cancellable()
+        return self._probe_cancellable
+
+    def _cancel_probe(self):
+        if self._probe_cancellable is not None:
+            self._probe_cancellable.cancel()
+            self._probe_cancellable = None
+
     def _on_texture_probe(self, clipboard, result):
         try:
             texture = clipboard.read_texture_finish(result)
+        except GLib.Error as e:
+            if not is_cancelled(e):
+                self._on_probe_failed(f"texture read failed: {e.message}")
+            return
         except Exception as e:
             self._on_probe_failed(f"texture read failed: {e}")
             return
@@ -297,7 +492,7 @@ class ClipboardMonitor:
             logging.debug(
                 "_check_for_changes: TRIGGER alert window (texture changed)"
             )
-            self._schedule_callback()
+            self._schedule_callback(self._probe_polled)
 
     def _on_probe_failed(self, why: str):
         self._probe_failures += 1
@@ -318,35 +513,38 @@ class ClipboardMonitor:
         logging.debug(
             "_check_for_changes: TRIGGER alert window (formats went stale)"
         )
-        self._schedule_callback()
+        self._schedule_callback(self._probe_polled)
 
-    def _on_portal_probe_read(self, clipboard, result):
-        try:
-            text = clipboard.read_text_finish(result)
-            if text:
-                if text == self.sentinel:
-                    self._suppress_next = False
-                    return
-                text_hash = hashlib.sha256(text.encode()).hexdigest()
-                if text_hash != self.last_text_hash:
-                    logging.debug(
-                        "_check_for_changes: TRIGGER via portal probe "
-                        "(hash changed, is_local=True)"
-                    )
-                    self.last_text_hash = text_hash
-                    self._schedule_callback()
-                else:
-                    self._suppress_next = False
-                    logging.debug(
-                        "_check_for_changes: portal probe, same hash, "
-                        "no trigger"
-                    )
-            else:
-                self._suppress_next = False
-                logging.debug("_check_for_changes: portal probe, empty read")
-        except Exception as e:
+    def _on_local_probe_read(self, signature, error):
+        if error is not None:
+            if is_cancelled(error):
+                return
             self._suppress_next = False
-            logging.debug("_check_for_changes: portal probe failed: %s", e)
+            logging.debug(
+                "_check_for_changes: local probe failed: %s", error.message
+            )
+            return
+
+        if not signature.length:
+            self._suppress_next = False
+            logging.debug("_check_for_changes: local probe, empty read")
+            return
+        if signature.same_text(self._sentinel_signature):
+            self._suppress_next = False
+            return
+
+        if not signature.matches(self.text_signature):
+            logging.debug(
+                "_check_for_changes: TRIGGER via local probe "
+                "(text changed, is_local=True)"
+            )
+            self.text_signature = signature
+            self._schedule_callback(self._probe_polled)
+        else:
+            self._suppress_next = False
+            logging.debug(
+                "_check_for_changes: local probe, same text, no trigger"
+            )
 
     def _write_sentinel(self):
         """Write a sentinel to become wl_data_source owner.
@@ -358,6 +556,10 @@ class ClipboardMonitor:
         """
         if self.sentinel_written or self._sentinel_refused:
             return
+        if self.portal_active:
+            # The sentinel is only there to be cancelled, for want of being
+            # told about copies; the portal tells.
+            return
         try:
             provider = Gdk.ContentProvider.new_for_bytes(
                 "text/plain;charset=utf-8",
@@ -377,69 +579,112 @@ class ClipboardMonitor:
         except Exception as e:
             logging.debug("Failed to write sentinel: %s", e)
 
-    def _read_text_hash(self, is_initial: bool):
-        self.clipboard.read_text_async(None, self._on_text_read, is_initial)
+    def _probe_text(
+        self, polled: bool, is_initial: bool = False, full: bool = False
+    ):
+        read_signature(
+            self.clipboard,
+            lambda signature, error: self._on_text_probed(
+                signature, error, is_initial, full
+            ),
+            full=full,
+            cancellable=self._new_probe(polled),
+        )
 
-    def _on_text_read(self, clipboard, result, is_initial):
-        try:
-            text = clipboard.read_text_finish(result)
-            if text:
-                self._probe_failures = 0
-                self._stale_trigger_fired = False
-                if text == self.sentinel:
-                    logging.debug("_on_text_read: ignoring sentinel text")
-                    return
-                text_hash = hashlib.sha256(text.encode()).hexdigest()
-                if is_initial:
-                    self.last_text_hash = text_hash
-                elif text_hash != self.last_text_hash:
-                    logging.debug(
-                        "_check_for_changes: TRIGGER alert window "
-                        "(text hash mismatch)"
-                    )
-                    self.last_text_hash = text_hash
-                    self._schedule_callback()
-
-            elif not is_initial:
-                self._on_probe_failed("text read returned empty")
-        except Exception as e:
+    def _on_text_probed(self, signature, error, is_initial, full):
+        if error is not None:
+            if is_cancelled(error):
+                return
             if is_initial:
-                logging.debug("Could not read initial clipboard text: %s", e)
+                logging.debug(
+                    "Could not read initial clipboard text: %s", error.message
+                )
             else:
-                self._on_probe_failed(f"text read failed: {e}")
+                self._on_probe_failed(f"text read failed: {error.message}")
+            return
 
-    def _read_text_hash_and_finish(self):
-        self.clipboard.read_text_async(None, self._on_done_hash_ready)
+        if not signature.length:
+            if not is_initial:
+                self._on_probe_failed("text read returned empty")
+            return
 
-    def _on_done_hash_ready(self, clipboard, result):
-        try:
-            text = clipboard.read_text_finish(result)
-            if text:
-                self.last_text_hash = hashlib.sha256(text.encode()).hexdigest()
-            else:
-                self.last_text_hash = None
-        except Exception as e:
+        self._probe_failures = 0
+        self._stale_trigger_fired = False
+        suspected, self._change_suspected = self._change_suspected, False
+        if signature.same_text(self._sentinel_signature):
+            logging.debug("_on_text_probed: ignoring sentinel text")
+            return
+
+        if is_initial:
+            self.text_signature = signature
+            return
+
+        if signature.same_text(self.text_signature):
+            baseline = self.text_signature
+            if (
+                suspected
+                and not full
+                and not signature.is_whole
+                and baseline.digest is not None
+            ):
+                # Same length, same ends, and yet we were told something
+                # changed: only the whole text can say.
+                logging.debug(
+                    "_on_text_probed: %d bytes look unchanged, hashing all",
+                    signature.length,
+                )
+                self._change_suspected = True
+                self._probe_text(self._probe_polled, full=True)
+            return
+
+        logging.debug(
+            "_check_for_changes: TRIGGER alert window (text changed)"
+        )
+        self.text_signature = signature
+        self._schedule_callback(self._probe_polled)
+
+    def _read_text_signature_and_finish(self):
+        read_signature(
+            self.clipboard, self._on_done_signature_ready, full=True
+        )
+
+    def _on_done_signature_ready(self, signature, error):
+        if error is not None:
             logging.debug(
                 "Could not read final clipboard text "
                 "(expected if no text format available): %s",
-                e,
+                error.message,
             )
-            self.last_text_hash = None
+            self.text_signature = None
+        else:
+            self.text_signature = signature if signature.length else None
 
-        # The capture window just read the clipboard for real.
+        # The capture window just read the clipboard for real, and the user
+        # who copied once is likely to copy again.
         self._reset_probe_state()
+        self.note_activity()
         self._is_processing = False
         self._check_for_changes()
 
-    def _schedule_callback(self):
+    def _schedule_callback(self, polled: bool = False):
+        """Have the capture window opened for a copy just found.
+
+        Only a copy a poll tick found is the poll's detection: one the
+        `changed` signal or the portal reported would have been caught
+        however slowly the poll ran, and must not reset its backoff.
+        """
         if self._suppress_next:
             self._suppress_next = False
             logging.debug("_schedule_callback: suppressed (internal write)")
             return
         if not self._is_processing:
             self._is_processing = True
+            trace.start("capture")
+            if polled:
+                self._scheduler.note_detection()
             GLib.idle_add(self._fire_callback)
 
     def _fire_callback(self):
-        self.callback()
+        with trace.span("monitor callback"):
+            self.callback()
         return False
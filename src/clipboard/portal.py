@@ -0,0 +1,303 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Hearing about copies from the clipboard portal instead of polling.
+
+Wayland tells only the focused client that the selection changed, which is
+why the monitor polls once a second and holds a sentinel to be cancelled.
+A RemoteDesktop session with the Clipboard portal attached is told about
+every change, focused or not, through SelectionOwnerChanged. That signal is
+all this asks the portal for: the capture window still does the reading.
+
+The first session asks the user for consent; the restore token it hands back
+lets later runs skip the dialog. Everything is asynchronous and talks to
+whatever answers as `bus_name` on `connection`, so a stand-in for the portal
+on a private bus (tools/fake_clipboard_portal.py) exercises all of it.
+"""
+
+import logging
+from collections.abc import Callable
+from pathlib import Path
+from secrets import token_hex
+
+from gi.repository import Gio, GLib
+
+PORTAL_BUS = "org.freedesktop.portal.Desktop"
+PORTAL_PATH = "/org/freedesktop/portal/desktop"
+IFACE_REMOTE = "org.freedesktop.portal.RemoteDesktop"
+IFACE_CLIPBOARD = "org.freedesktop.portal.Clipboard"
+IFACE_REQUEST = "org.freedesktop.portal.Request"
+IFACE_SESSION = "org.freedesktop.portal.Session"
+
+# GNOME refuses a RemoteDesktop session that controls no input device.
+_DEVICE_KEYBOARD = 1
+
+# Until the user revokes it, so consent is asked for once.
+_PERSIST_UNTIL_REVOKED = 2
+
+
+def restore_token_path() -> Path:
+    return Path(GLib.get_user_data_dir()) / "serigy" / "portal-restore-token"
+
+
+class PortalWatcher:
+    """A clipboard portal session, reduced to "someone else copied".
+
+    `on_ready` runs once the portal grants clipboard access, `on_changed`
+    on every selection change it reports, and `on_lost` when there is no
+    session to be had or the one we had is gone; the caller polls then.
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[], None],
+        on_changed: Callable[[list[str]], None],
+        on_lost: Callable[[str], None],
+        connection: Gio.DBusConnection | None = None,
+        bus_name: str = PORTAL_BUS,
+        token_path: Path | None = None,
+    ):
+        self._on_ready = on_ready
+        self._on_changed = on_changed
+        self._on_lost = on_lost
+        self._connection = connection
+        self._bus_name = bus_name
+        self._token_path = token_path or restore_token_path()
+        self._session_handle: str | None = None
+        self._subscriptions: list[int] = []
+        self._closed = False
+        self.is_active = False
+
+    def start(self) -> None:
+        if self._connection is None:
+            try:
+                self._connection = Gio.bus_get_sync(Gio.BusType.SESSION)
+            except GLib.Error as e:
+                self._lose(f"no session bus: {e.message}")
+                return
+        self._create_session()
+
+    def close(self) -> None:
+        """End the session and stop reporting, without calling `on_lost`."""
+        self._closed = True
+        self.is_active = False
+        for subscription in self._subscriptions:
+            self._connection.signal_unsubscribe(subscription)
+        self._subscriptions.clear()
+
+        if self._session_handle:
+            self._connection.call(
+                self._bus_name,
+                self._session_handle,
+                IFACE_SESSION,
+                "Close",
+                None,
+                None,
+                Gio.DBusCallFlags.NONE,
+                -1,
+                None,
+                None,
+            )
+            self._session_handle = None
+
+    # Session setup
+
+    def _create_session(self) -> None:
+        options = {
+            "session_handle_token": GLib.Variant(
+                "s", f"serigy_{token_hex(8)}"
+            ),
+        }
+        self._request(
+            IFACE_REMOTE,
+            "CreateSession",
+            lambda opts: GLib.Variant("(a{sv})", (opts,)),
+            options,
+            self._on_session,
+        )
+
+    def _on_session(self, results: dict) -> None:
+        self._session_handle = results["session_handle"]
+        self._subscribe(
+            IFACE_SESSION, "Closed", self._session_handle, self._on_closed
+        )
+
+        options = {
+            "types": GLib.Variant("u", _DEVICE_KEYBOARD),
+            "persist_mode": GLib.Variant("u", _PERSIST_UNTIL_REVOKED),
+        }
+        restore_token = self._load_token()
+        if restore_token:
+            options["restore_token"] = GLib.Variant("s", restore_token)
+
+        self._request(
+            IFACE_REMOTE,
+            "SelectDevices",
+            lambda opts: GLib.Variant(
+                "(oa{sv})", (self._session_handle, opts)
+            ),
+            options,
+            self._on_devices,
+        )
+
+    def _on_devices(self, _results: dict) -> None:
+        # Has to come before Start, or the session starts without it.
+        self._call(
+            IFACE_CLIPBOARD,
+            "RequestClipboard",
+            GLib.Variant("(oa{sv})", (self._session_handle, {})),
+            self._on_clipboard_requested,
+        )
+
+    def _on_clipboard_requested(self, _reply: GLib.Variant) -> None:
+        self._request(
+            IFACE_REMOTE,
+            "Start",
+            # No parent window: this runs with no window of ours around.
+            lambda opts: GLib.Variant(
+                "(osa{sv})", (self._session_handle, "", opts)
+            ),
+            {},
+            self._on_started,
+        )
+
+    def _on_started(self, results: dict) -> None:
+        token = results.get("restore_token")
+        if token:
+            self._store_token(token)
+
+        if not results.get("clipboard_enabled", False):
+            self._lose("clipboard access was not granted")
+            return
+
+        self._subscribe(
+            IFACE_CLIPBOARD,
+            "SelectionOwnerChanged",
+            PORTAL_PATH,
+            self._on_owner_changed,
+        )
+        self.is_active = True
+        logging.debug("Clipboard portal session started")
+        self._on_ready()
+
+    # Monitoring
+
+    def _on_owner_changed(self, params: GLib.Variant) -> None:
+        session, options = params.unpack()
+        if session != self._session_handle:
+            return
+        if options.get("session_is_owner", False):
+            return
+        self._on_changed(list(options.get("mime_types", [])))
+
+    def _on_closed(self, _params: GLib.Variant) -> None:
+        self._session_handle = None
+        self._lose("the portal closed the session")
+
+    def _lose(self, why: str) -> None:
+        if self._closed:
+            return
+        logging.debug("Clipboard portal unavailable: %s", why)
+        self.close()
+        self._on_lost(why)
+
+    # D-Bus plumbing
+
+    def _subscribe(
+        self,
+        iface: str,
+        signal: str,
+        path: str,
+        handler: Callable[[GLib.Variant], None],
+    ) -> int:
+        subscription = self._connection.signal_subscribe(
+            self._bus_name,
+            iface,
+            signal,
+            path,
+            None,
+            Gio.DBusSignalFlags.NONE,
+            lambda _c, _s, _p, _i, _n, params: handler(params),
+        )
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def _call(
+        self,
+        iface: str,
+        method: str,
+        params: GLib.Variant,
+        on_reply: Callable[[GLib.Variant], None],
+    ) -> None:
+        def on_finished(connection, result):
+            if self._closed:
+                return
+            try:
+                reply = connection.call_finish(result)
+            except GLib.Error as e:
+                self._lose(f"{method} failed: {e.message}")
+                return
+            on_reply(reply)
+
+        self._connection.call(
+            self._bus_name,
+            PORTAL_PATH,
+            iface,
+            method,
+            params,
+            None,
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+            on_finished,
+        )
+
+    def _request(
+        self,
+        iface: str,
+        method: str,
+        build_params: Callable[[dict], GLib.Variant],
+        options: dict,
+        on_response: Callable[[dict], None],
+    ) -> None:
+        """Call a portal method that answers through a Request object.
+
+        The Response is subscribed to before the call, at the path the
+        portal is going to use, so it cannot arrive unheard.
+        """
+        token = f"serigy_{token_hex(8)}"
+        sender = self._connection.get_unique_name()[1:].replace(".", "_")
+        path = f"{PORTAL_PATH}/request/{sender}/{token}"
+        subscription = None
+
+        def on_response_signal(params: GLib.Variant) -> None:
+            self._connection.signal_unsubscribe(subscription)
+            self._subscriptions.remove(subscription)
+            response, results = params.unpack()
+            if self._closed:
+                return
+            if response != 0:
+                self._lose(f"{method} answered {response}")
+                return
+            on_response(results)
+
+        subscription = self._subscribe(
+            IFACE_REQUEST, "Response", path, on_response_signal
+        )
+        options = dict(options, handle_token=GLib.Variant("s", token))
+        self._call(iface, method, build_params(options), lambda _reply: None)
+
+    # Restore token
+
+    def _load_token(self) -> str | None:
+        try:
+            return self._token_path.read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def _store_token(self, token: str) -> None:
+        try:
+            self._token_path.parent.mkdir(parents=True, exist_ok=True)
+            self._token_path.write_text(token, encoding="utf-8")
+        except OSError as e:
+            logging.warning("Could not keep the portal restore token: %s", e)
@@ -0,0 +1,139 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Telling whether the clipboard text changed without hashing all of it.
+
+Every text probe used to read the whole clipboard as a string and SHA-256
+it, which for a multi-megabyte log paste meant decoding and hashing
+megabytes on every tick, for as long as it sat there. A probe now streams
+the bytes, keeping only their count and a fast checksum of the first and
+last few kilobytes. That settles nearly every tick; a full hash is only
+taken when those agree while a change is still suspected.
+"""
+
+import hashlib
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from gi.repository import Gdk, Gio, GLib
+
+# Whatever changes in a copy almost always changes its length or one of
+# its ends, and text that fits in both is compared whole.
+HEAD_BYTES = 4096
+TAIL_BYTES = 4096
+
+CHUNK_BYTES = 64 * 1024
+
+TEXT_MIME_TYPES = ["text/plain;charset=utf-8", "text/plain", "UTF8_STRING"]
+
+
+@dataclass(frozen=True)
+class TextSignature:
+    length: int
+    head: int
+    tail: int
+    # Of the whole text, only when it was asked for.
+    digest: str | None = None
+
+    @property
+    def is_whole(self) -> bool:
+        """Whether head and tail between them covered every byte."""
+        return self.length <= HEAD_BYTES + TAIL_BYTES
+
+    def matches(self, other: "TextSignature | None") -> bool:
+        """Same length, head and tail: the cheap tiers see no change."""
+        return (
+            other is not None
+            and self.length == other.length
+            and self.head == other.head
+            and self.tail == other.tail
+        )
+
+    def same_text(self, other: "TextSignature | None") -> bool:
+        """The best answer both signatures allow."""
+        if not self.matches(other):
+            return False
+        if self.digest is not None and other.digest is not None:
+            return self.digest == other.digest
+        return True
+
+
+class SignatureBuilder:
+    def __init__(self, full: bool = False):
+        self._length = 0
+        self._head = bytearray()
+        self._tail = b""
+        self._hash = hashlib.blake2b() if full else None
+
+    def feed(self, data: bytes) -> None:
+        self._length += len(data)
+        if len(self._head) < HEAD_BYTES:
+            self._head += data[: HEAD_BYTES - len(self._head)]
+        self._tail = (self._tail + data[-TAIL_BYTES:])[-TAIL_BYTES:]
+        if self._hash is not None:
+            self._hash.update(data)
+
+    def finish(self) -> TextSignature:
+        return TextSignature(
+            length=self._length,
+            head=zlib.crc32(self._head),
+            tail=zlib.crc32(self._tail),
+            digest=self._hash.hexdigest() if self._hash is not None else None,
+        )
+
+
+def signature_of(data: bytes, full: bool = False) -> TextSignature:
+    builder = SignatureBuilder(full)
+    builder.feed(data)
+    return builder.finish()
+
+
+def is_cancelled(error: GLib.Error) -> bool:
+    return error.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED)
+
+
+def read_signature(
+    clipboard: Gdk.Clipboard,
+    on_done: Callable[[TextSignature | None, GLib.Error | None], None],
+    full: bool = False,
+    cancellable: Gio.Cancellable | None = None,
+) -> None:
+    """Stream the clipboard text into a signature, never holding all of it.
+
+    `on_done` gets the signature, or the error that stopped the read; a
+    cancelled read reports a cancelled error, see `is_cancelled`.
+    """
+    builder = SignatureBuilder(full)
+
+    def on_stream(clipboard, result):
+        try:
+            stream, _mime_type = clipboard.read_finish(result)
+        except GLib.Error as e:
+            on_done(None, e)
+            return
+        stream.read_bytes_async(
+            CHUNK_BYTES, GLib.PRIORITY_DEFAULT, cancellable, on_chunk
+        )
+
+    def on_chunk(stream, result):
+        try:
+            chunk = stream.read_bytes_finish(result)
+        except GLib.Error as e:
+            stream.close_async(GLib.PRIORITY_DEFAULT, None, None)
+            on_done(None, e)
+            return
+
+        if chunk.get_size() == 0:
+            stream.close_async(GLib.PRIORITY_DEFAULT, None, None)
+            on_done(builder.finish(), None)
+            return
+
+        builder.feed(chunk.get_data())
+        stream.read_bytes_async(
+            CHUNK_BYTES, GLib.PRIORITY_DEFAULT, cancellable, on_chunk
+        )
+
+    clipboard.read_async(
+        TEXT_MIME_TYPES, GLib.PRIORITY_DEFAULT, cancellable, on_stream
+    )
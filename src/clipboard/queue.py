@@ -10,6 +10,9 @@ from typing import Any
 
 from gi.repository import GLib
 
+from serigy import stats, trace
+from serigy.slot_data import SlotData
+
 
 class ClipboardItemType(Enum):
     TEXT = "text"
@@ -25,6 +28,12 @@ class ClipboardItem:
     filename: str | None = None
     mime: str = ""
     uri: str = ""
+    # An image exactly as it is stored: encoded once, when captured, and
+    # written from this same buffer.
+    encoded: bytes | None = None
+    # The slot a text becomes, described on the capture worker; only the
+    # timestamp is left for when it is stored.
+    slot: SlotData | None = None
 
 
 class ClipboardQueue:
@@ -39,6 +48,7 @@ class ClipboardQueue:
     def add(self, item: ClipboardItem) -> bool:
         if item.content_hash == self._last_hash:
             logging.debug("Skipping duplicate clipboard item")
+            stats.count("queue.duplicates")
             return False
 
         self._last_hash = item.content_hash
@@ -69,7 +79,8 @@ class ClipboardQueue:
         item = self._queue.popleft()
 
         try:
-            self._process_callback(item)
+            with trace.span("queue item", type=item.item_type.value):
+                self._process_callback(item)
         except Exception as e:
             logging.error("Queue item processing failed: %s", e)
 
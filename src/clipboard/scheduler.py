@@ -0,0 +1,104 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""When to poll the clipboard next, kept free of GLib so it can be tested.
+
+A fixed second was wrong both ways. Copies come in bursts, right after the
+user did something, and a second is a long time to sit on one then; in the
+hours between, a wakeup every second found nothing, and cost battery. So the
+poll runs fast for a few seconds after anything happens and then backs off,
+doubling on every quiet tick up to a ceiling. While the session is locked or
+the system asked to save power it stops, and only the `changed` signal is
+left to notice a copy.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# Fast enough that a paste right after a copy finds it captured.
+FAST_INTERVAL_MS = 200
+FAST_WINDOW_MS = 3000
+
+# Where backing off starts once the fast window closes, and where it stops.
+IDLE_INTERVAL_MS = 1000
+MAX_INTERVAL_MS = 8000
+
+
+@dataclass
+class PollMetrics:
+    wakeups: int = 0
+    detections: int = 0
+    # For each copy found while polling, the time since the tick before:
+    # the longest it can have sat on the clipboard unnoticed.
+    latency_samples: int = 0
+    latency_total_ms: float = 0.0
+    latency_max_ms: float = 0.0
+
+    @property
+    def latency_mean_ms(self) -> float:
+        if not self.latency_samples:
+            return 0.0
+        return self.latency_total_ms / self.latency_samples
+
+
+class PollScheduler:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._last_activity: float | None = None
+        self._idle_interval = IDLE_INTERVAL_MS
+        self._last_tick: float | None = None
+        self._previous_tick: float | None = None
+        self._paused_for: set[str] = set()
+        self.metrics = PollMetrics()
+
+    @property
+    def paused(self) -> bool:
+        return bool(self._paused_for)
+
+    def set_paused(self, reason: str, paused: bool) -> None:
+        """Pause for `reason`, or lift it; polling resumes once none is left.
+
+        Reasons are kept apart so unlocking a session on power saver does
+        not start polling again.
+        """
+        if paused:
+            self._paused_for.add(reason)
+        else:
+            self._paused_for.discard(reason)
+            # The ticks before the pause say nothing about the wait since.
+            self._last_tick = self._previous_tick = None
+
+    def note_activity(self) -> None:
+        """Something happened that copies tend to follow."""
+        self._last_activity = self._clock()
+        self._idle_interval = IDLE_INTERVAL_MS
+
+    def is_fast(self) -> bool:
+        if self._last_activity is None:
+            return False
+        elapsed_ms = (self._clock() - self._last_activity) * 1000
+        return elapsed_ms < FAST_WINDOW_MS
+
+    def next_interval_ms(self) -> int:
+        if self.is_fast():
+            return FAST_INTERVAL_MS
+        interval = self._idle_interval
+        self._idle_interval = min(interval * 2, MAX_INTERVAL_MS)
+        return interval
+
+    def tick(self) -> None:
+        self.metrics.wakeups += 1
+        self._previous_tick, self._last_tick = self._last_tick, self._clock()
+
+    def note_detection(self) -> None:
+        """Count a copy the poll found, and how long it could have waited."""
+        self.metrics.detections += 1
+        if self._previous_tick is not None:
+            latency_ms = (self._clock() - self._previous_tick) * 1000
+            self.metrics.latency_samples += 1
+            self.metrics.latency_total_ms += latency_ms
+            self.metrics.latency_max_ms = max(
+                self.metrics.latency_max_ms, latency_ms
+            )
+        self.note_activity()
@@ -17,6 +17,7 @@ gi.require_versions({"Gtk": "4.0", "Adw": "1", "Gdk": "4.0"})
 
 from gi.repository import Adw, Gdk, GLib, Gtk
 
+from serigy import stats
 from serigy.clipboard.content import provider_for
 
 # The compositor is under no obligation to hand focus over, and the reason
@@ -80,6 +81,7 @@ class ClipboardWriter(Adw.Window):
             return False
 
         self._attempts += 1
+        stats.count("writer.retries")
         logging.debug("ClipboardWriter: attempt %d at focus", self._attempts)
         self.present()
         return True
@@ -99,6 +101,7 @@ class ClipboardWriter(Adw.Window):
         self._monitor.suppress_next_change()
         clipboard = Gdk.Display.get_default().get_clipboard()
         clipboard.set_content(provider)
+        stats.count("writer.writes")
         logging.debug("ClipboardWriter: content written")
 
         GLib.timeout_add(SETTLE_MS, self._close)
@@ -112,6 +115,8 @@ class ClipboardWriter(Adw.Window):
             GLib.source_remove(self._retry_timeout)
             self._retry_timeout = None
 
+        if failed:
+            stats.count("writer.failures")
         if failed and self._on_failed:
             self._on_failed()
         if self._on_finished:
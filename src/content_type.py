@@ -5,14 +5,22 @@
 
 Detection strategy:
 1. Check MIME type first (from clipboard metadata if available)
-2. Analyze ENTIRE content (not fragments)
-3. Use Python native tools (urllib.parse, ast, compiled regex)
+2. Match short content whole against the single-value types
+3. Look for code in a bounded window, cheapest test first
+4. Use Python native tools (urllib.parse, ast, compiled regex)
+
+Every stage is bounded by a size, not by the copy: a multi-megabyte paste
+used to go through `ast.parse` whole and have every keyword in it listed,
+only for the answer to be known after the first few. The benchmark in
+tools/bench_content_type.py holds both the answers and the time per
+megabyte to account.
 """
 
 import ast
 import re
 from enum import Enum
 from gettext import gettext as _
+from itertools import islice
 from urllib.parse import urlparse
 
 
@@ -51,6 +59,14 @@ class ContentType(Enum):
     def type_id(self) -> str:
         return self.value[0]
 
+    @classmethod
+    def from_type_id(cls, type_id: str) -> "ContentType":
+        """The type a stored `type_id` names; TEXT for one no longer known."""
+        for member in cls:
+            if member.type_id == type_id:
+                return member
+        return cls.TEXT
+
 
 # Compiled patterns (loaded once at module import)
 _EMAIL = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
@@ -68,11 +84,24 @@ _CODE_KEYWORDS = re.compile(
 )
 _CODE_SYNTAX = re.compile(r"(->|=>|::|&&|\|\||[{}\[\]();])")
 
+# A link, an address, a number or a colour is never longer than this, so
+# anything longer skips straight to the code stage.
+_VALUE_MAX_CHARS = 16 * 1024
+
+# How much of a long text the code stage reads. Code shows in its first
+# lines as plainly as anywhere; the rest only made the scans longer.
+_SAMPLE_CHARS = 16 * 1024
+
+# Past this, `ast.parse` is never called: its time and memory grow with the
+# text, and a window cut out of a longer one would not parse anyway.
+_PARSE_MAX_CHARS = 16 * 1024
+
 
 def detect(text: str, mime: str | None = None) -> ContentType:
     """Detect content type.
 
-    MIME checked first, then heuristics on full content.
+    MIME checked first, then heuristics, each on a bounded part of the
+    content whatever its size.
     """
     # MIME-based detection
     if mime:
@@ -81,20 +110,27 @@ def detect(text: str, mime: str | None = None) -> ContentType:
         if mime.startswith("application/"):
             return ContentType.FILE
 
-    text = text.strip()
-    if not text:
-        return ContentType.TEXT
-
-    # Single-line exact matches (entire content must match)
-    if _is_url(text):
-        return ContentType.LINK
-    if _EMAIL.fullmatch(text):
-        return ContentType.EMAIL
-    if _PHONE.fullmatch(text.replace(" ", "")):
-        return ContentType.PHONE
-    if _COLOR_HEX.fullmatch(text) or _COLOR_RGB.fullmatch(text):
-        return ContentType.COLOR
-    if _is_code(text):
+    if len(text) <= _VALUE_MAX_CHARS:
+        text = text.strip()
+        if not text:
+            return ContentType.TEXT
+
+        # Single-line exact matches (entire content must match)
+        if _is_url(text):
+            return ContentType.LINK
+        if _EMAIL.fullmatch(text):
+            return ContentType.EMAIL
+        if _PHONE.fullmatch(text.replace(" ", "")):
+            return ContentType.PHONE
+        if _COLOR_HEX.fullmatch(text) or _COLOR_RGB.fullmatch(text):
+            return ContentType.COLOR
+        complete = True
+    else:
+        complete = len(text) <= _SAMPLE_CHARS
+        # Stripping it all would copy it all, to find a few blanks.
+        text = text[:_SAMPLE_CHARS].strip()
+
+    if _is_code(text, complete):
         return ContentType.CODE
 
     return ContentType.TEXT
@@ -114,34 +150,38 @@ def _is_url(text: str) -> bool:
         return False
 
 
-def _is_code(text: str) -> bool:
+def _is_code(text: str, complete: bool = True) -> bool:
     """Detect if text is programming code.
 
-    Uses multiple strategies:
-    1. Try to parse as Python AST (catches Python code)
+    Uses multiple strategies, cheapest first:
+    1. Try to parse as Python AST (catches Python code), only for a whole
+       text no longer than `_PARSE_MAX_CHARS`
     2. Check for programming keywords
     3. Check for code syntax patterns
+
+    `complete` says whether `text` is all of the copy or a window of it.
     """
-    lines = text.split("\n")
-    if len(lines) < 2:
+    if "\n" not in text:
         return False
 
     # Strategy 1: Try to parse as valid Python
-    try:
-        ast.parse(text)
-        # If it parses and has multiple statements, likely code
-        return True
-    except SyntaxError:
-        pass
+    if complete and len(text) <= _PARSE_MAX_CHARS:
+        try:
+            ast.parse(text)
+            # If it parses and has multiple statements, likely code
+            return True
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # Nesting past the parser's limits is not code anyone copied.
+            pass
 
     # Strategy 2: Check for programming keywords (2+ keywords)
-    keyword_matches = len(_CODE_KEYWORDS.findall(text))
-    if keyword_matches >= 2:
+    if _has_matches(_CODE_KEYWORDS, text, 2):
         return True
 
     # Strategy 3: Check for code syntax patterns (3+ patterns)
-    syntax_matches = len(_CODE_SYNTAX.findall(text))
-    if syntax_matches >= 3:
-        return True
+    return _has_matches(_CODE_SYNTAX, text, 3)
+
 
-    return False
+def _has_matches(pattern: re.Pattern, text: str, count: int) -> bool:
+    """Whether `pattern` occurs `count` times, stopping at the last one."""
+    return len(list(islice(pattern.finditer(text), count))) == count
@@ -1,12 +1,22 @@
 # Copyright 2024-2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-import hashlib
 import logging
+import time
 
 import gi
 
-from serigy.clipboard import ClipboardItem, ClipboardItemType, ClipboardQueue
+from serigy import stats, trace
+from serigy.clipboard import (
+    ClipboardItem,
+    ClipboardItemType,
+    ClipboardQueue,
+    capture_files,
+    capture_text,
+    capture_texture,
+    read_text_capped,
+    reference_item,
+)
 from serigy.define import (
     RESOURCE_PATH,
     supported_file_formats,
@@ -15,9 +25,7 @@ from serigy.define import (
 )
 from serigy.settings import Settings
 
-gi.require_versions(
-    {"Gtk": "4.0", "Adw": "1", "Gdk": "4.0", "GdkPixbuf": "2.0"}
-)
+gi.require_versions({"Gtk": "4.0", "Adw": "1", "Gdk": "4.0"})
 from gi.repository import Adw, Gdk, Gio, GLib, Gtk
 
 
@@ -46,7 +54,9 @@ class CopyAlertWindow(Adw.Window):
         self._retry_count = 0
         self._capture_started = False
         self._closed = False
+        self._created = time.monotonic()
         self.connect("notify::is-active", self._on_focus_changed)
+        trace.start("focus wait")
 
         self._retry_timeout = GLib.timeout_add(3000, self._retry_focus)
         self._close_timeout = GLib.timeout_add(10000, self._force_close)
@@ -60,6 +70,7 @@ class CopyAlertWindow(Adw.Window):
             logging.debug(
                 "CopyAlertWindow: no focus after 3s, retrying present()"
             )
+            stats.count("capture_window.focus_retries")
             self.present()
         return False
 
@@ -69,6 +80,7 @@ class CopyAlertWindow(Adw.Window):
             logging.debug(
                 "CopyAlertWindow: force-closed after 10s without capture"
             )
+            stats.count("capture_window.focus_timeouts")
             self._close()
         return False
 
@@ -84,13 +96,19 @@ class CopyAlertWindow(Adw.Window):
         )
         if self.is_active() and not self._capture_started:
             self._capture_started = True
+            trace.finish("focus wait")
+            stats.observe(
+                "capture_window.focus_wait_ms",
+                (time.monotonic() - self._created) * 1000,
+            )
             # Focus can be gone by the time the capture ends, and an empty
             # clipboard has nothing to lose by being claimed now.
             self.application.clipboard_monitor.claim_clipboard()
             self._capture_and_queue()
 
     def _capture_and_queue(self) -> bool:
-        clipboard = Gdk.Display.get_default().get_clipboard()
+        # The one the monitor watches, so both look at the same clipboard.
+        clipboard = self.application.clipboard_monitor.clipboard
         formats = clipboard.get_formats().to_string().split(" ")
         current_formats_set = set(formats)
 
@@ -109,15 +127,22 @@ class CopyAlertWindow(Adw.Window):
         is_text = bool(set(supported_text_formats) & current_formats_set)
 
         if is_image:
+            trace.start("clipboard read", kind="image")
             clipboard.read_texture_async(None, self._on_texture_ready)
             return False
         elif is_file:
+            trace.start("clipboard read", kind="file")
             clipboard.read_value_async(
                 Gdk.FileList, GLib.PRIORITY_DEFAULT, None, self._on_files_ready
             )
             return False
         elif is_text:
-            clipboard.read_text_async(None, self._on_text_ready)
+            trace.start("clipboard read", kind="text")
+            read_text_capped(
+                clipboard,
+                Settings.get().max_capture_bytes,
+                self._on_text_ready,
+            )
             return False
 
         self._retry_count += 1
@@ -128,17 +153,18 @@ class CopyAlertWindow(Adw.Window):
         self._close()
         return False
 
-    def _on_text_ready(self, clipboard, result):
-        try:
-            text = clipboard.read_text_finish(result)
-            if text:
-                if self._sentinel and text == self._sentinel:
-                    self._close()
-                    return
-                for item in self._text_items(text):
+    def _on_text_ready(self, text: str | None, oversize: bool):
+        trace.finish("clipboard read")
+        if oversize:
+            self.application.notify_capture_too_large()
+        elif text and not (self._sentinel and text == self._sentinel):
+            for item in self._text_items(text):
+                if item.item_type == ClipboardItemType.TEXT:
+                    # Detection, and the file a long text is kept in, are
+                    # the worker's; the item is queued once they are done.
+                    capture_text(item, self.queue.add)
+                else:
                     self.queue.add(item)
-        except Exception as e:
-            logging.warning("Could not read the copied text: %s", e)
         self._close()
 
     def _text_items(self, text: str) -> list[ClipboardItem]:
@@ -152,8 +178,7 @@ class CopyAlertWindow(Adw.Window):
             uris = text.split()
             if all(uri.startswith("file://") for uri in uris):
                 items = (
-                    self._reference_item(Gio.File.new_for_uri(uri))
-                    for uri in uris
+                    reference_item(Gio.File.new_for_uri(uri)) for uri in uris
                 )
                 return [item for item in items if item]
 
@@ -161,34 +186,28 @@ class CopyAlertWindow(Adw.Window):
             ClipboardItem(
                 item_type=ClipboardItemType.TEXT,
                 data=text,
-                content_hash=hashlib.sha256(text.encode()).hexdigest(),
+                # Hashing reads all of the text, so the worker does it
+                # with the rest; the queue sees the item only after that.
+                content_hash="",
                 mime="text/plain",
             )
         ]
 
     def _on_texture_ready(self, clipboard, result):
+        trace.finish("clipboard read")
         try:
             texture = clipboard.read_texture_finish(result)
             if texture:
-                pixbuf = Gdk.pixbuf_get_from_texture(texture)
-                if pixbuf:
-                    success, buffer = pixbuf.save_to_bufferv("png", [], [])
-                    if success:
-                        content_hash = hashlib.sha256(buffer).hexdigest()
-                        filename = f"{content_hash}.png"
-                        item = ClipboardItem(
-                            item_type=ClipboardItemType.IMAGE,
-                            data=pixbuf,
-                            content_hash=content_hash,
-                            filename=filename,
-                            mime="image/png",
-                        )
-                        self.queue.add(item)
+                # The read was what needed focus. Encoding, hashing and
+                # writing happen on the worker, and the item reaches the
+                # queue from there once the file is on disk.
+                capture_texture(texture, self.queue.add)
         except Exception as e:
             logging.warning("Could not read the copied image: %s", e)
         self._close()
 
     def _on_files_ready(self, clipboard, result):
+        trace.finish("clipboard read")
         try:
             file_list = clipboard.read_value_finish(result)
         except GLib.Error as e:
@@ -196,76 +215,23 @@ class CopyAlertWindow(Adw.Window):
             self._close()
             return
 
-        for file in file_list or []:
-            item = self._image_item(file) or self._reference_item(file)
-            if item:
+        def queue_items(items: list[ClipboardItem]) -> None:
+            for item in items:
                 self.queue.add(item)
 
-        self._close()
-
-    def _image_item(self, file: Gio.File) -> ClipboardItem | None:
-        """Read the file as an image, when its bytes are within reach.
-
-        An image slot can be shown and pasted into anything that takes a
-        picture, which a uri cannot. Only apps under the same sandbox rules
-        hand over readable files, so this often fails.
-        """
-        try:
-            texture = Gdk.Texture.new_from_file(file)
-            pixbuf = Gdk.pixbuf_get_from_texture(texture)
-            content_type = file.query_info(
-                "standard::content-type", 0, None
-            ).get_content_type()
-        except GLib.Error as e:
-            logging.debug(
-                "Keeping %s as a reference: %s", file.get_uri(), e.message
-            )
-            return None
-
-        ext = content_type.rsplit("/", 1)[-1] if "/" in content_type else "png"
-        try:
-            success, buffer = pixbuf.save_to_bufferv(ext, [], [])
-        except GLib.Error:
-            ext = "png"
-            success, buffer = pixbuf.save_to_bufferv(ext, [], [])
-
-        if not success:
-            return None
-
-        content_hash = hashlib.sha256(buffer).hexdigest()
-        name = file.get_basename() or ""
-        stem = name.rsplit(".", 1)[0] if "." in name else name
-        return ClipboardItem(
-            item_type=ClipboardItemType.FILE,
-            data=pixbuf,
-            content_hash=content_hash,
-            filename=f"{stem}_{content_hash}.{ext}",
-            mime=f"image/{ext}",
-        )
-
-    def _reference_item(self, file: Gio.File) -> ClipboardItem | None:
-        """Point at the file, which is all the clipboard itself held.
-
-        The type comes from the name because reading the file is what we
-        cannot count on doing.
-        """
-        uri = file.get_uri()
-        if not uri:
-            return None
+        if file_list:
+            # Reading and decoding a copied picture is the worker's, like
+            # encoding a copied texture; the items are queued from there.
+            capture_files(list(file_list), queue_items)
 
-        name = file.get_basename() or uri
-        return ClipboardItem(
-            item_type=ClipboardItemType.FILE,
-            data=None,
-            content_hash=hashlib.sha256(uri.encode()).hexdigest(),
-            mime=Gio.content_type_guess(name, None)[0],
-            uri=uri,
-        )
+        self._close()
 
     def _close(self):
         if self._closed:
             return
         self._closed = True
+        if not self._capture_started:
+            trace.finish("focus wait", focused=False)
         if self._retry_timeout:
             GLib.source_remove(self._retry_timeout)
             self._retry_timeout = None
@@ -0,0 +1,689 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Where the slots live.
+
+They used to be a single `aas` value in GSettings, so every copy, pin and
+delete unpacked the whole list and had dconf write all of it back. Here each
+slot is a row: a copy is one row deleted and one written, whatever the size
+of the history.
+
+Behind the grid sits the archive, where copies go when newer ones push them
+out. It is never held in memory; it is read a page at a time, by whoever is
+scrolling through it, and searched by SQLite from a trigram table of its
+own.
+
+Image files are counted, not swept for: each row naming a file holds a
+reference, and a file is only let go once its last one is gone. Text kept
+in a blob file is counted the same way, in the same table.
+
+Free of GTK for the same reason as the image store; only the location of the
+file asks GLib anything.
+"""
+
+import logging
+import sqlite3
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from serigy.search_query import normalize, slot_id
+from serigy.slot_data import SlotData, content_key
+
+# Room left between neighbours, so moving a slot to the front or between
+# two others rewrites that one row instead of renumbering all of them.
+_RANK_STEP = 1024
+
+_COLUMNS = (
+    "text",
+    "filename",
+    "pin_status",
+    "timestamp",
+    "mime",
+    "uri",
+    "blob",
+    "text_size",
+    "kind",
+    "summary",
+    "search_text",
+    "result_id",
+    "meta_version",
+)
+
+_META_COLUMNS = _COLUMNS[_COLUMNS.index("kind") :]
+
+# What each schema version adds to the one before it, applied in order to
+# bring any older database up to date.
+_MIGRATIONS: dict[int, tuple[str, ...]] = {
+    1: (
+        """
+        CREATE TABLE slots (
+            id INTEGER PRIMARY KEY,
+            rank INTEGER NOT NULL,
+            key TEXT NOT NULL DEFAULT '',
+            text TEXT NOT NULL DEFAULT '',
+            filename TEXT NOT NULL DEFAULT '',
+            pin_status TEXT NOT NULL DEFAULT '',
+            timestamp TEXT NOT NULL DEFAULT '',
+            mime TEXT NOT NULL DEFAULT '',
+            uri TEXT NOT NULL DEFAULT ''
+        )
+        """,
+        "CREATE INDEX slots_rank ON slots (rank)",
+        "CREATE INDEX slots_key ON slots (key)",
+    ),
+    # Whatever a copy pushes out of the grid. Newest first is highest id.
+    2: (
+        """
+        CREATE TABLE archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL DEFAULT '',
+            filename TEXT NOT NULL DEFAULT '',
+            pin_status TEXT NOT NULL DEFAULT '',
+            timestamp TEXT NOT NULL DEFAULT '',
+            mime TEXT NOT NULL DEFAULT '',
+            uri TEXT NOT NULL DEFAULT ''
+        )
+        """,
+    ),
+    # How many rows, grid and archive together, name each image file. A file
+    # goes when its count reaches zero, instead of a sweep of the image
+    # directory after every write.
+    3: (
+        """
+        CREATE TABLE images (
+            filename TEXT PRIMARY KEY,
+            refs INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT INTO images (filename, refs)
+        SELECT filename, count(*) FROM (
+            SELECT filename FROM slots WHERE filename != ''
+            UNION ALL
+            SELECT filename FROM archive WHERE filename != ''
+        ) GROUP BY filename
+        """,
+    ),
+    # Long text kept in a file, named here; its count shares the images
+    # table, since the file sits next to them. Rows from before keep their
+    # text inline.
+    4: (
+        "ALTER TABLE slots ADD COLUMN blob TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE slots ADD COLUMN text_size INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE archive ADD COLUMN blob TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE archive ADD COLUMN text_size INTEGER NOT NULL DEFAULT 0",
+    ),
+    # What the content says about each slot, worked out at capture. Rows
+    # from before start at version 0 and are described on the next run.
+    5: (
+        "ALTER TABLE slots ADD COLUMN kind TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE slots ADD COLUMN summary TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE slots ADD COLUMN search_text TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE slots ADD COLUMN result_id TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE slots ADD COLUMN meta_version INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE archive ADD COLUMN kind TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE archive ADD COLUMN summary TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE archive ADD COLUMN search_text TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE archive ADD COLUMN result_id TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE archive "
+        "ADD COLUMN meta_version INTEGER NOT NULL DEFAULT 0",
+    ),
+    # The archive's search text cut into trigrams by SQLite, so the shell
+    # search finds archived copies without any of them held in memory.
+    # Kept in step by triggers; rows from before are indexed here.
+    6: (
+        """
+        CREATE VIRTUAL TABLE archive_search USING fts5(
+            search_text,
+            content = 'archive',
+            content_rowid = 'id',
+            tokenize = 'trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER archive_search_insert AFTER INSERT ON archive BEGIN
+            INSERT INTO archive_search (rowid, search_text)
+            VALUES (new.id, new.search_text);
+        END
+        """,
+        """
+        CREATE TRIGGER archive_search_delete AFTER DELETE ON archive BEGIN
+            INSERT INTO archive_search (archive_search, rowid, search_text)
+            VALUES ('delete', old.id, old.search_text);
+        END
+        """,
+        """
+        CREATE TRIGGER archive_search_update
+        AFTER UPDATE OF search_text ON archive BEGIN
+            INSERT INTO archive_search (archive_search, rowid, search_text)
+            VALUES ('delete', old.id, old.search_text);
+            INSERT INTO archive_search (rowid, search_text)
+            VALUES (new.id, new.search_text);
+        END
+        """,
+        "INSERT INTO archive_search (archive_search) VALUES ('rebuild')",
+    ),
+}
+
+# The most archived copies kept. Past this the oldest go, files and all,
+# so what the archive holds on disk has a ceiling however much is copied.
+ARCHIVE_MAX_ROWS = 100_000
+
+# Shorter terms have no trigram to look up, and are checked row by row.
+_SEARCH_GRAM = 3
+
+# Rows SQLite works through between looks at the clock.
+_PROGRESS_STEPS = 1000
+
+SCHEMA_VERSION = max(_MIGRATIONS)
+
+
+def _phrase(term: str) -> str:
+    """`term` quoted for an FTS5 query, so nothing in it reads as syntax."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def history_path() -> Path:
+    from gi.repository import GLib
+
+    return Path(GLib.get_user_data_dir()) / "serigy" / "history.db"
+
+
+@dataclass
+class _Row:
+    id: int
+    rank: int
+    key: str
+    slot: SlotData
+    # The slot's search result id, as the id map files it.
+    result_id: str = ""
+
+
+class History:
+    """The slots in grid order, one database row each.
+
+    The rows are also kept in memory, in order, so reading the slots never
+    touches the disk and every write knows which row it is about without
+    asking the database first.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        legacy: Callable[[], list[SlotData]] | None = None,
+    ):
+        """Open the history at `path`, creating it if need be.
+
+        A history created here is filled from `legacy`, the slots kept
+        before there was one, in the transaction that creates the schema:
+        were the two apart, a crash between them would leave an empty
+        history that no later run would fill.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit, so each write below is its own short transaction
+        # unless `batch` groups several.
+        self._db = sqlite3.connect(str(path), isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL already keeps the file consistent across a crash; a full sync
+        # on every copy would only buy the last copy surviving a power cut.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._depth = 0
+        # Image files whose last reference went in the open transaction.
+        self._released: set[str] = set()
+
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        # Bumped on every archive write, so a view of it can tell when what
+        # it paged in has gone stale.
+        self.archive_revision = 0
+        self._rows: list[_Row] = []
+        self._reindex()
+        self._ready = version >= SCHEMA_VERSION
+        if not self._ready:
+            self._upgrade(version, legacy)
+            self._ready = True
+
+        self._rows = self._load()
+        self._reindex()
+
+    def _upgrade(
+        self, version: int, legacy: Callable[[], list[SlotData]] | None
+    ) -> None:
+        with self.batch():
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                for statement in _MIGRATIONS[target]:
+                    self._db.execute(statement)
+            # A database without a schema is one this run created, and the
+            # slots it should hold are still where they were kept before.
+            if version == 0 and legacy is not None:
+                self.rewrite(legacy())
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _load(self) -> list[_Row]:
+        cursor = self._db.execute(
+            f"SELECT id, rank, key, {', '.join(_COLUMNS)} "
+            "FROM slots ORDER BY rank"
+        )
+        return [
+            _Row(id=row[0], rank=row[1], key=row[2], slot=SlotData(*row[3:]))
+            for row in cursor
+        ]
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Make every write inside one transaction.
+
+        A copy both drops the oldest slot and adds the new one, and a crash
+        between the two should leave neither done.
+        """
+        if self._depth == 0:
+            self._db.execute("BEGIN")
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._db.execute("ROLLBACK")
+                # What is in memory went ahead of what was rolled back;
+                # with the schema rolled back too, there was nothing.
+                self._rows = self._load() if self._ready else []
+                self._reindex()
+                self._released.clear()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self._db.execute("COMMIT")
+
+    def take_released(self) -> set[str]:
+        """Image files nothing names any more, to delete from disk.
+
+        Only ever asked for between transactions, so a file is never
+        deleted on the strength of a write that could still roll back.
+        """
+        released, self._released = self._released, set()
+        return released
+
+    def referenced_images(self) -> set[str]:
+        cursor = self._db.execute("SELECT filename FROM images")
+        return {row[0] for row in cursor}
+
+    def unreferenced(self, filenames: Iterable[str]) -> set[str]:
+        """Those of `filenames` that no slot or archived copy names."""
+        return {
+            filename
+            for filename in filenames
+            if filename
+            and self._db.execute(
+                "SELECT 1 FROM images WHERE filename = ?", (filename,)
+            ).fetchone()
+            is None
+        }
+
+    # Reading
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def slots(self) -> list[SlotData]:
+        return [row.slot for row in self._rows]
+
+    def entries(self) -> list[tuple[str, SlotData]]:
+        """The slots with their search result ids, in grid order."""
+        return [(row.result_id, row.slot) for row in self._rows]
+
+    def by_id(self, result_id: str) -> SlotData | None:
+        """The slot a search result id names, without hashing anything.
+
+        The shell asks for metas by id, a page of them per keystroke, and
+        scanning every slot's id for each one was slots times ids.
+        """
+        rows = self._by_id.get(result_id)
+        if not rows:
+            return None
+        # The same copy twice: the one further up the grid, as a scan
+        # would have found it.
+        return min(rows, key=lambda row: row.rank).slot
+
+    def find(self, key: str) -> int | None:
+        """Where the slot holding `key` sits, if any does."""
+        if not key:
+            return None
+        return next(
+            (i for i, row in enumerate(self._rows) if row.key == key), None
+        )
+
+    # Writing
+
+    def insert(self, index: int, slot: SlotData) -> None:
+        with self.batch():
+            rank = self._rank_at(index)
+            key = content_key(slot)
+            self._ref_files(slot)
+            cursor = self._db.execute(
+                f"INSERT INTO slots (rank, key, {', '.join(_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in _COLUMNS)})",
+                (rank, key, *self._values(slot)),
+            )
+            row = _Row(cursor.lastrowid, rank, key, slot)
+            self._rows.insert(index, row)
+            self._index_row(row)
+            # Back in the grid, so no longer part of the archive; it returns
+            # there, as its newest entry, once pushed out again.
+            if key and self._unarchive(key):
+                self.archive_revision += 1
+
+    def remove(self, index: int) -> SlotData:
+        with self.batch():
+            row = self._rows[index]
+            self._db.execute("DELETE FROM slots WHERE id = ?", (row.id,))
+            self._unref_files(row.slot)
+            self._unindex_row(row)
+            del self._rows[index]
+        return row.slot
+
+    def update(self, index: int, slot: SlotData) -> None:
+        row = self._rows[index]
+        if row.slot == slot:
+            return
+        key = content_key(slot)
+        with self.batch():
+            self._db.execute(
+                f"UPDATE slots SET key = ?, "
+                f"{', '.join(f'{c} = ?' for c in _COLUMNS)} WHERE id = ?",
+                (key, *self._values(slot), row.id),
+            )
+            if (slot.filename, slot.blob) != (
+                row.slot.filename,
+                row.slot.blob,
+            ):
+                self._ref_files(slot)
+                self._unref_files(row.slot)
+            self._unindex_row(row)
+            row.key = key
+            row.slot = slot
+            self._index_row(row)
+
+    def move(self, source: int, target: int) -> None:
+        if source == target:
+            return
+        with self.batch():
+            row = self._rows.pop(source)
+            row.rank = self._rank_at(target)
+            self._db.execute(
+                "UPDATE slots SET rank = ? WHERE id = ?", (row.rank, row.id)
+            )
+            self._rows.insert(target, row)
+
+    def rewrite(self, slots: list[SlotData]) -> None:
+        """Make the history `slots`, writing only the rows that differ.
+
+        Used where the whole list is rewritten at once, like arranging or
+        emptying the grid. A pin toggle coming through here still writes
+        just the one slot it changed.
+        """
+        with self.batch():
+            for i, slot in enumerate(slots[: len(self._rows)]):
+                self.update(i, slot)
+            for slot in slots[len(self._rows) :]:
+                self.insert(len(self._rows), slot)
+            while len(self._rows) > len(slots):
+                self.remove(len(self._rows) - 1)
+
+    # Archive
+
+    def archive(self, slot: SlotData) -> None:
+        """Keep a slot the grid is letting go of."""
+        key = content_key(slot)
+        if not key:
+            return
+        with self.batch():
+            self._unarchive(key)
+            self._ref_files(slot)
+            cursor = self._db.execute(
+                f"INSERT INTO archive (key, {', '.join(_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in _COLUMNS)})",
+                (key, *self._values(slot)),
+            )
+            # Ids only grow, so no more than the cap can sit above this
+            # one; a range on the key, never a count of the table.
+            self._drop_archived(
+                "id <= ?", (cursor.lastrowid - ARCHIVE_MAX_ROWS,)
+            )
+            self.archive_revision += 1
+
+    def expire_archived(self, before: int) -> bool:
+        """Drop archived copies made before `before`, bar pinned ones.
+
+        For auto-clear, which would otherwise only empty the grid and leave
+        every copy it pushed out kept on disk. Whether any went.
+        """
+        with self.batch():
+            expired = self._drop_archived(
+                "pin_status != 'pinned' AND timestamp GLOB '[0-9]*' "
+                "AND CAST(timestamp AS INTEGER) < ?",
+                (before,),
+            )
+            if expired:
+                self.archive_revision += 1
+        return expired
+
+    def _drop_archived(self, where: str, values: tuple) -> bool:
+        cursor = self._db.execute(
+            f"DELETE FROM archive WHERE {where} RETURNING filename, blob",
+            values,
+        )
+        removed = cursor.fetchall()
+        for filename, blob in removed:
+            self._unref(filename)
+            self._unref(blob)
+        return bool(removed)
+
+    def stale_archived(
+        self, version: int, limit: int
+    ) -> list[tuple[int, SlotData]]:
+        """Archived slots not described by `version`, newest first."""
+        cursor = self._db.execute(
+            f"SELECT id, {', '.join(_COLUMNS)} FROM archive "
+            "WHERE meta_version != ? ORDER BY id DESC LIMIT ?",
+            (version, limit),
+        )
+        return [(row[0], SlotData(*row[1:])) for row in cursor]
+
+    def describe_archived(self, row_id: int, slot: SlotData) -> None:
+        """Store the derived fields of an archived slot, and nothing else.
+
+        A row gone since it was read is simply not found.
+        """
+        self._db.execute(
+            f"UPDATE archive SET "
+            f"{', '.join(f'{c} = ?' for c in _META_COLUMNS)} WHERE id = ?",
+            (*(getattr(slot, c) for c in _META_COLUMNS), row_id),
+        )
+
+    def archived_row(self, row_id: int) -> SlotData | None:
+        row = self._db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM archive WHERE id = ?",
+            (row_id,),
+        ).fetchone()
+        return SlotData(*row) if row is not None else None
+
+    def search_archive(
+        self, terms: list[str], limit: int, budget_ms: float
+    ) -> list[tuple[int, SlotData]]:
+        """Up to `limit` archived slots holding every term, newest first.
+
+        Terms of three characters or more are looked up in the trigram
+        table; shorter ones are checked on the rows it gives, or on every
+        row when there is nothing to look up. The query is cut off once
+        `budget_ms` is spent, with what it has found by then.
+        """
+        wanted = [normalize(term) for term in terms if term]
+        if not wanted:
+            return []
+        long = [term for term in wanted if len(term) >= _SEARCH_GRAM]
+        short = [term for term in wanted if len(term) < _SEARCH_GRAM]
+
+        if long:
+            # Walked newest first, so it stops at `limit` instead of
+            # gathering every match of a common term before sorting.
+            source = (
+                "archive_search JOIN archive ON archive.id = "
+                "archive_search.rowid WHERE archive_search MATCH ? "
+            )
+            order = "archive_search.rowid"
+            values: list[str | int] = [
+                " AND ".join(_phrase(term) for term in long)
+            ]
+        else:
+            source, order, values = "archive WHERE 1 ", "archive.id", []
+        source += "".join(
+            "AND instr(archive.search_text, ?) > 0 " for _ in short
+        )
+        values += short
+
+        deadline = time.perf_counter() + budget_ms / 1000
+        self._db.set_progress_handler(
+            lambda: time.perf_counter() > deadline, _PROGRESS_STEPS
+        )
+        found = []
+        try:
+            cursor = self._db.execute(
+                f"SELECT archive.id, "
+                f"{', '.join(f'archive.{c}' for c in _COLUMNS)} "
+                f"FROM {source}ORDER BY {order} DESC LIMIT ?",
+                (*values, limit),
+            )
+            for row in cursor:
+                found.append((row[0], SlotData(*row[1:])))
+        except sqlite3.OperationalError as e:
+            # Interrupted by the clock: what came back is still an answer.
+            logging.debug("Archive search cut short: %s", e)
+        finally:
+            self._db.set_progress_handler(None, 0)
+        return found
+
+    def archived_count(self) -> int:
+        return self._db.execute("SELECT count(*) FROM archive").fetchone()[0]
+
+    def archived(self, offset: int, limit: int) -> list[SlotData]:
+        """One page of the archive, newest first."""
+        cursor = self._db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM archive "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [SlotData(*row) for row in cursor]
+
+    def clear_archive(self) -> None:
+        with self.batch():
+            cursor = self._db.execute(
+                "DELETE FROM archive WHERE filename != '' OR blob != '' "
+                "RETURNING filename, blob"
+            )
+            for filename, blob in cursor.fetchall():
+                self._unref(filename)
+                self._unref(blob)
+            self._db.execute("DELETE FROM archive")
+            self.archive_revision += 1
+
+    def _unarchive(self, key: str) -> bool:
+        cursor = self._db.execute(
+            "DELETE FROM archive WHERE key = ? RETURNING filename, blob",
+            (key,),
+        )
+        removed = cursor.fetchall()
+        for filename, blob in removed:
+            self._unref(filename)
+            self._unref(blob)
+        return bool(removed)
+
+    # Search ids
+
+    def _reindex(self) -> None:
+        self._by_id: dict[str, list[_Row]] = {}
+        for row in self._rows:
+            self._index_row(row)
+
+    def _index_row(self, row: _Row) -> None:
+        # Stored with the slot since it was described, so this is a read
+        # for all but slots from before.
+        row.result_id = slot_id(row.slot)
+        if row.result_id:
+            self._by_id.setdefault(row.result_id, []).append(row)
+
+    def _unindex_row(self, row: _Row) -> None:
+        rows = self._by_id.get(row.result_id)
+        if rows is None:
+            return
+        rows.remove(row)
+        if not rows:
+            del self._by_id[row.result_id]
+
+    # Image references
+
+    def _ref_files(self, slot: SlotData) -> None:
+        self._ref(slot.filename)
+        self._ref(slot.blob)
+
+    def _unref_files(self, slot: SlotData) -> None:
+        self._unref(slot.filename)
+        self._unref(slot.blob)
+
+    def _ref(self, filename: str) -> None:
+        if not filename:
+            return
+        self._db.execute(
+            "INSERT INTO images (filename, refs) VALUES (?, 1) "
+            "ON CONFLICT (filename) DO UPDATE SET refs = refs + 1",
+            (filename,),
+        )
+        # Let go of and taken back within one write, like a slot that is
+        # dropped and copied in again: still needed.
+        self._released.discard(filename)
+
+    def _unref(self, filename: str) -> None:
+        if not filename:
+            return
+        self._db.execute(
+            "UPDATE images SET refs = refs - 1 WHERE filename = ?",
+            (filename,),
+        )
+        cursor = self._db.execute(
+            "DELETE FROM images WHERE filename = ? AND refs <= 0",
+            (filename,),
+        )
+        if cursor.rowcount > 0:
+            self._released.add(filename)
+
+    def _values(self, slot: SlotData) -> tuple[str | int, ...]:
+        return tuple(getattr(slot, column) for column in _COLUMNS)
+
+    def _rank_at(self, index: int) -> int:
+        """A rank that sorts a new row into position `index`."""
+        if not self._rows:
+            return 0
+        if index <= 0:
+            return self._rows[0].rank - _RANK_STEP
+        if index >= len(self._rows):
+            return self._rows[-1].rank + _RANK_STEP
+
+        before, after = self._rows[index - 1].rank, self._rows[index].rank
+        if after - before > 1:
+            return (before + after) // 2
+
+        # Out of room between the two. Rare enough that spreading every row
+        # out again is cheaper than anything cleverer.
+        logging.debug("Renumbering %d history rows", len(self._rows))
+        for i, row in enumerate(self._rows):
+            row.rank = i * _RANK_STEP
+            self._db.execute(
+                "UPDATE slots SET rank = ? WHERE id = ?", (row.rank, row.id)
+            )
+        return self._rank_at(index)
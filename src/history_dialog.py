@@ -0,0 +1,172 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+import weakref
+from gettext import gettext as _
+from typing import TYPE_CHECKING
+
+from gi.repository import Adw, Gdk, Gio, Gtk, Pango
+
+from serigy.archive_model import ArchiveItem, ArchiveModel
+from serigy.clipboard.content import provider_for
+from serigy.define import RESOURCE_PATH
+from serigy.search_query import basename
+from serigy.settings import Settings
+from serigy.slot_data import SlotData
+from serigy.slot_display import relative_time
+from serigy.slot_meta import content_type_of, summary_of
+
+if TYPE_CHECKING:
+    from serigy.window import SerigyWindow
+
+
+class HistoryRow(Gtk.Box):
+    """A line of the history: what the copy was, and when."""
+
+    __gtype_name__ = "HistoryRow"
+
+    def __init__(self) -> None:
+        super().__init__(
+            spacing=12, margin_top=6, margin_bottom=6, margin_start=6
+        )
+        self.icon = Gtk.Image()
+        self.title = Gtk.Label(
+            xalign=0, ellipsize=Pango.EllipsizeMode.END, single_line_mode=True
+        )
+        self.subtitle = Gtk.Label(xalign=0)
+        self.subtitle.add_css_class("dimmed")
+        self.subtitle.add_css_class("caption")
+
+        labels = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        labels.append(self.title)
+        labels.append(self.subtitle)
+        self.append(self.icon)
+        self.append(labels)
+
+    def show_slot(self, slot: SlotData) -> None:
+        if slot.text:
+            content_type = content_type_of(slot)
+            self.icon.set_from_icon_name(content_type.icon)
+            self.title.set_label(summary_of(slot) or content_type.name)
+            type_name = content_type.name
+        elif slot.filename:
+            self.icon.set_from_icon_name("image-x-generic-symbolic")
+            self.title.set_label(_("Image"))
+            type_name = _("Image")
+        else:
+            self.icon.set_from_gicon(
+                Gio.content_type_get_symbolic_icon(
+                    slot.mime or "application/octet-stream"
+                )
+            )
+            self.title.set_label(basename(slot.uri) or slot.uri)
+            type_name = _("File")
+
+        rel_time = relative_time(slot.timestamp)
+        self.subtitle.set_label(
+            f"{type_name} • {rel_time}" if rel_time else type_name
+        )
+
+
+@Gtk.Template(resource_path=f"{RESOURCE_PATH}/gtk/history-dialog.ui")
+class HistoryDialog(Adw.Dialog):
+    """Everything copies have pushed out of the slots, newest first."""
+
+    __gtype_name__ = "HistoryDialog"
+
+    stack: Gtk.Stack = Gtk.Template.Child()
+    list_view: Gtk.ListView = Gtk.Template.Child()
+    clear_button: Gtk.Button = Gtk.Template.Child()
+
+    def __init__(self, window: "SerigyWindow", **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._window_ref = weakref.ref(window)
+
+        self._model = ArchiveModel()
+        self._model.connect("items-changed", self._on_items_changed)
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_setup)
+        factory.connect("bind", self._on_bind)
+
+        self.list_view.set_model(Gtk.NoSelection.new(model=self._model))
+        self.list_view.set_factory(factory)
+        self.list_view.connect("activate", self._on_activate)
+        self.clear_button.connect("clicked", self._on_clear_clicked)
+        self.connect("closed", self._on_closed)
+
+        self._update_page()
+
+    def _on_setup(
+        self, _factory: Gtk.SignalListItemFactory, list_item: Gtk.ListItem
+    ) -> None:
+        list_item.set_child(HistoryRow())
+
+    def _on_bind(
+        self, _factory: Gtk.SignalListItemFactory, list_item: Gtk.ListItem
+    ) -> None:
+        item: ArchiveItem | None = list_item.get_item()
+        if item is not None:
+            list_item.get_child().show_slot(item.slot)
+
+    def _on_items_changed(self, model, _position, _removed, _added) -> None:
+        self._update_page()
+
+    def _update_page(self) -> None:
+        has_items = self._model.get_n_items() > 0
+        self.stack.props.visible_child_name = (
+            "list_page" if has_items else "empty_page"
+        )
+        self.clear_button.props.sensitive = has_items
+
+    def _on_activate(self, _list_view: Gtk.ListView, position: int) -> None:
+        item: ArchiveItem | None = self._model.get_item(position)
+        if item is None:
+            return
+
+        window = self._window_ref()
+        provider = provider_for(item.slot)
+        if provider is None:
+            logging.warning("Nothing left to copy for this history entry")
+            if window is not None:
+                window.toast_overlay.add_toast(
+                    Adw.Toast(title=_("Could not copy"), timeout=1)
+                )
+            return
+
+        # Copied out by the user, so not a copy to capture back in.
+        app = window.get_application() if window is not None else None
+        if app is not None:
+            app.clipboard_monitor.suppress_next_change()
+        Gdk.Display.get_default().get_clipboard().set_content(provider)
+
+        self.close()
+        if window is not None:
+            window.toast_overlay.add_toast(
+                Adw.Toast(title=_("Copied to clipboard"), timeout=1)
+            )
+
+    def _on_clear_clicked(self, _button: Gtk.Button) -> None:
+        alert_dialog = Adw.AlertDialog(
+            heading=_("Clear history?"),
+            body=_(
+                "Everything kept behind the slots will be erased. "
+                "The slots themselves are left alone."
+            ),
+            close_response="cancel",
+        )
+        alert_dialog.add_response("cancel", _("Cancel"))
+        alert_dialog.add_response("clear", _("Clear"))
+        alert_dialog.set_response_appearance(
+            "clear", Adw.ResponseAppearance.DESTRUCTIVE
+        )
+
+        def on_response(alert_dialog: Adw.AlertDialog, task: Gio.Task):
+            if alert_dialog.choose_finish(task) == "clear":
+                Settings.get().clear_archive()
+
+        alert_dialog.choose(self, None, on_response)
+
+    def _on_closed(self, _dialog: Adw.Dialog) -> None:
+        self._model.close()
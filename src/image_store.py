@@ -7,10 +7,18 @@ Images used to be written to the cache directory, which the system is free to
 sweep at any time, so a purge silently emptied slots the user had pinned.
 They now live in the data directory, and whatever the sweep left behind is
 moved there on startup.
+
+Text too long to keep in a history row is stored here as well, as a file
+named by its hash, and counted and swept the same way as the images.
 """
 
 import logging
+import mmap
+import os
 import shutil
+import stat
+import tempfile
+import time
 from collections.abc import Iterable
 from pathlib import Path
 
@@ -41,33 +49,225 @@ def image_path(filename: str) -> Path:
     return path
 
 
-def store_image(pixbuf, filename: str) -> bool:
-    """Write `pixbuf` as `filename`, reporting whether it ended up on disk."""
+def store_image(data: bytes, filename: str) -> bool:
+    """Write an already encoded image as `filename`, exactly as given.
+
+    The bytes go to a temporary file first and are renamed into place, so
+    the final name only ever holds a whole image: a crash mid-write leaves a
+    stray temporary for the next sweep, not a half-written file that a slot
+    points at and cannot render.
+
+    Its thumbnail is made here too, while the image is at hand, so the grid
+    never has to decode the full image to show it.
+
+    Safe to call off the main loop: it touches nothing but files.
+    """
     path = images_dir() / filename
     if path.exists():
         return True
 
-    fmt = filename.rsplit(".", 1)[-1] if "." in filename else "png"
     try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        pixbuf.savev(str(path), fmt, [], [])
-    except Exception as e:
+        _write_atomically(path, data)
+    except OSError as e:
         logging.error("Failed to save clipboard image %s: %s", filename, e)
         return False
+
+    store_thumbnail(filename)
     return True
 
 
+def _write_atomically(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+    except OSError:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+
+# Thumbnails
+
+# A card at twice its size, so the thumbnail stays sharp on a scaled
+# display. Part of the thumbnail's name: a new size makes new thumbnails
+# rather than stretching the old ones.
+THUMBNAIL_SIZE = (540, 260)
+
+
+def thumbnails_dir() -> Path:
+    # Unlike the images, these can be made again from what is kept, so the
+    # cache is the right place for them.
+    from gi.repository import GLib
+
+    return Path(GLib.get_user_cache_dir()) / "serigy" / "thumbnails"
+
+
+def thumbnail_path(filename: str) -> Path:
+    width, height = THUMBNAIL_SIZE
+    return thumbnails_dir() / f"{filename}@{width}x{height}.png"
+
+
+def store_thumbnail(filename: str) -> Path | None:
+    """Make the card-sized copy of a stored image, if it needs one.
+
+    Scaled to cover a card, the way the card crops it. Returns None for an
+    image already no bigger than that, or one that could not be read; the
+    image itself is what gets shown then.
+    """
+    path = thumbnail_path(filename)
+    if path.exists():
+        return path
+
+    from gi.repository import GdkPixbuf, GLib
+
+    source = str(image_path(filename))
+    try:
+        info, width, height = GdkPixbuf.Pixbuf.get_file_info(source)
+        if info is None or width <= 0 or height <= 0:
+            return None
+
+        box_width, box_height = THUMBNAIL_SIZE
+        scale = max(box_width / width, box_height / height)
+        if scale >= 1:
+            return None
+
+        # Decoded straight to the smaller size, never held at full size.
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+            source,
+            max(1, round(width * scale)),
+            max(1, round(height * scale)),
+            False,
+        )
+        success, data = pixbuf.save_to_bufferv("png", [], [])
+    except GLib.Error as e:
+        logging.warning("Could not thumbnail %s: %s", filename, e.message)
+        return None
+
+    if not success:
+        return None
+    try:
+        _write_atomically(path, data)
+    except OSError as e:
+        logging.warning("Could not save thumbnail of %s: %s", filename, e)
+        return None
+    return path
+
+
+def thumbnail_for(filename: str) -> Path:
+    """What a card should load to show `filename`.
+
+    The thumbnail, made now if an image stored before thumbnails existed
+    lacks one; the image itself if it is small enough not to need one.
+    """
+    return store_thumbnail(filename) or image_path(filename)
+
+
+# Text blobs
+
+# Past this, a copy's text is kept in a file of its own and its slot holds
+# a preview. Every row is loaded when the history opens and rewritten with
+# each edit, so a multi-megabyte log paste in one cost every read and write
+# of the grid.
+INLINE_TEXT_BYTES = 64 * 1024
+
+# Plenty for a card's few lines and a search meta's summary.
+PREVIEW_CHARS = 512
+
+
+def text_blob_name(digest: str) -> str:
+    """Name a text by its SHA-256, the hash its copy is known by anyway."""
+    return f"{digest}.txt"
+
+
+def text_blob_path(name: str) -> Path:
+    return images_dir() / name
+
+
+def store_text_blob(data: bytes, name: str) -> bool:
+    """Write UTF-8 text as `name`, the way `store_image` writes an image."""
+    path = text_blob_path(name)
+    if path.exists():
+        return True
+    try:
+        _write_atomically(path, data)
+    except OSError as e:
+        logging.error("Failed to save copied text %s: %s", name, e)
+        return False
+    return True
+
+
+def load_text_blob(name: str) -> str | None:
+    """The whole text stored as `name`, or None if it cannot be read.
+
+    Mapped rather than read, so the file's pages come straight from the
+    page cache and only the decoded string is a copy.
+    """
+    path = text_blob_path(name)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return str(data, "utf-8", errors="replace")
+    except OSError as e:
+        logging.warning("Could not read copied text %s: %s", name, e)
+        return None
+
+
+def full_text(slot) -> str | None:
+    """All of a slot's text, loaded from its blob if it has one.
+
+    None only for a blob that is gone; pasting the preview in its place
+    would hand over a truncated copy without saying so.
+    """
+    if slot.blob:
+        return load_text_blob(slot.blob)
+    return slot.text
+
+
+def delete_images(filenames: Iterable[str]) -> None:
+    """Delete images, and text blobs, the history no longer names."""
+    for filename in filenames:
+        for path in (
+            images_dir() / filename,
+            legacy_dir() / filename,
+            thumbnail_path(filename),
+        ):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning("Could not remove %s: %s", path, e)
+
+
+# How long an unnamed file is left alone by `prune`. The capture worker
+# writes a copy's files, and their temporaries, before any row names them,
+# and the copy can wait in the queue a while after that.
+PRUNE_GRACE_SECONDS = 10 * 60
+
+
 def prune(filenames: Iterable[str]) -> None:
-    """Delete every stored image that no slot names.
+    """Delete every stored image, and thumbnail, that no slot names.
 
     A slot is the only thing that gives a file a reason to exist, so the
     names the slots carry are the whole truth about what belongs on disk.
-    Sweeping, rather than deleting one name at a time, also collects what a
-    crash between writing an image and saving its slot left behind.
+    The history's reference counts keep that true write by write; this
+    sweep is the rare reconciliation behind them, for what a crash between
+    writing an image and saving its slot left behind.
+
+    Files modified within `PRUNE_GRACE_SECONDS` are spared, temporaries
+    included: those can belong to a capture still on its way to a slot.
+    A crash's leftovers are old by the next sweep.
     """
     keep = {name for name in filenames if name}
+    # Thumbnails go with their image, and any of an old size go regardless.
+    keep |= {thumbnail_path(name).name for name in keep}
+    cutoff = time.time() - PRUNE_GRACE_SECONDS
 
-    for directory in (images_dir(), legacy_dir()):
+    for directory in (images_dir(), legacy_dir(), thumbnails_dir()):
         try:
             entries = list(directory.iterdir())
         except FileNotFoundError:
@@ -77,9 +277,12 @@ def prune(filenames: Iterable[str]) -> None:
             continue
 
         for path in entries:
-            if path.name in keep or not path.is_file():
+            if path.name in keep:
                 continue
             try:
+                info = path.stat()
+                if not stat.S_ISREG(info.st_mode) or info.st_mtime > cutoff:
+                    continue
                 path.unlink()
             except FileNotFoundError:
                 pass
@@ -87,6 +290,24 @@ def prune(filenames: Iterable[str]) -> None:
                 logging.warning("Could not remove %s: %s", path, e)
 
 
+def stored_bytes() -> int:
+    """What the images, thumbnails and long texts take on disk.
+
+    A walk of the directories, so it is for when someone asks, like the
+    statistics, and never for a hot path.
+    """
+    total = 0
+    for directory in (images_dir(), thumbnails_dir()):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
 def migrate(filenames: Iterable[str]) -> set[str]:
     """Move still-cached images into the data directory.
 
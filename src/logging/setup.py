@@ -13,6 +13,8 @@ from serigy.define import APP_ID, PROFILE, VERSION, cache_dir
 CONSOLE_FORMATTER = "serigy.logging.color_log_formatter.ColorLogFormatter"
 FILE_HANDLER = "serigy.logging.session_file_handler.SessionFileHandler"
 
+LOG_DIR = cache_dir / "serigy" / "logs"
+
 
 def setup_logging() -> None:
     """Intitate the app's logging"""
@@ -25,7 +27,7 @@ def setup_logging() -> None:
         "LIBLOGLEVEL", profile_lib_log_level
     ).upper()
 
-    log_filename = cache_dir / "serigy" / "logs" / "serigy.log"
+    log_filename = LOG_DIR / "serigy.log"
 
     config = {
         "version": 1,
@@ -10,22 +10,28 @@ from typing import Any
 
 import gi
 
+from serigy import stats, trace
 from serigy.auto_cleaner import AutoCleaner
 from serigy.clipboard import (
     ClipboardManager,
     ClipboardMonitor,
     ClipboardQueue,
     ClipboardWriter,
+    sweep_images,
 )
 from serigy.copy_alert_window import CopyAlertWindow
 from serigy.define import APP_ID, RESOURCE_PATH, VERSION
+from serigy.history_dialog import HistoryDialog
 from serigy.image_store import migrate as migrate_images
-from serigy.logging.setup import log_system_info, setup_logging
+from serigy.image_store import stored_bytes
+from serigy.logging.setup import LOG_DIR, log_system_info, setup_logging
 from serigy.preferences import PreferencesDialog
 from serigy.search_provider import SearchProvider
 from serigy.settings import Settings
 from serigy.setup_shortcut_portal import setup as setup_shortcut_portal
 from serigy.slot_data import SlotData
+from serigy.stats_provider import StatsProvider
+from serigy.watchdog import StallWatchdog, threshold_from_environment
 from serigy.welcome_dialog import WelcomeDialog
 
 gi.require_versions({"Gtk": "4.0", "Adw": "1", "Xdp": "1.0"})
@@ -42,6 +48,9 @@ class SerigyApplication(Adw.Application):
             application_id=APP_ID,
             flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE
             | Gio.ApplicationFlags.CAN_OVERRIDE_APP_ID,
+            # Only so GTK tracks screensaver-active: nobody copies into a
+            # locked session, and the monitor stops polling through it.
+            register_session=True,
         )
         self.create_action("about", self.on_about_action)
         self.create_action("open-window", self._on_open_window_action)
@@ -56,6 +65,7 @@ class SerigyApplication(Adw.Application):
         self.create_action(
             "activate-monitoring", self._on_activate_monitoring_action
         )
+        self.create_action("history", self.on_history_action, ["<primary>h"])
         self.create_action("quit", self._on_quit, ["<primary>q"])
         self.create_action(
             "toggle_incognito",
@@ -73,6 +83,30 @@ class SerigyApplication(Adw.Application):
             _("Call copy function"),
             None,
         )
+        self.add_main_option(
+            "trace",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.NONE,
+            _("Record where captures spend their time"),
+            None,
+        )
+        self.add_main_option(
+            "trace-export",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.NONE,
+            _("Write the recorded trace to the logs folder"),
+            None,
+        )
+        self.add_main_option(
+            "stats",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.NONE,
+            _("Print the running service's statistics"),
+            None,
+        )
 
         self.is_copy = False
         self._app_ready = False
@@ -95,6 +129,8 @@ class SerigyApplication(Adw.Application):
         self._auto_cleaner = None
         self._welcome_dialog = None
         self._search_provider = None
+        self._stats_provider = None
+        self._watchdog = None
         self._clipboard_writer = None
 
     def on_clipboard_changed(self):
@@ -187,6 +223,7 @@ class SerigyApplication(Adw.Application):
 
     def _update_monitor_state(self):
         settings = Settings.get()
+        self.clipboard_monitor.set_use_portal(settings.clipboard_portal)
         if settings.monitor_clipboard and not settings.incognito_mode:
             self.clipboard_monitor.start()
         else:
@@ -201,6 +238,22 @@ class SerigyApplication(Adw.Application):
 
         self._update_background_status()
 
+    def _on_session_locked(self, *args):
+        self.clipboard_monitor.set_paused(
+            "session locked", self.props.screensaver_active
+        )
+
+    def _on_power_saver_changed(self, monitor, *args):
+        self.clipboard_monitor.set_paused(
+            "power saver", monitor.get_power_saver_enabled()
+        )
+
+    def _on_active_window_changed(self, *args):
+        # A window of ours in front is a user about to copy from, or into,
+        # the history.
+        if self.props.active_window is not None:
+            self.clipboard_monitor.note_activity()
+
     def _update_background_status(self):
         """Say in Background Apps what we are really doing.
 
@@ -237,6 +290,9 @@ class SerigyApplication(Adw.Application):
 
     def _on_terminate(self, *args):
         self.clipboard_monitor.stop()
+        if self._watchdog is not None:
+            self._watchdog.stop()
+            self._watchdog = None
         self.release()
         return False
 
@@ -293,6 +349,12 @@ class SerigyApplication(Adw.Application):
 
         log_system_info()
 
+        threshold_ms = threshold_from_environment()
+        if threshold_ms is not None:
+            # First, so that the rest of startup is watched as well.
+            self._watchdog = StallWatchdog(threshold_ms)
+            self._watchdog.start()
+
         # Everything from here on belongs to the process that stays: startup
         # runs in the primary instance only, while __init__ runs in every
         # process, including the short-lived client that forwards a command
@@ -315,11 +377,26 @@ class SerigyApplication(Adw.Application):
         Settings.get().connect(
             "changed::monitor-clipboard", self._on_monitor_setting_changed
         )
+        Settings.get().connect(
+            "changed::clipboard-portal", self._on_monitor_setting_changed
+        )
         self._update_monitor_state()
 
+        self.connect("notify::screensaver-active", self._on_session_locked)
+        self.connect("notify::active-window", self._on_active_window_changed)
+        self._power_monitor = Gio.PowerProfileMonitor.dup_default()
+        self._power_monitor.connect(
+            "notify::power-saver-enabled", self._on_power_saver_changed
+        )
+        self._on_power_saver_changed(self._power_monitor)
+
         self._auto_cleaner = AutoCleaner(self.get_active_window)
 
+        self._register_gauges()
+
         self._migrate_images()
+        GLib.idle_add(self._reconcile_images, priority=GLib.PRIORITY_LOW)
+        GLib.idle_add(self._describe_stale_slots, priority=GLib.PRIORITY_LOW)
 
         self._request_shortcuts()
 
@@ -361,12 +438,22 @@ class SerigyApplication(Adw.Application):
             # Losing the search is worth a log line; losing the app is not.
             logging.error("Could not register the search provider: %s", e)
             self._search_provider = None
+
+        try:
+            self._stats_provider = StatsProvider()
+            self._stats_provider.register(connection, f"{object_path}/Stats")
+        except Exception as e:
+            logging.error("Could not register the statistics: %s", e)
+            self._stats_provider = None
         return True
 
     def do_dbus_unregister(self, connection, object_path):
         if self._search_provider is not None:
             self._search_provider.unregister(connection)
             self._search_provider = None
+        if self._stats_provider is not None:
+            self._stats_provider.unregister(connection)
+            self._stats_provider = None
         Adw.Application.do_dbus_unregister(self, connection, object_path)
 
     def do_activate(self) -> None:
@@ -429,6 +516,14 @@ class SerigyApplication(Adw.Application):
                 )
                 self._welcome_dialog.present(win)
 
+    def _register_gauges(self):
+        metrics = self.clipboard_monitor.poll_metrics
+        stats.gauge("poll.wakeups", lambda: metrics.wakeups)
+        stats.gauge("poll.detections", lambda: metrics.detections)
+        stats.gauge("poll.latency_mean_ms", lambda: metrics.latency_mean_ms)
+        stats.gauge("poll.latency_max_ms", lambda: metrics.latency_max_ms)
+        stats.gauge("image_store.bytes", stored_bytes)
+
     def _migrate_images(self):
         slots = Settings.get().slots
         missing = migrate_images(slot.filename for slot in slots)
@@ -443,6 +538,26 @@ class SerigyApplication(Adw.Application):
                 slots[i] = SlotData()
         Settings.get().slots = slots
 
+    def _reconcile_images(self):
+        """Sweep the image directories once a run, when nothing else is due.
+
+        Writes keep the reference counts right on their own; this is only
+        for files a crash left without a slot, so once per run is plenty.
+        The capture worker writes a copy's files before any slot names
+        them, so the sweep leaves recent files alone rather than count on
+        running between a write and its slot.
+
+        Only the names are read here, the database being this thread's;
+        the directories are listed on the capture worker.
+        """
+        sweep_images(Settings.get().referenced_images())
+        return GLib.SOURCE_REMOVE
+
+    def _describe_stale_slots(self):
+        """Bring slots described by an older detector up to date, once."""
+        self.clipboard_manager.describe_stale_slots()
+        return GLib.SOURCE_REMOVE
+
     def _clear_activation_pending(self):
         """Take back the pending state and the notice that announced it."""
         if not self._activation_pending:
@@ -478,10 +593,10 @@ class SerigyApplication(Adw.Application):
         monitor = self.clipboard_monitor
         self._activation_checked = True
         has_content = bool(monitor.clipboard.get_formats().to_string())
-        if monitor.owns_clipboard or has_content:
-            # Our sentinel is there to be cancelled, or someone else's content
-            # is there to be read, and a read going stale wakes the capture
-            # window on its own.
+        if monitor.owns_clipboard or monitor.portal_active or has_content:
+            # Our sentinel is there to be cancelled, the portal tells us about
+            # copies outright, or someone else's content is there to be read,
+            # and a read going stale wakes the capture window on its own.
             self._clear_activation_pending()
             self._update_background_status()
             return True
@@ -506,6 +621,16 @@ class SerigyApplication(Adw.Application):
         self.send_notification("clipboard-activation", notification)
         return True
 
+    def notify_capture_too_large(self):
+        """Say a copy was let go for its size, instead of losing it quietly."""
+        notification = Gio.Notification.new(_("Copy Not Captured"))
+        notification.set_body(
+            _("Copied text over {} MB is not kept.").format(
+                Settings.get().max_capture_mb
+            )
+        )
+        self.send_notification("capture-too-large", notification)
+
     def _on_activate_monitoring_action(self, *args):
         logging.debug("activate-monitoring action invoked")
         self._clear_activation_pending()
@@ -564,6 +689,12 @@ class SerigyApplication(Adw.Application):
         prefs = PreferencesDialog(self.props.active_window)
         prefs.present(self.props.active_window)
 
+    def on_history_action(self, *args: tuple) -> None:
+        win = self.props.active_window
+        if win is None:
+            return
+        HistoryDialog(win).present(win)
+
     def on_shortcuts_action(self, *args: tuple) -> None:
         builder = Gtk.Builder()
         builder.add_from_resource(f"{RESOURCE_PATH}/gtk/shortcuts-dialog.ui")
@@ -604,7 +735,19 @@ class SerigyApplication(Adw.Application):
         if "copy" in commands:
             self.is_copy = True
 
-        self.do_activate()
+        if "trace" in commands:
+            trace.enable()
+            logging.info("Tracing captures, see --trace-export")
+
+        if "stats" in commands:
+            # Answered by this, the primary instance, which is the one
+            # that has been counting; the client only prints it.
+            command_line.print_literal(stats.format_report())
+        elif "trace-export" in commands:
+            # Only asks for a file; the window has nothing to do with it.
+            self._export_trace(command_line)
+        else:
+            self.do_activate()
 
         # The client that forwarded this command line waits for the reply,
         # and the reply is only sent when this object is finalized. Under
@@ -615,6 +758,21 @@ class SerigyApplication(Adw.Application):
         command_line.done()
         return 0
 
+    def _export_trace(self, command_line: Gio.ApplicationCommandLine):
+        if not trace.enabled():
+            command_line.printerr_literal(
+                _("Nothing recorded: start tracing with --trace") + "\n"
+            )
+            return
+        try:
+            path = trace.export(LOG_DIR)
+        except OSError as e:
+            logging.error("Could not write the trace: %s", e)
+            command_line.printerr_literal(f"{e}\n")
+            return
+        logging.info("Trace written to %s", path)
+        command_line.print_literal(f"{path}\n")
+
 
 def main(version: str) -> int:
     app = SerigyApplication()
@@ -4,6 +4,7 @@
 import logging
 import shutil
 import weakref
+from dataclasses import replace
 from gettext import gettext as _
 from typing import TYPE_CHECKING, Any
 
@@ -14,12 +15,13 @@ from serigy.clipboard.content import (
     text_provider,
     texture_provider,
 )
-from serigy.content_type import detect as detect_content_type
 from serigy.define import RESOURCE_PATH
-from serigy.image_store import image_path
+from serigy.image_store import full_text, image_path
 from serigy.settings import Settings
 from serigy.slot_data import SlotData
 from serigy.slot_display import relative_time
+from serigy.slot_meta import content_type_of
+from serigy.texture_cache import TextureCache
 
 if TYPE_CHECKING:
     from serigy.window import SerigyWindow
@@ -88,11 +90,11 @@ class OverlayButton(Gtk.Overlay):
         self._update_pin_tooltip(is_pinned)
 
         if label:
-            content_type = detect_content_type(label, slot.mime)
+            content_type = content_type_of(slot)
             self.type_icon.set_from_icon_name(content_type.icon)
             self.label.set_text(label)
             self._main_btn_handler = self.main_button.connect(
-                "clicked", self.copy_text_to_clipboard, label
+                "clicked", self.copy_text_to_clipboard
             )
             self._create_text_menu()
             self._update_info_label(content_type.name, timestamp)
@@ -102,21 +104,14 @@ class OverlayButton(Gtk.Overlay):
             self.filename = filename
             self.type_icon.set_from_icon_name("image-x-generic-symbolic")
 
-            try:
-                file_path = str(image_path(filename))
-                self.file_path = file_path
-                texture = Gdk.Texture.new_from_filename(file_path)
-                self._main_btn_handler = self.main_button.connect(
-                    "clicked", self._copy_image_sync, texture
-                )
-            except GLib.Error as e:
-                logging.warning(
-                    "Failed to load image %s: %s", filename, e.message
-                )
-                self.revealer_crossfade.set_reveal_child(False)
-                return
-            else:
-                GLib.idle_add(self.image.set_paintable, texture)
+            self.file_path = str(image_path(filename))
+            self._main_btn_handler = self.main_button.connect(
+                "clicked", self._copy_image_sync
+            )
+            # Binding never waits on a decode: the card shows its header
+            # until the thumbnail arrives. The full image is only worth
+            # decoding for the copy it makes.
+            TextureCache.get().load(filename, self._on_texture_loaded)
 
             self._create_image_menu()
             self._update_info_label(_("Image"), timestamp)
@@ -142,6 +137,15 @@ class OverlayButton(Gtk.Overlay):
         # Remove 'osd' class if present (cleanup from old style)
         self.delete_button.add_css_class("flat")
 
+    def _on_texture_loaded(self, texture: Gdk.Texture | None) -> None:
+        if self._list_item is None:
+            # Unbound while the picture was on its way.
+            return
+        if texture is None:
+            self.revealer_crossfade.set_reveal_child(False)
+            return
+        self.image.set_paintable(texture)
+
     @property
     def parent(self) -> "SerigyWindow | None":
         """Safe access to parent window via weak reference."""
@@ -160,7 +164,7 @@ class OverlayButton(Gtk.Overlay):
         position = self._list_item.get_position()
         if position == Gtk.INVALID_LIST_POSITION:
             return None
-        if position >= len(Settings.get().slots):
+        if position >= len(Settings.get().slots_snapshot):
             return None
         return position
 
@@ -169,7 +173,7 @@ class OverlayButton(Gtk.Overlay):
         index = self.slot_index
         if index is None:
             return None
-        return Settings.get().slots[index]
+        return Settings.get().slots_snapshot[index]
 
     def _update_info_label(self, type_str: str, timestamp_str: str) -> None:
         """Update slot info label with type and relative time."""
@@ -231,12 +235,12 @@ class OverlayButton(Gtk.Overlay):
         if index is None:
             return
 
-        slots = Settings.get().slots
         is_active: bool = button.get_active()
-        slots[index].pin_status = "pinned" if is_active else ""
-        parent = self.parent
-        if parent is not None:
-            parent.update_slots(slots)
+        slot = Settings.get().slots_snapshot[index]
+        # One row changes, and whether the grid is empty does not.
+        Settings.get().update_slot(
+            index, replace(slot, pin_status="pinned" if is_active else "")
+        )
         self._update_pin_tooltip(is_active)
 
     def _on_save_image(
@@ -272,22 +276,25 @@ class OverlayButton(Gtk.Overlay):
         self, action: Gio.SimpleAction, param: GLib.Variant | None
     ) -> None:
         """Copy text in uppercase."""
-        if self.text_content:
-            self._copy_formatted(self.text_content.upper())
+        text = self._full_text()
+        if text:
+            self._copy_formatted(text.upper())
 
     def _on_copy_lowercase(
         self, action: Gio.SimpleAction, param: GLib.Variant | None
     ) -> None:
         """Copy text in lowercase."""
-        if self.text_content:
-            self._copy_formatted(self.text_content.lower())
+        text = self._full_text()
+        if text:
+            self._copy_formatted(text.lower())
 
     def _on_copy_titlecase(
         self, action: Gio.SimpleAction, param: GLib.Variant | None
     ) -> None:
         """Copy text in title case."""
-        if self.text_content:
-            self._copy_formatted(self.text_content.title())
+        text = self._full_text()
+        if text:
+            self._copy_formatted(text.title())
 
     def _copy_to_clipboard(self, content: Gdk.Texture) -> None:
         """Copy texture content to system clipboard."""
@@ -361,9 +368,22 @@ class OverlayButton(Gtk.Overlay):
         clipboard.set_content(text_provider(text))
         self._copy_done()
 
-    def copy_text_to_clipboard(self, widget: Gtk.Button, text: str) -> None:
+    def copy_text_to_clipboard(self, widget: Gtk.Button) -> None:
         """Copy slot text to clipboard."""
-        self._copy_formatted(text)
+        text = self._full_text()
+        if text is not None:
+            self._copy_formatted(text)
+
+    def _full_text(self) -> str | None:
+        """All of the slot's text, not just what the card shows.
+
+        A long text's card holds only its start; the file is read here, for
+        the copy, never when the card is bound.
+        """
+        slot = self.slot
+        if slot is not None and slot.blob:
+            return full_text(slot)
+        return self.text_content
 
     def _copy_file_to_clipboard(self, widget: Gtk.Button, uri: str) -> None:
         """Put the file back on the clipboard as a file, not as its path."""
@@ -372,17 +392,24 @@ class OverlayButton(Gtk.Overlay):
         clipboard.set_content(file_provider(Gio.File.new_for_uri(uri)))
         self._copy_done()
 
-    def _copy_image_sync(
-        self, widget: Gtk.Button, texture: Gdk.Texture
-    ) -> None:
+    def _copy_image_sync(self, widget: Gtk.Button) -> None:
         """Copy image to clipboard with UI feedback."""
         parent = self.parent
         if parent is not None:
             parent.stack.props.visible_child_name = "loading_page"
-        self._copy_to_clipboard(texture)
+        try:
+            texture = Gdk.Texture.new_from_filename(self.file_path)
+        except GLib.Error as e:
+            logging.warning(
+                "Failed to load image %s: %s", self.filename, e.message
+            )
+            texture = None
+        else:
+            self._copy_to_clipboard(texture)
         if parent is not None:
             parent.stack.props.visible_child_name = "slots_page"
-        self._copy_done()
+        if texture is not None:
+            self._copy_done()
 
     def remove(self, widget: Gtk.Button) -> None:
         """Empty this slot and auto-arrange the grid if that is enabled."""
@@ -1,24 +1,29 @@
 # Copyright 2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""org.gnome.Shell.SearchProvider2 over the stored slots.
+"""org.gnome.Shell.SearchProvider2 over the stored slots and the archive.
 
 Activating a text result costs nothing: the shell writes the clipboard
 itself, from the `clipboardText` it was already handed to draw the row. An
 image or a file cannot travel in that field, so those are written by us,
 which needs focus and can therefore fail.
+
+The grid is searched in memory, ranked and forgiving of typos. The archive
+is searched by SQLite behind it, for exact matches, newest first, so none
+of it is ever loaded to answer a keystroke.
 """
 
 import logging
+import time
 from gettext import gettext as _
 
 from gi.repository import Gio, GLib
 
-from serigy import search_query
-from serigy.content_type import detect as detect_content_type
+from serigy import search_query, stats
 from serigy.image_store import image_path
 from serigy.settings import Settings
-from serigy.slot_display import relative_time, summary
+from serigy.slot_display import relative_time
+from serigy.slot_meta import content_type_of, summary_of
 
 INTERFACE_XML = """
 <node>
@@ -55,6 +60,11 @@ class SearchProvider:
         self._application = application
         self._registration_id: int | None = None
         self._node = Gio.DBusNodeInfo.new_for_xml(INTERFACE_XML)
+        self._index = search_query.SearchIndex()
+        self._indexed_version: int | None = None
+        # Archive rows by id, for the archived results last handed over:
+        # the only ones the shell can ask metas for or activate.
+        self._archived: dict[str, int] = {}
 
     def register(self, connection: Gio.DBusConnection, object_path: str):
         self._registration_id = connection.register_object(
@@ -89,6 +99,8 @@ class SearchProvider:
                     GLib.Variant("(as)", (self._search(terms),))
                 )
             elif method_name == "GetSubsearchResultSet":
+                # The index narrows its own last answer, which unlike the
+                # one the shell holds was never cut to the best few.
                 _previous, terms = parameters.unpack()
                 invocation.return_value(
                     GLib.Variant("(as)", (self._search(terms),))
@@ -122,21 +134,61 @@ class SearchProvider:
             )
 
     def _search(self, terms: list[str]) -> list[str]:
-        """Answer the overview.
+        """Answer the overview with the best few slots, best first.
+
+        Only those are answered, so only those have metas built for them.
+        """
+        settings = Settings.get()
+        if settings.incognito_mode:
+            return []
 
-        A subsearch is recomputed rather than narrowed from the previous
-        answer: a copy landing mid-typing belongs in the list, and the
-        matching is cheap enough that keeping state would buy nothing.
+        start = time.perf_counter()
+        if self._indexed_version != settings.slots_version:
+            self._index.sync(settings.slot_entries)
+            self._indexed_version = settings.slots_version
+
+        results = self._index.search(terms)
+        self._archived = {}
+        if len(results) < search_query.MAX_RESULTS:
+            results += self._search_archive(settings, terms, results)
+        stats.count("search.queries")
+        stats.observe(
+            "search.latency_ms", (time.perf_counter() - start) * 1000
+        )
+        return results
+
+    def _search_archive(
+        self, settings: Settings, terms: list[str], found: list[str]
+    ) -> list[str]:
+        """Archived matches to follow the grid's, as many as there is room.
+
+        Listing the whole history for the app's name stops at the grid.
         """
-        if Settings.get().incognito_mode:
+        if search_query.is_app_name_query(terms):
             return []
-        return search_query.result_ids(Settings.get().slots, terms)
+        ids = []
+        for row, slot in settings.search_archive(
+            terms, search_query.MAX_RESULTS - len(found)
+        ):
+            identifier = search_query.slot_id(slot)
+            if identifier and identifier not in found + ids:
+                self._archived[identifier] = row
+                ids.append(identifier)
+        return ids
+
+    def _slot(self, settings: Settings, identifier: str):
+        """The slot behind a result, in the grid or else in the archive."""
+        slot = settings.slot_by_id(identifier)
+        if slot is not None:
+            return slot
+        row = self._archived.get(identifier)
+        return settings.archived_row(row) if row is not None else None
 
     def _metas(self, identifiers: list[str]) -> list[dict]:
-        slots = Settings.get().slots
+        settings = Settings.get()
         metas = []
         for identifier in identifiers:
-            slot = search_query.find(slots, identifier)
+            slot = self._slot(settings, identifier)
             if slot is None:
                 # The shell throws if it gets back fewer metas than it
                 # asked for, and takes the whole section down with it. A
@@ -156,17 +208,20 @@ class SearchProvider:
         meta = {"id": GLib.Variant("s", identifier)}
 
         if slot.text:
-            content_type = detect_content_type(slot.text, slot.mime)
+            content_type = content_type_of(slot)
             meta["name"] = GLib.Variant(
-                "s", summary(slot.text) or content_type.name
+                "s", summary_of(slot) or content_type.name
             )
             meta["description"] = GLib.Variant(
                 "s", self._description(content_type.name, slot.timestamp)
             )
             # No icon for text: the overview would draw a generic-document
             # glyph that looks like a file, which is misleading for a copy
-            # the shell is about to put on the clipboard.
-            meta["clipboardText"] = GLib.Variant("s", slot.text)
+            # the shell is about to put on the clipboard. Long text stays
+            # out of the meta, which would carry megabytes over the bus for
+            # every result shown; it is written on activation instead.
+            if not slot.blob:
+                meta["clipboardText"] = GLib.Variant("s", slot.text)
         elif slot.filename:
             meta["name"] = GLib.Variant("s", _("Image"))
             meta["description"] = GLib.Variant(
@@ -215,9 +270,9 @@ class SearchProvider:
             logging.debug("Search activation refused, incognito is on")
             return
 
-        slot = search_query.find(settings.slots, identifier)
+        slot = self._slot(settings, identifier)
 
-        if slot is not None and slot.text:
+        if slot is not None and slot.text and not slot.blob:
             # The shell has written it already. Left alone, the monitor
             # would see that write and store the same text as a new copy.
             self._application.clipboard_monitor.suppress_next_change()
@@ -8,7 +8,11 @@ back ids, which is all the D-Bus layer passes on and all a test needs.
 """
 
 import hashlib
+import heapq
+import re
+import time
 import unicodedata
+from collections.abc import Callable
 from urllib.parse import unquote
 
 APP_NAME = "serigy"
@@ -20,6 +24,11 @@ APP_NAME_MIN_CHARS = 3
 
 _ID_LENGTH = 16
 
+# How much of a text is searched: the most a slot keeps inline, so a text
+# kept in a blob file is searched as far as an inline one, and its row and
+# its place in the index are no bigger.
+SEARCH_WINDOW_CHARS = 64 * 1024
+
 
 def normalize(text: str) -> str:
     """Fold case and drop accents, so "manutenção" answers "manutencao"."""
@@ -40,27 +49,32 @@ def is_app_name_query(terms: list[str]) -> bool:
     return len(term) >= APP_NAME_MIN_CHARS and APP_NAME.startswith(term)
 
 
+def search_text(text: str) -> str:
+    """What of a copied text a search matches, folded.
+
+    Its first `SEARCH_WINDOW_CHARS`: worked out on the capture worker and
+    stored with the slot, so a search never reads or folds a long text.
+    """
+    return normalize(text[:SEARCH_WINDOW_CHARS])
+
+
 def _haystack(slot) -> str:
     """Everything of a slot a term is allowed to match.
 
     An image has no words of its own; the cached file name is a hash, and
-    matching it would only produce results nobody asked for.
+    matching it would only produce results nobody asked for. What a slot
+    was described with is folded already; one not described yet is folded
+    here from what the slot holds, never from a blob's file, so the main
+    loop does not pay for a long text on a keystroke.
     """
+    if slot.is_described:
+        return slot.search_text
     parts = [slot.text]
     if slot.uri:
         parts.append(basename(slot.uri))
     return normalize(" ".join(part for part in parts if part))
 
 
-def matches(slot, terms: list[str]) -> bool:
-    """Every term has to be found; the overview splits on blanks."""
-    wanted = [normalize(term) for term in terms if term]
-    if not wanted:
-        return False
-    hay = _haystack(slot)
-    return all(term in hay for term in wanted)
-
-
 def slot_id(slot) -> str:
     """A name for a slot that survives the grid moving underneath it.
 
@@ -68,6 +82,16 @@ def slot_id(slot) -> str:
     Enter shifts every slot by one, and the user would activate a
     neighbour.
     """
+    if slot.is_described:
+        return slot.result_id
+    return content_id(slot)
+
+
+def content_id(slot) -> str:
+    """The id `slot_id` gives a slot, worked out from its content."""
+    if slot.blob:
+        # The blob is named by the same digest, so no need to read it.
+        return f"t:{slot.blob[:_ID_LENGTH]}"
     if slot.text:
         return f"t:{_digest(slot.text)}"
     if slot.filename:
@@ -81,34 +105,385 @@ def _digest(value: str) -> str:
     return hashlib.sha256(value.encode()).hexdigest()[:_ID_LENGTH]
 
 
-def result_ids(slots, terms: list[str]) -> list[str]:
-    """The ids to hand the shell, in grid order, which is recency order."""
-    if is_app_name_query(terms):
-        chosen = [slot for slot in slots if not slot.is_empty]
-    else:
-        chosen = [
-            slot
-            for slot in slots
-            if not slot.is_empty and matches(slot, terms)
-        ]
-
-    # Two slots holding the same copy share an id, and a list with it twice
-    # would ask the shell to draw one result twice.
-    seen: set[str] = set()
-    ids: list[str] = []
-    for slot in chosen:
-        identifier = slot_id(slot)
-        if identifier and identifier not in seen:
-            seen.add(identifier)
-            ids.append(identifier)
-    return ids
-
-
-def find(slots, result_id: str):
-    """The slot an id names, or None once it has rotated out."""
-    if not result_id:
+# Index
+
+# Terms are looked up by the runs of this many characters they contain.
+_GRAM = 3
+
+# Past this a haystack is scanned rather than indexed: cutting a long text
+# into trigrams costs more than all the scans it would spare. A search
+# window folds to about this long, so only the odd text that folding
+# lengthens goes past it.
+_INDEX_MAX_CHARS = 64 * 1024
+
+_NO_POSTINGS: frozenset[str] = frozenset()
+
+# The most results handed to the shell. It draws a handful per provider,
+# and every id returned is a meta it may ask for.
+MAX_RESULTS = 10
+
+# What a keystroke may spend looking for matches; ranking the ones found
+# takes a few milliseconds more, well inside a frame.
+BUDGET_MS = 8.0
+
+# How far a word may be from a term and still count, by term length. A
+# typo in a short term leaves nothing to recognise it by.
+_FUZZY_MIN_CHARS = 5
+_FUZZY_TWO_EDITS_CHARS = 9
+# Only the start of a text is read for near misses, so a long one costs
+# no more than a short one.
+_FUZZY_WINDOW_CHARS = 4096
+
+# Scores. A term starting the text beats one starting a word, which beats
+# one inside a word, which beats a near miss.
+_SCORE_PREFIX = 3.0
+_SCORE_WORD = 2.0
+_SCORE_INSIDE = 1.0
+_SCORE_FUZZY = 0.5
+_PINNED_BOOST = 1.5
+# Recency can double a score; a copy this old gets half of that bonus.
+_RECENCY_HALF_LIFE_S = 24 * 3600
+
+# Ranking more than this many matches buys nothing but time: they are
+# taken most recent first, and an older one would need a far better match
+# to climb past all of them.
+_RANK_POOL = 300
+
+# A trigram in more than one slot in this many rules too little out to be
+# worth intersecting.
+_UNSELECTIVE = 4
+
+_WORD = re.compile(r"\w+")
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i : i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+def _max_edits(term: str) -> int:
+    if len(term) >= _FUZZY_TWO_EDITS_CHARS:
+        return 2
+    if len(term) >= _FUZZY_MIN_CHARS:
+        return 1
+    return 0
+
+
+def _starts_near(word: str, term: str, limit: int) -> bool:
+    """Whether `word` starts with `term`, give or take `limit` edits.
+
+    A start, not the whole word, since the user may still be typing it.
+    Two neighbours swapped count as one edit, not two, for that is the
+    typo fingers make most ("histroy"). Only the diagonal band `limit`
+    wide is computed, and a row with nothing left in reach ends it early.
+    """
+    word = word[: len(term) + limit]
+    if len(word) < len(term) - limit:
+        return False
+    before: list[int] = []
+    previous = list(range(len(word) + 1))
+    for i, char in enumerate(term, 1):
+        current = [i] + [limit + 1] * len(word)
+        start, end = max(1, i - limit), min(len(word), i + limit)
+        for j in range(start, end + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != word[j - 1]),
+            )
+            if (
+                i > 1
+                and j > 1
+                and char == word[j - 2]
+                and term[i - 2] == word[j - 1]
+            ):
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current[start - 1 : end + 1]) > limit:
+            return False
+        before, previous = previous, current
+    # Against every start of the word long enough to be the term.
+    return min(previous[max(0, len(term) - limit) :]) <= limit
+
+
+def _term_score(haystack: str, term: str) -> float:
+    """How well `term` appears in `haystack`, 0 when it does not."""
+    at = haystack.find(term)
+    if at < 0:
+        return 0.0
+    if at == 0:
+        return _SCORE_PREFIX
+    while at >= 0:
+        if not haystack[at - 1].isalnum():
+            return _SCORE_WORD
+        at = haystack.find(term, at + 1)
+    return _SCORE_INSIDE
+
+
+def _words(haystack: str) -> tuple[str, ...]:
+    """The distinct words a near miss is looked for among."""
+    return tuple(
+        dict.fromkeys(_WORD.findall(haystack, 0, _FUZZY_WINDOW_CHARS))
+    )
+
+
+class SearchIndex:
+    """The slots' search text cut into trigrams, kept in step with them.
+
+    Every keystroke used to fold each slot's text again and scan it for
+    every term. Here a term is looked up instead: only the slots holding
+    all of its trigrams can contain it, and only those are scanned. Several
+    terms intersect their slots, starting from the shortest list.
+
+    Results are ranked rather than listed: where a term lands, how recent
+    the copy is and whether it is pinned all count, near misses of longer
+    terms still match, and only the best `MAX_RESULTS` are handed over.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._haystacks: dict[str, str] = {}
+        self._rank: dict[str, int] = {}
+        # Timestamp and pin, what ranking needs besides the text.
+        self._standing: dict[str, tuple[float, bool]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._unindexed: set[str] = set()
+        # For near misses: each slot's words, and each word's verdict
+        # against each term of the search under way.
+        self._words: dict[str, tuple[str, ...]] = {}
+        self._verdicts: dict[str, dict[str, bool]] = {}
+        # Moves whenever the slots or their order do.
+        self.revision = 0
+        # The last exact answer, to narrow while the user types on.
+        self._last: tuple[int, list[str], set[str]] | None = None
+
+    def sync(self, entries) -> None:
+        """Catch up with `entries`, (id, slot) pairs in grid order.
+
+        The ids come worked out already, so finding what changed hashes and
+        folds nothing; only a slot new to the index is cut into trigrams.
+        """
+        rank: dict[str, int] = {}
+        standing: dict[str, tuple[float, bool]] = {}
+        for identifier, slot in entries:
+            if slot.is_empty:
+                continue
+            if not identifier or identifier in rank:
+                continue
+            rank[identifier] = len(rank)
+            standing[identifier] = (_timestamp(slot), slot.is_pinned)
+            if identifier not in self._haystacks:
+                self._add(identifier, _haystack(slot))
+
+        for identifier in self._haystacks.keys() - rank.keys():
+            self._remove(identifier)
+
+        if rank != self._rank:
+            self._rank = rank
+            self.revision += 1
+        self._standing = standing
+
+    def search(
+        self,
+        terms: list[str],
+        limit: int = MAX_RESULTS,
+        now: float | None = None,
+    ) -> list[str]:
+        """The best `limit` ids for `terms`, best first."""
+        if is_app_name_query(terms):
+            return list(self._rank)[:limit]
+        wanted = [normalize(term) for term in terms if term]
+        if not wanted:
+            return []
+
+        deadline = self._clock() + BUDGET_MS / 1000
+        self._verdicts = {}
+        if all(len(term) < _GRAM for term in wanted):
+            # A letter or two is in nearly everything, and tells nothing
+            # to rank by: the most recent matches are the answer.
+            return self._exact(wanted, limit, deadline)
+
+        found = self._exact(wanted, _RANK_POOL, deadline)
+        if len(found) < limit:
+            found += self._near(
+                wanted, set(found), _RANK_POOL - len(found), deadline
+            )
+
+        now = time.time() if now is None else now
+        return heapq.nlargest(
+            limit, found, key=lambda i: self._score(i, wanted, now)
+        )
+
+    def _exact(self, wanted: list[str], most: int, deadline: float):
+        """Up to `most` slots holding every term, most recent first.
+
+        Typing on only ever lengthens a term or adds one, and nothing the
+        shorter query missed can hold the longer one; so while the slots
+        stay put, a complete last answer is where the next one is looked
+        for. Short of that the index narrows what is scanned, unless the
+        terms are so common that walking the grid in order finds enough
+        sooner. The scan stops when time is up, with what it has.
+        """
+        candidates = self._narrowed(wanted)
+        if candidates is None:
+            candidates = self._candidates(wanted)
+        if candidates is None:
+            ordered = iter(self._rank)
+        else:
+            ordered = sorted(candidates, key=self._rank.__getitem__)
+
+        found = []
+        complete = True
+        for checked, identifier in enumerate(ordered):
+            if checked % 256 == 255 and self._clock() > deadline:
+                complete = False
+                break
+            haystack = self._haystacks[identifier]
+            if all(term in haystack for term in wanted):
+                found.append(identifier)
+                if len(found) >= most:
+                    complete = False
+                    break
+
+        self._last = (self.revision, wanted, set(found)) if complete else None
+        return found
+
+    def _narrowed(self, wanted: list[str]) -> set[str] | None:
+        if self._last is None:
+            return None
+        revision, last_wanted, last_found = self._last
+        if revision != self.revision:
+            return None
+        if all(any(old in term for term in wanted) for old in last_wanted):
+            return last_found
         return None
-    for slot in slots:
-        if slot_id(slot) == result_id:
-            return slot
-    return None
+
+    def _candidates(self, wanted: list[str]) -> set[str] | None:
+        """What the index narrows the terms to; None where it cannot."""
+        candidates = None
+        # Longest first: a longer term has more trigrams to rule slots out.
+        for term in sorted(wanted, key=len, reverse=True):
+            if len(term) < _GRAM:
+                continue
+            hits = self._lookup(term)
+            if hits is None:
+                continue
+            candidates = hits if candidates is None else candidates & hits
+            if not candidates:
+                break
+        return candidates
+
+    def _near(
+        self, wanted: list[str], exact: set[str], most: int, deadline: float
+    ):
+        """Up to `most` slots holding each term or nearly, as time allows.
+
+        Drawn from the slots sharing a trigram with the longest term that
+        can be mistyped; a typo leaves the rest of a word's trigrams intact.
+        """
+        fuzzy = [term for term in wanted if _max_edits(term)]
+        if not fuzzy:
+            return []
+        seen = set(exact)
+        found = []
+        for gram in _grams(max(fuzzy, key=len)):
+            for identifier in self._postings.get(gram, _NO_POSTINGS):
+                if identifier in seen:
+                    continue
+                seen.add(identifier)
+                if self._clock() > deadline:
+                    return found
+                haystack = self._haystacks[identifier]
+                if all(
+                    term in haystack or self._is_near(identifier, term)
+                    for term in wanted
+                ):
+                    found.append(identifier)
+                    if len(found) >= most:
+                        return found
+        return found
+
+    def _is_near(self, identifier: str, term: str) -> bool:
+        """Whether a word of the slot starts with `term`, give or take.
+
+        Words repeat across slots far more than slots do, so each word is
+        weighed against a term once per search, and each slot's words are
+        picked out of its text once for as long as it is indexed.
+        """
+        limit = _max_edits(term)
+        if not limit:
+            return False
+        words = self._words.get(identifier)
+        if words is None:
+            words = self._words[identifier] = _words(
+                self._haystacks[identifier]
+            )
+        verdicts = self._verdicts.setdefault(term, {})
+        for word in words:
+            near = verdicts.get(word)
+            if near is None:
+                near = verdicts[word] = _starts_near(word, term, limit)
+            if near:
+                return True
+        return False
+
+    def _score(self, identifier: str, wanted: list[str], now: float) -> float:
+        haystack = self._haystacks[identifier]
+        score = sum(
+            _term_score(haystack, term)
+            or (_SCORE_FUZZY if self._is_near(identifier, term) else 0.0)
+            for term in wanted
+        )
+        timestamp, pinned = self._standing.get(identifier, (0.0, False))
+        age = max(0.0, now - timestamp)
+        score *= 1 + 0.5 ** (age / _RECENCY_HALF_LIFE_S)
+        if pinned:
+            score *= _PINNED_BOOST
+        # Ties go to the more recent.
+        return score - self._rank[identifier] * 1e-9
+
+    def _lookup(self, term: str) -> set[str] | None:
+        """The slots that can hold `term`: all its trigrams, or unindexed.
+
+        None when even its rarest trigram is in a good part of the slots:
+        intersecting lists that long costs more than the scan it saves.
+        """
+        postings = sorted(
+            (self._postings.get(gram, _NO_POSTINGS) for gram in _grams(term)),
+            key=len,
+        )
+        if len(postings[0]) > len(self._rank) // _UNSELECTIVE:
+            return None
+        hits = set(postings[0])
+        for posting in postings[1:]:
+            if not hits:
+                break
+            hits &= posting
+        return hits | self._unindexed
+
+    def _add(self, identifier: str, haystack: str) -> None:
+        self._haystacks[identifier] = haystack
+        if len(haystack) > _INDEX_MAX_CHARS:
+            self._unindexed.add(identifier)
+            return
+        for gram in _grams(haystack):
+            self._postings.setdefault(gram, set()).add(identifier)
+
+    def _remove(self, identifier: str) -> None:
+        haystack = self._haystacks.pop(identifier)
+        self._words.pop(identifier, None)
+        if identifier in self._unindexed:
+            self._unindexed.discard(identifier)
+            return
+        for gram in _grams(haystack):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(identifier)
+            if not posting:
+                del self._postings[gram]
+
+
+def _timestamp(slot) -> float:
+    try:
+        return float(slot.timestamp)
+    except ValueError:
+        return 0.0
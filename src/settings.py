@@ -1,13 +1,17 @@
 # Copyright 2021 Rafael Mardojai CM, 2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from typing import Self
 
-from gi.repository import Gio, GLib, GObject
+from gi.repository import Gio, GObject
 
 from serigy.define import APP_ID
-from serigy.image_store import prune
-from serigy.slot_data import SlotData
+from serigy.history import History, history_path
+from serigy.image_store import delete_images
+from serigy.search_query import BUDGET_MS
+from serigy.slot_data import META_VERSION, SlotData
 
 
 class Settings(Gio.Settings):
@@ -16,6 +20,7 @@ class Settings(Gio.Settings):
 
     __gsignals__ = {
         "preset-changed": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
+        "archive-changed": (GObject.SIGNAL_RUN_FIRST, None, ()),
     }
 
     @classmethod
@@ -27,23 +32,181 @@ class Settings(Gio.Settings):
 
     def __init__(self):
         super().__init__(schema_id=APP_ID)
+        self._history = History(history_path(), self._legacy_slots)
+        self._slot_edits = 0
+        self._slots_cache: tuple[SlotData, ...] | None = None
+        self._entries_cache: tuple[tuple[str, SlotData], ...] | None = None
+        self._slots_version = 0
+        self._archive_revision = 0
+        # The history holds them now, so the copies should not linger in
+        # dconf as well. Checked on every run, so a run that stopped after
+        # creating the history resets the key on the next.
+        if self.get_user_value("slots") is not None:
+            self.reset("slots")
 
     # Slots
 
-    @property
-    def slots(self) -> list[SlotData]:
+    def _legacy_slots(self) -> list[SlotData]:
+        """The slots GSettings used to hold, for a history being created.
+
+        A first run gets the welcome slot from the key's default this way.
+        """
         return [
             SlotData.from_list(s) for s in self.get_value("slots").unpack()
         ]
 
+    @property
+    def slots(self) -> list[SlotData]:
+        """The slots as a list of the caller's own, to edit and write back.
+
+        Only the list is new; the slots in it are the shared, frozen ones.
+        """
+        return list(self.slots_snapshot)
+
     @slots.setter
     def slots(self, slots: list[SlotData]) -> None:
-        self.set_value(
-            "slots", GLib.Variant("aas", [s.to_list() for s in slots])
-        )
-        # Every slot mutation lands here, so this is the one place where a
-        # file losing its last slot can be noticed at all.
-        prune(s.filename for s in slots)
+        with self.editing_slots():
+            self._history.rewrite(slots)
+            self._invalidate_slots()
+
+    @property
+    def slots_snapshot(self) -> tuple[SlotData, ...]:
+        """The slots as they stand, shared by every reader until a write.
+
+        Every card asks for its slot when bound and the search provider asks
+        on every keystroke, and each of those used to build the list from
+        scratch. Only our own writes change it, so it is built once per
+        write and handed out as is.
+        """
+        if self._slots_cache is None:
+            self._slots_cache = tuple(self._history.slots())
+        return self._slots_cache
+
+    @property
+    def slot_entries(self) -> tuple[tuple[str, SlotData], ...]:
+        """The slots with their search result ids, shared like the slots.
+
+        The ids were worked out when the slots were written, never when a
+        search asks for them.
+        """
+        if self._entries_cache is None:
+            self._entries_cache = tuple(self._history.entries())
+        return self._entries_cache
+
+    @property
+    def slots_version(self) -> int:
+        """Bumped on every slot write, for caches built on the slots."""
+        return self._slots_version
+
+    def _invalidate_slots(self) -> None:
+        self._slots_cache = None
+        self._entries_cache = None
+        self._slots_version += 1
+
+    @contextmanager
+    def editing_slots(self) -> Iterator[None]:
+        """Group slot writes into one transaction, and one aftermath.
+
+        A copy drops a slot and adds another; done apart, a crash could
+        land between them and every follow-up would run twice.
+        """
+        if self._slot_edits == 0:
+            self._archive_revision = self._history.archive_revision
+        self._slot_edits += 1
+        try:
+            with self._history.batch():
+                yield
+        finally:
+            self._slot_edits -= 1
+        if self._slot_edits == 0:
+            # The history counted which files lost their last slot, so
+            # only those go; nothing here lists the image directory.
+            delete_images(self._history.take_released())
+            if self._history.archive_revision != self._archive_revision:
+                self.emit("archive-changed")
+
+    def find_slot(self, key: str) -> int | None:
+        """Where the slot with content key `key` sits, if any does."""
+        return self._history.find(key)
+
+    def slot_by_id(self, result_id: str) -> SlotData | None:
+        """The slot a search result id names, if it is still in the grid."""
+        return self._history.by_id(result_id)
+
+    def insert_slot(self, index: int, slot: SlotData) -> None:
+        with self.editing_slots():
+            self._history.insert(index, slot)
+            self._invalidate_slots()
+
+    def remove_slot(self, index: int) -> SlotData:
+        with self.editing_slots():
+            slot = self._history.remove(index)
+            self._invalidate_slots()
+            return slot
+
+    def move_slot(self, source: int, target: int) -> None:
+        with self.editing_slots():
+            self._history.move(source, target)
+            self._invalidate_slots()
+
+    def update_slot(self, index: int, slot: SlotData) -> None:
+        with self.editing_slots():
+            self._history.update(index, slot)
+            self._invalidate_slots()
+
+    def referenced_images(self) -> set[str]:
+        """Every image file a slot or an archived copy still names."""
+        return self._history.referenced_images()
+
+    def release_unclaimed(self, filenames: Iterable[str]) -> None:
+        """Delete files written for a copy that never became a slot.
+
+        The capture worker writes a copy's files before the copy is stored,
+        and a duplicate, or a grid with every slot pinned, means it never
+        is. Whatever another slot names is kept.
+        """
+        delete_images(self._history.unreferenced(filenames))
+
+    # Archive
+
+    def archive_slot(self, slot: SlotData) -> None:
+        """Keep a slot the grid pushed out, behind the grid."""
+        with self.editing_slots():
+            self._history.archive(slot)
+
+    def clear_archive(self) -> None:
+        with self.editing_slots():
+            self._history.clear_archive()
+
+    def expire_archived(self, before: int) -> None:
+        """Drop unpinned archived copies timestamped before `before`."""
+        with self.editing_slots():
+            self._history.expire_archived(before)
+
+    @property
+    def archived_count(self) -> int:
+        return self._history.archived_count()
+
+    def archived_slots(self, offset: int, limit: int) -> list[SlotData]:
+        return self._history.archived(offset, limit)
+
+    def search_archive(
+        self, terms: list[str], limit: int
+    ) -> list[tuple[int, SlotData]]:
+        """Archived slots holding every term, newest first, by row id."""
+        return self._history.search_archive(terms, limit, BUDGET_MS)
+
+    def archived_row(self, row_id: int) -> SlotData | None:
+        return self._history.archived_row(row_id)
+
+    def stale_archived(self, limit: int) -> list[tuple[int, SlotData]]:
+        """Archived slots an older detector described, by row id."""
+        return self._history.stale_archived(META_VERSION, limit)
+
+    def describe_archived(self, row_id: int, slot: SlotData) -> None:
+        # Only derived fields change, and nothing paged in shows them
+        # differently, so the archive is not announced as changed.
+        self._history.describe_archived(row_id, slot)
 
     # Auto Arrange
 
@@ -107,6 +270,26 @@ class Settings(Gio.Settings):
     def monitor_clipboard(self, value: bool) -> None:
         self.set_boolean("monitor-clipboard", value)
 
+    # Clipboard Portal
+
+    @property
+    def clipboard_portal(self) -> bool:
+        return self.get_boolean("clipboard-portal")
+
+    @clipboard_portal.setter
+    def clipboard_portal(self, value: bool) -> None:
+        self.set_boolean("clipboard-portal", value)
+
+    # Capture Size
+
+    @property
+    def max_capture_mb(self) -> int:
+        return self.get_int("max-capture-size")
+
+    @property
+    def max_capture_bytes(self) -> int:
+        return self.max_capture_mb * 1024 * 1024
+
     # Auto-Clear
 
     @property
@@ -1,17 +1,41 @@
 # Copyright 2026 Cleo Menezes Jr.
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import hashlib
 from dataclasses import dataclass
 
+# What worked out the derived fields below. Bump it with any change to what
+# `content_type.detect`, `slot_display.summary` or `search_query.normalize`
+# answer, and every stored slot is described again, once, on the next run.
+META_VERSION = 4
 
-@dataclass
+
+@dataclass(frozen=True)
 class SlotData:
+    """One slot, never edited in place.
+
+    Settings hands the same objects to every reader, so a change is a new
+    SlotData (`dataclasses.replace`) written back, never an assignment.
+    """
+
     text: str = ""
     filename: str = ""
     pin_status: str = ""
     timestamp: str = ""
     mime: str = ""
     uri: str = ""
+    # Text too long to keep inline lives in a file of this name, and `text`
+    # is only the start of it. `text_size` is the whole text, in bytes.
+    blob: str = ""
+    text_size: int = 0
+    # Derived from the content when it is captured, so no card bind or
+    # search keystroke has to run the detector or fold text again; see
+    # `slot_meta`. Trusted only while `meta_version` is current.
+    kind: str = ""
+    summary: str = ""
+    search_text: str = ""
+    result_id: str = ""
+    meta_version: int = 0
 
     @property
     def is_pinned(self) -> bool:
@@ -21,6 +45,10 @@ class SlotData:
     def is_empty(self) -> bool:
         return not self.text and not self.filename and not self.uri
 
+    @property
+    def is_described(self) -> bool:
+        return self.meta_version == META_VERSION
+
     @classmethod
     def from_list(cls, raw: list[str]) -> "SlotData":
         """Convert a raw GSettings list to SlotData.
@@ -51,3 +79,23 @@ class SlotData:
             self.mime,
             self.uri,
         ]
+
+
+def content_key(slot: SlotData) -> str:
+    """Name a slot by what it holds rather than by where it sits.
+
+    Two slots with the same key hold the same copy. The kind goes in front
+    so a text that happens to read like a file name is not taken for one.
+    """
+    if slot.blob:
+        # Named by the same hash the inline text would have been.
+        return f"t:{slot.blob.removesuffix('.txt')}"
+    if slot.text:
+        kind, value = "t", slot.text
+    elif slot.filename:
+        kind, value = "i", slot.filename
+    elif slot.uri:
+        kind, value = "f", slot.uri
+    else:
+        return ""
+    return f"{kind}:{hashlib.sha256(value.encode()).hexdigest()}"
@@ -0,0 +1,81 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""What a slot's content says about it, worked out once and kept.
+
+Every card bind ran the content type detector over its text, every search
+meta ran it again, and every keystroke folded the case and accents of every
+slot. None of it changes while the content does not, so it is worked out on
+the capture worker, stored with the slot, and only read after that. Slots
+described by an older `META_VERSION` are described again, once.
+
+Free of GTK, like the detector and the search it feeds.
+"""
+
+from dataclasses import replace
+
+from serigy import search_query
+from serigy.content_type import ContentType, detect
+from serigy.image_store import full_text
+from serigy.slot_data import META_VERSION, SlotData
+from serigy.slot_display import summary
+
+META_FIELDS = ("kind", "summary", "search_text", "result_id", "meta_version")
+
+
+def describe(slot: SlotData, text: str | None = None) -> SlotData:
+    """`slot` with its derived fields worked out.
+
+    `text` is the slot's whole text, when the caller holds it already;
+    otherwise a long text is read back from its file. Runs the detector
+    and reads files, so it belongs on a worker.
+    """
+    if slot.is_empty:
+        return slot
+
+    if slot.text:
+        if text is None:
+            text = full_text(slot) if slot.blob else slot.text
+        # A long text whose file is gone is still worth a type and a line.
+        text = text if text is not None else slot.text
+        kind = detect(text, slot.mime)
+        line = summary(slot.text)
+        # Only the start of a long text: folded whole, it would put the
+        # megabytes the blob took out of the row right back in.
+        search_text = search_query.search_text(text)
+    elif slot.filename:
+        kind, line, search_text = ContentType.IMAGE, "", ""
+    else:
+        name = search_query.basename(slot.uri)
+        kind, line = ContentType.FILE, name or slot.uri
+        search_text = search_query.normalize(name)
+
+    return replace(
+        slot,
+        kind=kind.type_id,
+        summary=line,
+        search_text=search_text,
+        result_id=search_query.content_id(slot),
+        meta_version=META_VERSION,
+    )
+
+
+def with_meta(slot: SlotData, described: SlotData) -> SlotData:
+    """`slot` carrying the derived fields of `described`, same content."""
+    return replace(
+        slot, **{field: getattr(described, field) for field in META_FIELDS}
+    )
+
+
+def content_type_of(slot: SlotData) -> ContentType:
+    """The slot's type, detected now only if it was never stored."""
+    if slot.is_described:
+        return ContentType.from_type_id(slot.kind)
+    return detect(slot.text, slot.mime)
+
+
+def summary_of(slot: SlotData) -> str:
+    """The one line standing in for a text slot."""
+    if slot.is_described:
+        return slot.summary
+    return summary(slot.text)
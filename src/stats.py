@@ -0,0 +1,132 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Counters and histograms the running service keeps about itself.
+
+Whether a tuning change helped can only be told from how the app behaves
+on a real desktop over days: how many copies it took, how many of them were
+duplicates, how often it woke to find nothing, how long the capture window
+waited for focus. Each of those is a dict increment or a bucket bump where
+it happens, so they are always kept; they are read over D-Bus or with
+`serigy --stats`.
+
+Gauges are the numbers that are cheaper to work out when asked than to
+keep up to date, like the bytes in the image store: a function each,
+called only for a snapshot.
+
+Counted on the main loop only, which is where every caller runs. Free of
+GTK, like the rest of what it counts.
+"""
+
+import bisect
+import logging
+from collections import Counter
+from collections.abc import Callable
+
+# Upper bounds, in milliseconds, of every bucket but the last.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    """Values in fixed buckets, so keeping one costs the same forever.
+
+    Percentiles are read off the buckets: each is the upper bound of the
+    bucket it falls in, and no more than the largest value seen.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        value = float(value)
+        self.counts[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(
+            (*BUCKETS_MS, self.max), self.counts, strict=True
+        ):
+            seen += count
+            if seen >= wanted:
+                return min(float(bound), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": float(self.count),
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+_counters: Counter[str] = Counter()
+_histograms: dict[str, Histogram] = {}
+_gauges: dict[str, Callable[[], float]] = {}
+
+
+def count(name: str, amount: int = 1) -> None:
+    _counters[name] += amount
+
+
+def observe(name: str, value: float) -> None:
+    """Add `value`, in milliseconds for anything timed, to `name`."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = _histograms[name] = Histogram()
+    histogram.observe(value)
+
+
+def histogram(name: str) -> dict[str, float] | None:
+    """The summary of one histogram, None if nothing was observed yet."""
+    histogram = _histograms.get(name)
+    return histogram.summary() if histogram is not None else None
+
+
+def gauge(name: str, read: Callable[[], float]) -> None:
+    """Have `read` answer for `name` whenever a snapshot is taken."""
+    _gauges[name] = read
+
+
+def snapshot() -> tuple[dict[str, int], dict[str, float], dict]:
+    """Counters, gauges and histogram summaries, as they stand."""
+    gauges = {}
+    for name, read in _gauges.items():
+        try:
+            gauges[name] = float(read())
+        except Exception as e:
+            # One unreadable gauge should not cost the whole report.
+            logging.warning("Could not read the %s gauge: %s", name, e)
+    histograms = {
+        name: histogram.summary() for name, histogram in _histograms.items()
+    }
+    return dict(_counters), gauges, histograms
+
+
+def format_report() -> str:
+    """The snapshot as lines a person reads, for `serigy --stats`."""
+    counters, gauges, histograms = snapshot()
+    lines = []
+    for name in sorted(counters.keys() | gauges.keys()):
+        value = counters.get(name, gauges.get(name))
+        shown = f"{value:g}" if isinstance(value, float) else str(value)
+        lines.append(f"{name:<36} {shown:>12}")
+    for name in sorted(histograms):
+        h = histograms[name]
+        lines.append(
+            f"{name:<36} {h['count']:>12g}  mean {h['mean']:.1f}"
+            f"  p50 {h['p50']:g}  p99 {h['p99']:g}  max {h['max']:.1f}"
+        )
+    return "\n".join(lines) + "\n"
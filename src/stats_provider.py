@@ -0,0 +1,83 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""The service's runtime statistics over D-Bus, next to the search provider.
+
+Read-only, one method, so anything on the session bus can watch a running
+instance without asking it to change:
+
+    gdbus call --session --dest io.github.cleomenezesjr.Serigy \\
+        --object-path /io/github/cleomenezesjr/Serigy/Stats \\
+        --method io.github.cleomenezesjr.Serigy.Stats.GetStats
+
+`serigy --stats` prints the same numbers without a bus call of its own.
+"""
+
+import logging
+
+from gi.repository import Gio, GLib
+
+from serigy import stats
+
+INTERFACE_XML = """
+<node>
+  <interface name="io.github.cleomenezesjr.Serigy.Stats">
+    <method name="GetStats">
+      <arg type="a{st}" name="counters" direction="out"/>
+      <arg type="a{sd}" name="gauges" direction="out"/>
+      <arg type="a{sa{sd}}" name="histograms" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+
+class StatsProvider:
+    def __init__(self):
+        self._registration_id: int | None = None
+        self._node = Gio.DBusNodeInfo.new_for_xml(INTERFACE_XML)
+
+    def register(self, connection: Gio.DBusConnection, object_path: str):
+        self._registration_id = connection.register_object(
+            object_path,
+            self._node.interfaces[0],
+            self._on_method_call,
+            None,
+            None,
+        )
+        logging.debug("Statistics registered at %s", object_path)
+
+    def unregister(self, connection: Gio.DBusConnection):
+        if self._registration_id is None:
+            return
+        connection.unregister_object(self._registration_id)
+        self._registration_id = None
+
+    def _on_method_call(
+        self,
+        connection,
+        sender,
+        object_path,
+        interface_name,
+        method_name,
+        parameters,
+        invocation,
+    ):
+        if method_name != "GetStats":
+            invocation.return_error_literal(
+                Gio.dbus_error_quark(),
+                Gio.DBusError.UNKNOWN_METHOD,
+                method_name,
+            )
+            return
+        try:
+            invocation.return_value(
+                GLib.Variant("(a{st}a{sd}a{sa{sd}})", stats.snapshot())
+            )
+        except Exception:
+            logging.exception("Could not report the statistics")
+            invocation.return_error_literal(
+                Gio.dbus_error_quark(),
+                Gio.DBusError.FAILED,
+                f"{method_name} failed",
+            )
@@ -0,0 +1,110 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Card pictures, decoded away from the main loop and kept while they fit.
+
+A card used to decode its picture in its constructor, inside the grid's bind
+handler, and every copy rebinds the grid. Cards now bind without one, ask for
+it here and get it once a worker has decoded it. Decoded textures are kept by
+filename, least recently shown first out, within a byte budget, so rebinding
+a grid of pictures already seen decodes nothing at all.
+"""
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Self
+
+from gi.repository import Gdk, GLib
+
+from serigy.image_store import thumbnail_for
+
+# About sixty card thumbnails: a full grid, with room to spare for the
+# pictures scrolled past or about to come back.
+BUDGET_BYTES = 64 * 1024 * 1024
+
+_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="serigy-textures"
+)
+
+
+class TextureCache:
+    _instance = None
+
+    @classmethod
+    def get(cls) -> Self:
+        """Return the cache every card shares."""
+        if cls._instance is None:
+            cls._instance = TextureCache()
+        return cls._instance
+
+    def __init__(self, budget: int = BUDGET_BYTES):
+        self._budget = budget
+        self._textures: OrderedDict[str, Gdk.Texture] = OrderedDict()
+        self._size = 0
+        # Cards waiting on a decode already under way, so a picture shown
+        # by several binds at once is decoded once.
+        self._waiting: dict[str, list[Callable]] = {}
+
+    def load(
+        self, filename: str, on_loaded: Callable[[Gdk.Texture | None], None]
+    ) -> None:
+        """Hand `on_loaded` the card texture for `filename`.
+
+        Right away when it is kept here, otherwise on the main loop once
+        decoded; None if it could not be.
+        """
+        texture = self._textures.get(filename)
+        if texture is not None:
+            self._textures.move_to_end(filename)
+            on_loaded(texture)
+            return
+
+        waiting = self._waiting.get(filename)
+        if waiting is not None:
+            waiting.append(on_loaded)
+            return
+
+        self._waiting[filename] = [on_loaded]
+        future = _executor.submit(_decode, filename)
+        future.add_done_callback(
+            lambda done: GLib.idle_add(self._on_decoded, filename, done)
+        )
+
+    def _on_decoded(self, filename: str, future: Future):
+        texture = None
+        try:
+            texture = future.result()
+        except GLib.Error as e:
+            logging.warning("Failed to load image %s: %s", filename, e.message)
+        except Exception as e:
+            logging.warning("Failed to load image %s: %s", filename, e)
+        finally:
+            # Whatever the decode did, the cards waiting on it hear back
+            # and the next one to ask tries again; left pending, they
+            # would wait forever.
+            waiting = self._waiting.pop(filename, [])
+
+        if texture is not None:
+            self._keep(filename, texture)
+        for on_loaded in waiting:
+            on_loaded(texture)
+        return GLib.SOURCE_REMOVE
+
+    def _keep(self, filename: str, texture: Gdk.Texture) -> None:
+        self._textures[filename] = texture
+        self._size += _cost(texture)
+        # The newest stays even alone over budget: it is on screen.
+        while self._size > self._budget and len(self._textures) > 1:
+            _, oldest = self._textures.popitem(last=False)
+            self._size -= _cost(oldest)
+
+
+def _decode(filename: str) -> Gdk.Texture:
+    # On the worker, like the thumbnail an older image may still need made.
+    return Gdk.Texture.new_from_filename(str(thumbnail_for(filename)))
+
+
+def _cost(texture: Gdk.Texture) -> int:
+    return texture.get_width() * texture.get_height() * 4
@@ -0,0 +1,151 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Where the time goes between a copy and its slot, as a trace file.
+
+A capture crosses the monitor, the capture window and its wait for focus,
+the queue, the manager and the grid, half of it in callbacks, so no log
+line says which of them was slow. Each of those stages reports a span here,
+and `export` writes them as Chrome trace events, which Perfetto and
+chrome://tracing open as a timeline, one track per thread.
+
+Off unless asked for, with SERIGY_TRACE=1 or `serigy --trace`. Off, a span
+is one global read and a shared do-nothing context manager, so the stages
+can report unconditionally. On, events go into a bounded buffer: a trace
+left running for days keeps the latest ones, not all of them.
+
+Free of GTK, so it can be used from the capture worker as well.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+MAX_EVENTS = 100_000
+
+_enabled = os.environ.get("SERIGY_TRACE", "") not in ("", "0")
+_events: deque[dict] = deque(maxlen=MAX_EVENTS)
+_NULL = nullcontext()
+
+# Intervals that start in one callback and end in another, by name: each
+# gets an id, and `finish` closes the oldest one still open.
+_open: defaultdict[str, deque[int]] = defaultdict(deque)
+_next_id = 0
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+def _event(phase: str, name: str, **fields) -> dict:
+    event = {
+        "name": name,
+        "ph": phase,
+        "ts": _now_us(),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    event.update(fields)
+    _events.append(event)
+    return event
+
+
+class _Span(AbstractContextManager):
+    __slots__ = ("_name", "_args", "_start")
+
+    def __init__(self, name: str, args: dict):
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._start = _now_us()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = _now_us()
+        _events.append(
+            {
+                "name": self._name,
+                "ph": "X",
+                "ts": self._start,
+                "dur": end - self._start,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self._args,
+            }
+        )
+        return False
+
+
+def span(name: str, **args) -> AbstractContextManager:
+    """Time the block under `name`; `args` show with it in the viewer."""
+    if not _enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+def mark(name: str, **args) -> None:
+    """Something that happened at one instant."""
+    if _enabled:
+        _event("i", name, s="t", args=args)
+
+
+def start(name: str, **args) -> None:
+    """Open an interval that another callback will `finish`."""
+    if not _enabled:
+        return
+    global _next_id
+    with _lock:
+        _next_id += 1
+        identifier = _next_id
+        _open[name].append(identifier)
+    _event("b", name, cat="capture", id=identifier, args=args)
+
+
+def finish(name: str, **args) -> None:
+    """Close the oldest open interval called `name`, if there is one."""
+    if not _enabled:
+        return
+    with _lock:
+        if not _open[name]:
+            return
+        identifier = _open[name].popleft()
+    _event("e", name, cat="capture", id=identifier, args=args)
+
+
+def export(directory: Path) -> Path:
+    """Write what was recorded to a new file in `directory`, and name it."""
+    events = list(_events)
+    threads = {thread.ident: thread.name for thread in threading.enumerate()}
+    metadata = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"name": threads.get(tid, str(tid))},
+        }
+        for tid in {event["tid"] for event in events}
+    ]
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / time.strftime("serigy-trace-%Y%m%d-%H%M%S.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f
+        )
+    return path
@@ -0,0 +1,118 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Catching the main loop when it stalls, with what it was doing.
+
+Everything runs on the GLib main loop, so a slow step anywhere freezes the
+window and clipboard detection together, and by the time anyone looks the
+loop is long free again. The main loop beats a heartbeat here; a thread
+watches it and, once a beat is late by more than the threshold, takes the
+main thread's Python stack while it is still stuck and writes it to the
+session log. How long each stall lasted goes into the `main_loop.stall_ms`
+histogram of the statistics, summed up in the log when the watchdog stops.
+
+Opt-in: SERIGY_WATCHDOG_MS=<threshold> in the environment.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from gi.repository import GLib
+
+from serigy import stats
+
+# Often enough that a late beat means a stall and not a timer's slack.
+HEARTBEAT_MS = 50
+
+# Deep stacks are mostly the GTK and GLib frames that called us.
+STACK_LIMIT = 30
+
+
+def threshold_from_environment() -> float | None:
+    """The stall threshold asked for, in milliseconds, if any was."""
+    value = os.environ.get("SERIGY_WATCHDOG_MS", "")
+    if not value:
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        logging.warning("SERIGY_WATCHDOG_MS=%r is not a number", value)
+        return None
+    return threshold if threshold > 0 else None
+
+
+class StallWatchdog:
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        self._main = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._beat_id: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._last_beat = time.monotonic()
+        self._beat_id = GLib.timeout_add(HEARTBEAT_MS, self._beat)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="serigy-watchdog", daemon=True
+        )
+        self._thread.start()
+        logging.info(
+            "Watching the main loop for stalls over %g ms", self.threshold_ms
+        )
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._beat_id is not None:
+            GLib.source_remove(self._beat_id)
+            self._beat_id = None
+
+        summary = stats.histogram("main_loop.stall_ms")
+        if summary:
+            logging.info(
+                "Main loop stalls: %d, p50 %g ms, p99 %g ms, worst %.0f ms",
+                summary["count"],
+                summary["p50"],
+                summary["p99"],
+                summary["max"],
+            )
+
+    def _beat(self) -> bool:
+        """On the main loop: how late this beat is, is how long it stalled."""
+        now = time.monotonic()
+        late_ms = (now - self._last_beat) * 1000 - HEARTBEAT_MS
+        self._last_beat = now
+        if late_ms > self.threshold_ms:
+            stats.observe("main_loop.stall_ms", late_ms)
+            logging.warning("Main loop stalled for %.0f ms", late_ms)
+        return GLib.SOURCE_CONTINUE
+
+    def _watch(self) -> None:
+        """On the thread: take the stack once per stall, while it lasts."""
+        reported = None
+        while not self._stop.wait(HEARTBEAT_MS / 1000):
+            last_beat = self._last_beat
+            late_ms = (time.monotonic() - last_beat) * 1000 - HEARTBEAT_MS
+            if late_ms <= self.threshold_ms or reported == last_beat:
+                continue
+            reported = last_beat
+
+            frame = sys._current_frames().get(self._main)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, STACK_LIMIT))
+            del frame
+            logging.warning(
+                "Main loop stuck for %.0f ms so far, in:\n%s", late_ms, stack
+            )
@@ -7,6 +7,8 @@ from typing import Any
 
 from gi.repository import Adw, Gio, GObject, Gtk
 
+from serigy import trace
+from serigy.clipboard import SlotChange, SlotChangeKind
 from serigy.define import RESOURCE_PATH
 from serigy.overlay_button import OverlayButton
 from serigy.settings import Settings
@@ -30,6 +32,10 @@ class SlotItem(GObject.Object):
         self.props.filename = filename
         self.props.uri = uri
 
+    @classmethod
+    def for_slot(cls, slot: SlotData) -> "SlotItem":
+        return cls(label=slot.text, filename=slot.filename, uri=slot.uri)
+
 
 @Gtk.Template(resource_path=f"{RESOURCE_PATH}/gtk/window.ui")
 class SerigyWindow(Adw.ApplicationWindow):
@@ -45,6 +51,9 @@ class SerigyWindow(Adw.ApplicationWindow):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # A trace mark is waiting on the next frame.
+        self._paint_marked = False
+
         self._empty_btn_handler = self.empty_button.connect(
             "clicked", self.alert_dialog_empty_slots
         )
@@ -157,8 +166,71 @@ class SerigyWindow(Adw.ApplicationWindow):
         """Refresh the grid layout by re-initializing it."""
         self._set_grid()
 
+    def apply_slot_changes(self, changes: list[SlotChange]) -> None:
+        """Follow slot writes row by row instead of rebuilding the grid.
+
+        Rows nobody touched keep their cards: a card looks its slot up by
+        position, so one shifted along by an insert still finds its own.
+        Anything that leaves the grid out of step with the slots, like a
+        count that no longer matches, falls back to the full rebuild.
+        """
+        with trace.span("apply slot changes", rows=len(changes)):
+            self._apply_slot_changes(changes)
+        self._mark_next_paint("grid painted")
+
+    def _apply_slot_changes(self, changes: list[SlotChange]) -> None:
+        store = self._slot_store
+        for change in changes:
+            kind = change.kind
+            if kind is SlotChangeKind.INSERTED:
+                store.insert(change.index, SlotItem.for_slot(change.slot))
+            elif kind is SlotChangeKind.REMOVED:
+                store.remove(change.index)
+            elif kind is SlotChangeKind.MOVED:
+                store.remove(change.source)
+                store.insert(change.index, SlotItem.for_slot(change.slot))
+            elif kind is SlotChangeKind.UPDATED:
+                store.splice(change.index, 1, [SlotItem.for_slot(change.slot)])
+
+        slots = Settings.get().slots_snapshot
+        if store.get_n_items() != len(slots) or (
+            len(slots) != Settings.get().number_slots_value
+        ):
+            self._set_grid()
+            return
+
+        self.empty_button.props.sensitive = any(not s.is_empty for s in slots)
+
+    def _mark_next_paint(self, name: str) -> None:
+        """Mark the trace when the frame showing what just changed is out.
+
+        That is where a capture ends for whoever copied, and it can come
+        well after the model was told.
+        """
+        if not trace.enabled() or self._paint_marked:
+            return
+        clock = self.get_frame_clock()
+        if clock is None:
+            # Not on screen: nothing is painted for anyone to wait on.
+            trace.mark(name, shown=False)
+            return
+
+        def on_after_paint(clock):
+            clock.disconnect(handler)
+            self._paint_marked = False
+            trace.mark(name)
+
+        # A rebuild inside a row update is still one frame.
+        self._paint_marked = True
+        handler = clock.connect("after-paint", on_after_paint)
+
     def _set_grid(self, do_sort: bool = False) -> None:
         """Initialize or refresh the slot grid view."""
+        with trace.span("rebuild grid"):
+            self._build_grid(do_sort)
+        self._mark_next_paint("grid painted")
+
+    def _build_grid(self, do_sort: bool) -> None:
         self._cleanup_grid()
         self.stack.props.visible_child_name = "loading_page"
 
@@ -174,15 +246,17 @@ class SerigyWindow(Adw.ApplicationWindow):
         _slots_difference: int = len(_slots) - _number_slots
 
         if _slots_difference != 0:
-            _slots = self._slots_adjustment(_slots, _slots_difference)
-            self.update_slots(_slots)
+            # One batch, so the trimmed slots reach the archive in the
+            # same transaction that takes them out of the grid.
+            with Settings.get().editing_slots():
+                _slots = self._slots_adjustment(_slots, _slots_difference)
+                self.update_slots(_slots)
 
         self._pending_removals = 0
 
-        for row in _slots:
-            self._slot_store.append(
-                SlotItem(label=row.text, filename=row.filename, uri=row.uri)
-            )
+        self._slot_store.splice(
+            0, 0, [SlotItem.for_slot(row) for row in _slots]
+        )
 
         self.stack.props.visible_child_name = "slots_page"
 
@@ -207,7 +281,8 @@ class SerigyWindow(Adw.ApplicationWindow):
 
         When shrinking, drop empty slots first, then unpinned-occupied ones
         from the back, where the oldest copies sit. Pinned slots are never
-        dropped.
+        dropped, and occupied ones go to the archive like any other slot
+        pushed out of the grid.
         """
         target = Settings.get().number_slots_value
         if len(slots) <= target:
@@ -229,6 +304,11 @@ class SerigyWindow(Adw.ApplicationWindow):
                 if not slot.is_empty and not slot.is_pinned
             ]
             dropped = set(spare[:to_remove])
+            # Back to front, so the newest of them is the first one the
+            # history dialog shows.
+            for i in sorted(dropped, reverse=True):
+                if not slots[i].is_empty:
+                    Settings.get().archive_slot(slots[i])
             slots = [slot for i, slot in enumerate(slots) if i not in dropped]
             while len(slots) < target:
                 slots.append(SlotData())
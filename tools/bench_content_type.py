@@ -0,0 +1,139 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Check what `content_type.detect` answers, and how long it takes at worst.
+
+Runs straight from the source tree, no build needed:
+
+    python3 tools/bench_content_type.py
+
+The corpus is copies of every kind with the type they should get; any wrong
+answer fails the run. The stress inputs are the sizes and shapes that used
+to cost the most (long code, long prose, deep nesting, one endless line,
+a wall of blanks),
+timed from 64 KiB to 16 MiB; any that takes longer than --budget-ms fails
+it too. Detection reads a bounded part of its input, so the time should
+stay flat as the size grows and the time per megabyte fall.
+"""
+
+import argparse
+import sys
+import time
+
+from source_tree import import_serigy
+
+import_serigy()
+
+from serigy.content_type import ContentType, detect  # noqa: E402
+
+CORPUS: list[tuple[str, str, ContentType]] = [
+    ("https://gnome.org", "", ContentType.LINK),
+    ("  http://example.com/a?b=c  ", "", ContentType.LINK),
+    ("file:///home/user/notes.txt", "", ContentType.LINK),
+    # A tracking link can run to kilobytes; still one value, and a link.
+    ("https://example.com/r?q=" + "a1b2" * 1250, "", ContentType.LINK),
+    ("someone@example.com", "", ContentType.EMAIL),
+    ("+55 (11) 91234-5678", "", ContentType.PHONE),
+    ("#1c71d8", "", ContentType.COLOR),
+    ("rgb(28, 113, 216)", "", ContentType.COLOR),
+    ("def main():\n    return 0\n", "", ContentType.CODE),
+    ("import os\nprint(os.getcwd())", "", ContentType.CODE),
+    (
+        "function f(a) {\n  const b = a * 2;\n  return b;\n}",
+        "",
+        ContentType.CODE,
+    ),
+    ('fn main() {\n    println!("hi");\n}', "", ContentType.CODE),
+    ("Hello there", "", ContentType.TEXT),
+    ("Dear Ana,\nsee you at 3, as agreed.", "", ContentType.TEXT),
+    ("   ", "", ContentType.TEXT),
+    ("", "", ContentType.TEXT),
+    ("anything", "image/png", ContentType.IMAGE),
+    ("anything", "application/pdf", ContentType.FILE),
+]
+
+_PROSE = (
+    "It was the best of times, it was the worst of times. The clock on "
+    "the wall kept going, and nobody in the room looked at it twice.\n"
+)
+_CODE = "def handler(event, context):\n    return {'status': 200}\n\n"
+
+
+def stress_inputs(size: int) -> dict[str, tuple[str, ContentType]]:
+    """Inputs of about `size` characters, and what each should detect as."""
+
+    def fill(unit: str) -> str:
+        return (unit * (size // len(unit) + 1))[:size]
+
+    return {
+        "code": (fill(_CODE), ContentType.CODE),
+        "prose": (fill(_PROSE), ContentType.TEXT),
+        # Deep enough to stop the parser with an error, not an answer.
+        "nesting": ("x = 1\ny = " + "(" * size, ContentType.CODE),
+        "one line": (fill("word "), ContentType.TEXT),
+        "blanks": (" " * size + "\nend", ContentType.TEXT),
+    }
+
+
+def timed(text: str, mime: str, repeat: int) -> tuple[ContentType, float]:
+    """The answer, and the slowest of `repeat` runs in milliseconds."""
+    worst = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        answer = detect(text, mime)
+        worst = max(worst, (time.perf_counter() - start) * 1000)
+    return answer, worst
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=25.0,
+        help="fail if any single detection takes longer (default 25)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="runs per input, the slowest counts (default 5)",
+    )
+    args = parser.parse_args()
+    failed = False
+
+    wrong = []
+    for text, mime, expected in CORPUS:
+        answer = detect(text, mime)
+        if answer is not expected:
+            wrong.append((text, expected, answer))
+    print(f"accuracy: {len(CORPUS) - len(wrong)}/{len(CORPUS)}")
+    for text, expected, answer in wrong:
+        print(
+            f"  {text[:40]!r}: wanted {expected.type_id}, got {answer.type_id}"
+        )
+        failed = True
+
+    print(f"\n{'input':<10} {'size':>8} {'worst ms':>10} {'ms/MB':>10}")
+    for size in (64 * 1024, 1024**2, 4 * 1024**2, 16 * 1024**2):
+        for name, (text, expected) in stress_inputs(size).items():
+            answer, worst = timed(text, "", args.repeat)
+            megabytes = len(text.encode()) / 1024**2
+            notes = []
+            if answer is not expected:
+                notes.append(
+                    f"wanted {expected.type_id}, got {answer.type_id}"
+                )
+            if worst > args.budget_ms:
+                notes.append("over budget")
+            failed = failed or bool(notes)
+            print(
+                f"{name:<10} {size // 1024:>6}Ki {worst:>10.2f} "
+                f"{worst / megabytes:>10.2f}  {'; '.join(notes)}"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
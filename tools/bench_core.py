@@ -0,0 +1,261 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Time the GTK-free core on histories of every size, and keep the numbers.
+
+Runs straight from the source tree, headless, no build or display needed:
+
+    python3 tools/bench_core.py --json before.json
+    python3 tools/bench_core.py --json after.json --baseline before.json
+
+The workloads are fixed so two runs can be compared: how many polling
+decisions `decide` makes a second, what the shell search takes on
+histories of 24, 1k, 10k and 100k slots (building its index, each
+keystroke of a few queries, and looking results up by id the way metas
+do), what `detect` costs per KiB for each shape of text, what a
+`SlotData.from_list` round trip costs per slot, and what `summary` takes
+on huge copies. Each number is the median of
+--repeat runs. With --baseline, every result is shown next to the one it
+is compared with, and the run fails if any got slower by more than
+--tolerance.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from itertools import cycle, islice
+from pathlib import Path
+
+from bench_content_type import stress_inputs
+from bench_search import keystrokes, make_slots
+from source_tree import import_serigy
+
+import_serigy()
+
+from serigy.clipboard.detector import ClipboardState, decide  # noqa: E402
+from serigy.content_type import detect  # noqa: E402
+from serigy.history import History  # noqa: E402
+from serigy.search_query import SearchIndex  # noqa: E402
+from serigy.slot_data import SlotData  # noqa: E402
+from serigy.slot_display import summary  # noqa: E402
+
+SIZES = [24, 1000, 10000, 100000]
+
+# What the monitor runs into from one tick to the next: a copy of ours,
+# a foreign copy, a lost sentinel, text and image probes.
+STATES = [
+    ClipboardState(True, "text/plain", "text/plain", False),
+    ClipboardState(True, "", "", True),
+    ClipboardState(True, "", "", False),
+    ClipboardState(False, "text/plain", "image/png", False),
+    ClipboardState(False, "", "", False),
+    ClipboardState(False, "text/plain;charset=utf-8", "text/plain", False),
+    ClipboardState(False, "image/png", "image/png", False, image_tick=2),
+    ClipboardState(False, "image/png", "image/png", False, image_tick=0),
+]
+DECISIONS = 100_000
+
+# As typed, a character at a time; the last one misspelt.
+QUERIES = ["clipboard", "relatorio cliente", "nowhere", "clipbaord histroy"]
+
+DETECT_SIZES = [1024, 64 * 1024, 1024**2]
+
+SUMMARY_SIZES = [1024**2, 16 * 1024**2]
+
+
+def timed(repeat: int, work: Callable[..., object], *args) -> float:
+    """The median of `repeat` runs of `work(*args)`, in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work(*args)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def bench_decide(repeat: int) -> list[dict]:
+    states = list(islice(cycle(STATES), DECISIONS))
+
+    def run():
+        for state in states:
+            decide(state)
+
+    seconds = timed(repeat, run)
+    return [result("decide", None, "decisions/s", DECISIONS / seconds)]
+
+
+def bench_history(slots: list[SlotData], repeat: int) -> list[dict]:
+    count = len(slots)
+    entries = [(slot.result_id, slot) for slot in slots]
+
+    def build() -> SearchIndex:
+        index = SearchIndex()
+        index.sync(entries)
+        return index
+
+    seconds = timed(repeat, build)
+    results = [result("index sync", count, "ms", seconds)]
+
+    index = build()
+    for query in QUERIES:
+        typed = keystrokes(query)
+
+        def search(typed=typed):
+            for terms in typed:
+                index.search(terms)
+
+        seconds = timed(repeat, search)
+        results.append(
+            result(f"search {query}", count, "ms/key", seconds / len(typed))
+        )
+
+    # What metas and activation go through: the history's id map.
+    with tempfile.TemporaryDirectory() as directory:
+        history = History(Path(directory) / "history.db")
+        history.rewrite(slots)
+        ids = [identifier for identifier, _slot in entries]
+        seconds = timed(
+            repeat, lambda: [history.by_id(identifier) for identifier in ids]
+        )
+        history.close()
+    results.append(result("by_id", count, "us/lookup", seconds / count))
+
+    raws = [slot.to_list() for slot in slots]
+    seconds = timed(
+        repeat, lambda: [SlotData.from_list(raw).to_list() for raw in raws]
+    )
+    results.append(
+        result("from_list round trip", count, "us/slot", seconds / count)
+    )
+    return results
+
+
+def bench_detect(repeat: int) -> list[dict]:
+    results = []
+    for size in DETECT_SIZES:
+        for shape, (text, _expected) in stress_inputs(size).items():
+            seconds = timed(repeat, detect, text, "")
+            kib = len(text.encode()) / 1024
+            results.append(
+                result(f"detect {shape}", size, "us/KiB", seconds / kib)
+            )
+    return results
+
+
+def bench_summary(repeat: int) -> list[dict]:
+    results = []
+    for size in SUMMARY_SIZES:
+        text = ("a line of copied text\n\n   " * (size // 25 + 1))[:size]
+        seconds = timed(repeat, summary, text)
+        results.append(result("summary", size, "ms", seconds))
+    return results
+
+
+def result(workload: str, size: int | None, unit: str, value: float) -> dict:
+    """One measurement; seconds are scaled to the unit they are shown in."""
+    if unit == "ms" or unit.startswith("ms/"):
+        value *= 1000
+    elif unit.startswith("us/"):
+        value *= 1_000_000
+    return {"workload": workload, "size": size, "unit": unit, "value": value}
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> bool:
+    """Show each result against `baseline`; True if any regressed."""
+    before = {
+        (entry["workload"], entry["size"]): entry["value"]
+        for entry in baseline["results"]
+    }
+    regressed = False
+    print(f"\n{'workload':<28} {'size':>9} {'before':>12} {'now':>12}")
+    for entry in results:
+        old = before.get((entry["workload"], entry["size"]))
+        if old is None or not old:
+            continue
+        change = entry["value"] / old
+        # Throughput regresses by falling, everything else by rising.
+        if entry["unit"].endswith("/s"):
+            change = 1 / change if entry["value"] else float("inf")
+        slower = change > 1 + tolerance
+        regressed = regressed or slower
+        print(
+            f"{entry['workload']:<28} {entry['size'] or '':>9} "
+            f"{old:>12.3f} {entry['value']:>12.3f}  "
+            f"{'slower' if slower else ''}"
+        )
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--slots",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="history sizes to run (default 24 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="runs per workload, the median counts (default 5)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--json", metavar="FILE", help="write the results to FILE"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="compare with the results of an earlier run",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="slowdown against --baseline that fails the run (default 0.2)",
+    )
+    args = parser.parse_args()
+
+    results = bench_decide(args.repeat)
+    for count in args.slots:
+        slots = make_slots(count, random.Random(args.seed))
+        results += bench_history(slots, args.repeat)
+    results += bench_detect(args.repeat)
+    results += bench_summary(args.repeat)
+
+    print(f"{'workload':<28} {'size':>9} {'value':>14}")
+    for entry in results:
+        print(
+            f"{entry['workload']:<28} {entry['size'] or '':>9} "
+            f"{entry['value']:>14.3f} {entry['unit']}"
+        )
+
+    if args.json:
+        report = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": int(time.time()),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
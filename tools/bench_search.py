@@ -0,0 +1,151 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Time the shell search one keystroke at a time, on histories of any size.
+
+Runs straight from the source tree, no build needed:
+
+    python3 tools/bench_search.py --slots 1000 10000 100000
+
+Builds a history of made-up copies, indexes it the way the search provider
+does, then types a few queries into it a character at a time, typos
+included, the way the overview sends them. Every keystroke is timed; the
+run fails if the 99th percentile of any size is over --budget-ms, or if a
+query, typos and all, finds nothing once typed in full.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from source_tree import import_serigy
+
+import_serigy()
+
+from serigy.search_query import SearchIndex  # noqa: E402
+from serigy.slot_data import SlotData  # noqa: E402
+from serigy.slot_meta import describe  # noqa: E402
+
+WORDS = (
+    "the of and to in is for on that with as this by from at clipboard "
+    "history copy paste slot image file link serigy gnome shell search "
+    "manutenção relatório reunião orçamento projeto cliente entrega "
+    "function return const import class def error warning build release "
+    "kernel wayland portal session window button label grid archive"
+).split()
+
+# As typed, a character at a time. The last ones are misspelt.
+QUERIES = [
+    "manutenção",
+    "clipboard history",
+    "return const",
+    "https",
+    "relatorio cliente",
+    "serigy",
+    "wayladn",
+    "clipbaord histroy",
+]
+
+
+def make_slots(count: int, rng: random.Random) -> list[SlotData]:
+    now = int(time.time())
+    slots = []
+    for i in range(count):
+        timestamp = str(now - rng.randrange(30 * 24 * 3600))
+        pin = "pinned" if rng.random() < 0.05 else ""
+        if i % 20 == 0:
+            name = f"{rng.choice(WORDS)}-{i}.pdf"
+            slot = SlotData(
+                uri=f"file:///home/user/{name}",
+                mime="application/pdf",
+                timestamp=timestamp,
+                pin_status=pin,
+            )
+        elif i % 10 == 0:
+            slot = SlotData(
+                text=f"https://example.com/{rng.choice(WORDS)}/{i}",
+                timestamp=timestamp,
+                pin_status=pin,
+            )
+        else:
+            words = rng.choices(WORDS, k=rng.randint(3, 80))
+            slot = SlotData(
+                text=" ".join(words) + f" {i}",
+                timestamp=timestamp,
+                pin_status=pin,
+            )
+        slots.append(describe(slot))
+    return slots
+
+
+def keystrokes(query: str) -> list[list[str]]:
+    return [query[:end].split() for end in range(1, len(query) + 1)]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--slots",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="history sizes to run (default 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=16.0,
+        help="fail if a 99th percentile keystroke is slower (default 16)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    failed = False
+
+    print(
+        f"{'slots':>7} {'index s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'max ms':>8}"
+    )
+    for count in args.slots:
+        rng = random.Random(args.seed)
+        slots = make_slots(count, rng)
+        entries = [(slot.result_id, slot) for slot in slots]
+
+        start = time.perf_counter()
+        index = SearchIndex()
+        index.sync(entries)
+        indexing = time.perf_counter() - start
+
+        samples = []
+        missed = []
+        for query in QUERIES:
+            for terms in keystrokes(query):
+                start = time.perf_counter()
+                results = index.search(terms)
+                samples.append((time.perf_counter() - start) * 1000)
+            # Timing a search that finds nothing proves nothing.
+            if not results:
+                missed.append(query)
+
+        p99 = percentile(samples, 0.99)
+        over = p99 > args.budget_ms
+        failed = failed or over or bool(missed)
+        print(
+            f"{count:>7} {indexing:>8.2f} "
+            f"{statistics.median(samples):>8.2f} {p99:>8.2f} "
+            f"{max(samples):>8.2f}  {'over budget' if over else ''}"
+        )
+        for query in missed:
+            print(f"{'':>7} nothing found for {query!r}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Play bursts of copies at the clipboard monitor, and count what it caught.
+
+Runs the real `ClipboardMonitor` against the fake clipboard next to this
+file, so no compositor or display is needed, only GLib:
+
+    python3 tools/clipboard_load.py --bursts 10 --burst-size 5 --rate 20
+    python3 tools/clipboard_load.py --trace copies.jsonl --json out.json
+
+A trace is one copy per line, `{"at_ms": 0, "kind": "text", "size": 40}`,
+times from the start of the run; `kind` may also be "image", with `size`
+its height in pixels. Without --trace one is made up: --bursts bursts of
+--burst-size copies, --rate a second within a burst, --gap-ms apart.
+
+Whenever the monitor calls back, the harness does what the capture window
+does: takes focus after --focus-ms, claims an empty clipboard, reads what
+is there and gives focus back. Every copy is told apart by its content, so
+the report can say:
+
+- detection latency, from a copy to the callback that led to its capture;
+- captures lost, copies that were never read;
+- spurious triggers, callbacks that found nothing not already captured;
+- main-loop time per copy, the CPU the main thread spent, harness and
+  fake included, divided by the copies played.
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+
+from fake_clipboard import FakeClipboard
+from source_tree import import_serigy
+
+import_serigy()
+
+from gi.repository import GLib  # noqa: E402
+
+from serigy.clipboard.capture import read_text_capped  # noqa: E402
+from serigy.clipboard.monitor import ClipboardMonitor  # noqa: E402
+
+# Long enough for the poll to back off to its ceiling and look once more.
+SETTLE_MS = 10_000
+
+CAPTURE_LIMIT = 16 * 1024 * 1024
+
+
+@dataclass
+class Copy:
+    index: int
+    at_ms: float
+    kind: str
+    size: int
+    # perf_counter when it was made, and when its capture was set off.
+    made: float | None = None
+    detected: float | None = None
+
+    @property
+    def text(self) -> str:
+        head = f"copy {self.index} "
+        return head + "x" * max(0, self.size - len(head))
+
+    @property
+    def image_size(self) -> tuple[int, int]:
+        # The width tells copies apart, like the text does.
+        return self.index + 1, self.size
+
+
+def make_trace(
+    bursts: int, burst_size: int, rate: float, gap_ms: float, images: float
+) -> list[Copy]:
+    rng = random.Random(1)
+    copies = []
+    at = 0.0
+    for _ in range(bursts):
+        for _ in range(burst_size):
+            is_image = rng.random() < images
+            copies.append(
+                Copy(
+                    index=len(copies),
+                    at_ms=at,
+                    kind="image" if is_image else "text",
+                    size=rng.randint(32, 512)
+                    if is_image
+                    else rng.randint(8, 4096),
+                )
+            )
+            at += 1000 / rate
+        at += gap_ms
+    return copies
+
+
+def load_trace(path: str) -> list[Copy]:
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [
+        Copy(index, event["at_ms"], event["kind"], event["size"])
+        for index, event in enumerate(events)
+    ]
+
+
+class Harness:
+    def __init__(self, copies: list[Copy], focus_ms: float, read_ms: float):
+        self.copies = copies
+        self.focus_ms = focus_ms
+        self.clipboard = FakeClipboard(read_ms=read_ms)
+        self.monitor = ClipboardMonitor(
+            self._on_changed, clipboard=self.clipboard
+        )
+        self.triggers = 0
+        self.spurious = 0
+        self._loop = GLib.MainLoop()
+        self._trigger_at: float | None = None
+
+    def run(self) -> float:
+        """Play every copy; the main thread's CPU seconds it took."""
+        self.monitor.start()
+        for copy in self.copies:
+            GLib.timeout_add(round(copy.at_ms) + 100, self._play, copy)
+        end = max((copy.at_ms for copy in self.copies), default=0)
+        GLib.timeout_add(round(end) + 100 + SETTLE_MS, self._loop.quit)
+
+        cpu = time.thread_time()
+        self._loop.run()
+        self.monitor.stop()
+        return time.thread_time() - cpu
+
+    def _play(self, copy: Copy) -> bool:
+        copy.made = time.perf_counter()
+        if copy.kind == "image":
+            self.clipboard.copy_image(*copy.image_size)
+        else:
+            self.clipboard.copy_text(copy.text)
+        return GLib.SOURCE_REMOVE
+
+    # What the capture window does
+
+    def _on_changed(self):
+        self.triggers += 1
+        self._trigger_at = time.perf_counter()
+        GLib.timeout_add(round(self.focus_ms), self._capture)
+
+    def _capture(self) -> bool:
+        self.clipboard.set_focused(True)
+        self.monitor.claim_clipboard()
+        formats = self.clipboard.get_formats().to_string()
+        if "image/png" in formats:
+            self.clipboard.read_texture_async(None, self._on_texture)
+        elif "text/plain" in formats:
+            read_text_capped(self.clipboard, CAPTURE_LIMIT, self._on_text)
+        else:
+            self._captured(None)
+        return GLib.SOURCE_REMOVE
+
+    def _on_texture(self, clipboard, result):
+        try:
+            texture = clipboard.read_texture_finish(result)
+        except GLib.Error:
+            self._captured(None)
+            return
+        self._captured(self.copies[texture.get_width() - 1])
+
+    def _on_text(self, text: str | None, _oversize: bool):
+        copy = None
+        if text and text.startswith("copy "):
+            index = int(text.split(" ", 2)[1])
+            copy = self.copies[index]
+        self._captured(copy)
+
+    def _captured(self, copy: Copy | None):
+        if copy is None or copy.detected is not None:
+            self.spurious += 1
+        else:
+            copy.detected = self._trigger_at
+        self.clipboard.set_focused(False)
+        self.monitor.done_processing()
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trace", metavar="FILE", help="copies to play")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument(
+        "--rate", type=float, default=10.0, help="copies a second in a burst"
+    )
+    parser.add_argument(
+        "--gap-ms", type=float, default=2000.0, help="quiet between bursts"
+    )
+    parser.add_argument(
+        "--images", type=float, default=0.2, help="share of image copies"
+    )
+    parser.add_argument(
+        "--focus-ms",
+        type=float,
+        default=50.0,
+        help="how long the capture window takes to get focus",
+    )
+    parser.add_argument(
+        "--read-ms", type=float, default=2.0, help="how long a read takes"
+    )
+    parser.add_argument("--json", metavar="FILE", help="write the report")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING
+    )
+
+    if args.trace:
+        copies = load_trace(args.trace)
+    else:
+        copies = make_trace(
+            args.bursts, args.burst_size, args.rate, args.gap_ms, args.images
+        )
+
+    harness = Harness(copies, args.focus_ms, args.read_ms)
+    cpu = harness.run()
+
+    latencies = [
+        (copy.detected - copy.made) * 1000
+        for copy in copies
+        if copy.detected is not None
+    ]
+    report = {
+        "copies": len(copies),
+        "captured": len(latencies),
+        "lost": len(copies) - len(latencies),
+        "triggers": harness.triggers,
+        "spurious": harness.spurious,
+        "latency_p50_ms": statistics.median(latencies) if latencies else 0,
+        "latency_p99_ms": percentile(latencies, 0.99),
+        "latency_max_ms": max(latencies, default=0),
+        "main_loop_ms_per_copy": cpu * 1000 / max(1, len(copies)),
+        "poll_wakeups": harness.monitor.poll_metrics.wakeups,
+        "refused_writes": harness.clipboard.refused_writes,
+    }
+    for key, value in report.items():
+        print(
+            f"{key:<22} {value:>10.2f}"
+            if isinstance(value, float)
+            else f"{key:<22} {value:>10}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
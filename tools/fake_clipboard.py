@@ -0,0 +1,220 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""A stand-in for `Gdk.Clipboard` that needs no compositor.
+
+Answers what `ClipboardMonitor` and the capture code ask of a clipboard:
+formats, `is_local`, async text and texture reads, `set_content` and the
+`changed` signal, and behaves the way Wayland makes the real one behave:
+
+- other apps' copies only raise `changed` while we have focus;
+- `set_content` is refused without focus, yet still answers True;
+- another app copying over our sentinel leaves the clipboard local and
+  empty, with every read failing, as GDK does on wl_data_source.cancelled;
+- a read takes `read_ms` to come back, and honours its cancellable.
+
+Copies from other apps are made with `copy_text` and `copy_image`; the
+load generator next to this file plays them from a trace.
+"""
+
+import gi
+
+gi.require_versions({"Gdk": "4.0", "Gio": "2.0"})
+from gi.repository import Gdk, Gio, GLib, GObject
+
+
+class _Result:
+    """What a finished read hands its `_finish`: a value or an error."""
+
+    def __init__(self, value=None, error: GLib.Error | None = None):
+        self.value = value
+        self.error = error
+
+    def unwrap(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _error(code: Gio.IOErrorEnum, message: str) -> GLib.Error:
+    return GLib.Error.new_literal(Gio.io_error_quark(), message, code)
+
+
+class FakeClipboard(GObject.Object):
+    __gtype_name__ = "SerigyFakeClipboard"
+    __gsignals__ = {"changed": (GObject.SignalFlags.RUN_LAST, None, ())}
+
+    def __init__(self, read_ms: float = 2.0):
+        super().__init__()
+        self.read_ms = read_ms
+        self.focused = False
+        self._mime_types: list[str] = []
+        self._data: bytes | None = None
+        self._size: tuple[int, int] | None = None
+        self._provider: Gdk.ContentProvider | None = None
+        self._local = False
+        # Another app's copy, waiting for us to be focused to be seen.
+        self._pending: tuple | None = None
+        # What the harness counts: reads served, and writes refused.
+        self.reads = 0
+        self.refused_writes = 0
+
+    # What GDK offers
+
+    def get_formats(self) -> Gdk.ContentFormats:
+        return Gdk.ContentFormats.new(self._mime_types)
+
+    def is_local(self) -> bool:
+        return self._local
+
+    def set_content(self, provider: Gdk.ContentProvider | None) -> bool:
+        if not self.focused:
+            # The compositor says no; GDK does not find out.
+            self.refused_writes += 1
+            return True
+        self._local = True
+        self._provider = provider
+        self._data = self._size = None
+        self._mime_types = (
+            list(provider.ref_formats().get_mime_types()) if provider else []
+        )
+        self.emit("changed")
+        return True
+
+    def read_async(self, mime_types, priority, cancellable, callback):
+        mime = next((m for m in mime_types if m in self._mime_types), None)
+        if mime is None:
+            self._answer(
+                cancellable,
+                callback,
+                error=_error(
+                    Gio.IOErrorEnum.NOT_SUPPORTED, "No compatible formats"
+                ),
+            )
+        elif self._local and self._provider is not None:
+            self._read_provider(mime, cancellable, callback)
+        elif self._data is None:
+            self._answer(
+                cancellable,
+                callback,
+                error=_error(Gio.IOErrorEnum.FAILED, "Nothing to read"),
+            )
+        else:
+            stream = Gio.MemoryInputStream.new_from_bytes(
+                GLib.Bytes.new(self._data)
+            )
+            self._answer(cancellable, callback, (stream, mime))
+
+    def read_finish(self, result: _Result):
+        return result.unwrap()
+
+    def read_texture_async(self, cancellable, callback):
+        if self._size is None:
+            self._answer(
+                cancellable,
+                callback,
+                error=_error(Gio.IOErrorEnum.NOT_SUPPORTED, "Not an image"),
+            )
+            return
+        width, height = self._size
+        stride = width * 4
+        texture = Gdk.MemoryTexture.new(
+            width,
+            height,
+            Gdk.MemoryFormat.R8G8B8A8,
+            GLib.Bytes.new(bytes(stride * height)),
+            stride,
+        )
+        self._answer(cancellable, callback, texture)
+
+    def read_texture_finish(self, result: _Result):
+        return result.unwrap()
+
+    # What other apps do
+
+    def copy_text(self, text: str) -> None:
+        self._offer(
+            ["text/plain;charset=utf-8", "text/plain", "UTF8_STRING"],
+            data=text.encode(),
+        )
+
+    def copy_image(self, width: int, height: int) -> None:
+        self._offer(["image/png"], size=(width, height))
+
+    def set_focused(self, focused: bool) -> None:
+        """Our window gained or lost focus.
+
+        Gaining it hands us the selection as it now stands, and GDK calls
+        that a change.
+        """
+        if focused == self.focused:
+            return
+        self.focused = focused
+        if not focused:
+            return
+        if self._pending is not None:
+            self._take(self._pending)
+            self._pending = None
+        self.emit("changed")
+
+    def _offer(self, mime_types, data=None, size=None) -> None:
+        offer = (list(mime_types), data, size)
+        if self.focused:
+            self._take(offer)
+            self.emit("changed")
+        elif self._local:
+            # Cancelled, or already was: still ours as far as GDK knows,
+            # but empty, until focus brings the new offer.
+            cancelled = self._provider is not None
+            self._provider = None
+            self._mime_types, self._data, self._size = [], None, None
+            self._pending = offer
+            if cancelled:
+                self.emit("changed")
+        else:
+            # Formats stay live without focus; no signal says so.
+            self._take(offer)
+
+    def _take(self, offer) -> None:
+        self._local = False
+        self._provider = None
+        self._mime_types, self._data, self._size = offer
+
+    # Delivery
+
+    def _answer(self, cancellable, callback, value=None, error=None):
+        self.reads += 1
+
+        def deliver():
+            if cancellable is not None and cancellable.is_cancelled():
+                result = _Result(
+                    error=_error(
+                        Gio.IOErrorEnum.CANCELLED, "Operation was cancelled"
+                    )
+                )
+            else:
+                result = _Result(value, error)
+            callback(self, result)
+            return GLib.SOURCE_REMOVE
+
+        GLib.timeout_add(max(0, round(self.read_ms)), deliver)
+
+    def _read_provider(self, mime, cancellable, callback):
+        """Our own content, as GDK serves it: written out, then read."""
+        output = Gio.MemoryOutputStream.new_resizable()
+
+        def on_written(provider, result):
+            try:
+                provider.write_mime_type_finish(result)
+                output.close(None)
+            except GLib.Error as e:
+                self._answer(cancellable, callback, error=e)
+                return
+            stream = Gio.MemoryInputStream.new_from_bytes(
+                output.steal_as_bytes()
+            )
+            self._answer(cancellable, callback, (stream, mime))
+
+        self._provider.write_mime_type_async(
+            mime, output, GLib.PRIORITY_DEFAULT, None, on_written
+        )
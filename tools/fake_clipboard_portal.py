@@ -0,0 +1,246 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""A stand-in for the clipboard portal, for exercising the portal monitor.
+
+Answers just enough of RemoteDesktop, Clipboard and Session for
+`serigy.clipboard.portal.PortalWatcher` to get a session, then emits
+SelectionOwnerChanged whenever a line is typed (or every --every seconds).
+Run it on a private bus so the real portal is not in the way:
+
+    dbus-run-session -- sh -c '
+        python3 tools/fake_clipboard_portal.py --every 2 &
+        sleep 1; serigy'
+
+--deny answers Start without clipboard access, and --close-after ends the
+session after that many seconds, to see the monitor fall back to polling.
+"""
+
+import argparse
+import sys
+import time
+from itertools import count
+
+import gi
+
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+PORTAL_BUS = "org.freedesktop.portal.Desktop"
+PORTAL_PATH = "/org/freedesktop/portal/desktop"
+
+INTROSPECTION = """
+<node>
+  <interface name="org.freedesktop.portal.RemoteDesktop">
+    <method name="CreateSession">
+      <arg type="a{sv}" direction="in"/>
+      <arg type="o" direction="out"/>
+    </method>
+    <method name="SelectDevices">
+      <arg type="o" direction="in"/>
+      <arg type="a{sv}" direction="in"/>
+      <arg type="o" direction="out"/>
+    </method>
+    <method name="Start">
+      <arg type="o" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="a{sv}" direction="in"/>
+      <arg type="o" direction="out"/>
+    </method>
+  </interface>
+  <interface name="org.freedesktop.portal.Clipboard">
+    <method name="RequestClipboard">
+      <arg type="o" direction="in"/>
+      <arg type="a{sv}" direction="in"/>
+    </method>
+    <signal name="SelectionOwnerChanged">
+      <arg type="o"/>
+      <arg type="a{sv}"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+SESSION_INTROSPECTION = """
+<node>
+  <interface name="org.freedesktop.portal.Session">
+    <method name="Close"/>
+    <signal name="Closed">
+      <arg type="a{sv}"/>
+    </signal>
+  </interface>
+</node>
+"""
+
+_start = time.monotonic()
+
+
+def log(msg: str) -> None:
+    print(f"[{time.monotonic() - _start:7.2f}s] {msg}", flush=True)
+
+
+class FakePortal:
+    def __init__(self, deny: bool, close_after: float | None):
+        self.deny = deny
+        self.close_after = close_after
+        self.connection: Gio.DBusConnection | None = None
+        self.sessions: dict[str, int] = {}
+        self._ids = count(1)
+        self._session_info = Gio.DBusNodeInfo.new_for_xml(
+            SESSION_INTROSPECTION
+        ).interfaces[0]
+
+    def on_bus_acquired(self, connection, _name):
+        self.connection = connection
+        for interface in Gio.DBusNodeInfo.new_for_xml(
+            INTROSPECTION
+        ).interfaces:
+            connection.register_object(
+                PORTAL_PATH, interface, self.on_call, None, None
+            )
+
+    def on_call(self, connection, sender, _path, iface, method, params, inv):
+        log(f"{iface.rsplit('.', 1)[-1]}.{method} from {sender}")
+        args = params.unpack()
+
+        if method == "RequestClipboard":
+            inv.return_value(None)
+            return
+
+        options = args[-1]
+        token = options.get("handle_token", f"fake{next(self._ids)}")
+        sender_path = sender[1:].replace(".", "_")
+        request = f"{PORTAL_PATH}/request/{sender_path}/{token}"
+        inv.return_value(GLib.Variant("(o)", (request,)))
+
+        if method == "CreateSession":
+            results = {
+                "session_handle": GLib.Variant("s", self._new_session(sender))
+            }
+        elif method == "Start":
+            # No restore token: one from here would end up offered to the
+            # real portal on the next run.
+            results = {"clipboard_enabled": GLib.Variant("b", not self.deny)}
+            if self.close_after is not None:
+                GLib.timeout_add(int(self.close_after * 1000), self._close_all)
+        else:
+            results = {}
+
+        # After the reply, the way the real portal answers.
+        GLib.idle_add(self._respond, sender, request, results)
+
+    def _respond(self, sender, request, results):
+        self.connection.emit_signal(
+            sender,
+            request,
+            "org.freedesktop.portal.Request",
+            "Response",
+            GLib.Variant("(ua{sv})", (0, results)),
+        )
+        return False
+
+    def _new_session(self, sender) -> str:
+        handle = f"{PORTAL_PATH}/session/fake{next(self._ids)}"
+
+        def on_session_call(_c, _s, path, _i, method, _p, inv):
+            log(f"Session.{method} on {path}")
+            inv.return_value(None)
+            self._drop_session(path)
+
+        self.sessions[handle] = self.connection.register_object(
+            handle, self._session_info, on_session_call, None, None
+        )
+        return handle
+
+    def _drop_session(self, handle):
+        object_id = self.sessions.pop(handle, None)
+        if object_id is not None:
+            self.connection.unregister_object(object_id)
+
+    def _close_all(self):
+        for handle in list(self.sessions):
+            log(f"closing {handle}")
+            self.connection.emit_signal(
+                None,
+                handle,
+                "org.freedesktop.portal.Session",
+                "Closed",
+                GLib.Variant("(a{sv})", ({},)),
+            )
+            self._drop_session(handle)
+        return False
+
+    def emit_owner_changed(self, *_args):
+        mime_types = ["text/plain;charset=utf-8", "text/plain"]
+        for handle in self.sessions:
+            log(f"SelectionOwnerChanged for {handle}")
+            self.connection.emit_signal(
+                None,
+                PORTAL_PATH,
+                "org.freedesktop.portal.Clipboard",
+                "SelectionOwnerChanged",
+                GLib.Variant(
+                    "(oa{sv})",
+                    (
+                        handle,
+                        {
+                            "mime_types": GLib.Variant("as", mime_types),
+                            "session_is_owner": GLib.Variant("b", False),
+                        },
+                    ),
+                ),
+            )
+        return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--every",
+        type=float,
+        help="emit SelectionOwnerChanged every this many seconds",
+    )
+    parser.add_argument(
+        "--deny",
+        action="store_true",
+        help="start sessions without clipboard access",
+    )
+    parser.add_argument(
+        "--close-after",
+        type=float,
+        help="close every session this many seconds after it starts",
+    )
+    args = parser.parse_args()
+
+    portal = FakePortal(args.deny, args.close_after)
+    Gio.bus_own_name(
+        Gio.BusType.SESSION,
+        PORTAL_BUS,
+        Gio.BusNameOwnerFlags.NONE,
+        portal.on_bus_acquired,
+        lambda *_: log(f"owning {PORTAL_BUS}"),
+        lambda *_: (log(f"could not own {PORTAL_BUS}"), sys.exit(1)),
+    )
+
+    if args.every:
+        GLib.timeout_add(int(args.every * 1000), portal.emit_owner_changed)
+
+    def on_stdin(channel, _condition):
+        if not channel.readline():
+            return False
+        portal.emit_owner_changed()
+        return True
+
+    channel = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(channel, GLib.PRIORITY_DEFAULT, GLib.IO_IN, on_stdin)
+
+    log("type Enter to announce a copy, Ctrl-C to stop")
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# Copyright 2026 Cleo Menezes Jr.
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Import `serigy` from the source tree, for the tools next to this file.
+
+The package is only assembled by the build; this makes `src` answer as
+`serigy` instead, the way the installed app sees it. Only the modules that
+need no GTK to import are of use this way.
+
+`serigy.clipboard` is made to answer without running its `__init__`, which
+brings in the monitor and the writer and GDK with them; the GTK-free
+modules inside, like the detector, then import on their own.
+"""
+
+import importlib.machinery
+import importlib.util
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def import_serigy() -> None:
+    if "serigy" in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location(
+        "serigy", SRC / "__init__.py", submodule_search_locations=[str(SRC)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["serigy"] = module
+    spec.loader.exec_module(module)
+
+    clipboard = importlib.util.module_from_spec(
+        importlib.machinery.ModuleSpec(
+            "serigy.clipboard", None, is_package=True
+        )
+    )
+    clipboard.__path__ = [str(SRC / "clipboard")]
+    sys.modules["serigy.clipboard"] = clipboard